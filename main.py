@@ -1,13 +1,22 @@
 # main.py
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 # Database and user operations
 from tools.database import init_db, get_db
 from tools.user import create_admin_user
+from tools.utils import password_hasher, PasswordHasherBusy
+from tools.static_assets import asset_manifest
+from tools.static_files import FingerprintedStaticFiles
+from tools.compression import CompressionMiddleware
+from tools.exam_pool import exam_paper_pool
+from tools.submissions import grading_pool
+from tools.counters import counter_buffer, backfill_question_counters
+from tools.statistics_utils import backfill_rollups
+from tools.trends import backfill_buckets
+from tools.distribution import backfill_histograms
 # Migrate questions from JSON
 from migrate_questions import main as migrate_main
 # Routers
@@ -18,9 +27,18 @@ app = FastAPI(title="NexusAI Quiz App")
 
 # Session Middleware
 app.add_middleware(SessionMiddleware, secret_key="SESSION_SECRET_KEY", max_age=3600)
-# Static files and template configuration
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Compress large JSON/HTML bodies (outermost, so it sees the final response)
+app.add_middleware(CompressionMiddleware)
+# Static files (templates are configured in tools/templating.py)
+app.mount("/static", FingerprintedStaticFiles(directory="static"), name="static")
+
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in requests, please try again shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.on_event("startup")
 def on_startup():
@@ -29,7 +47,13 @@ def on_startup():
     1) Create Neo4j constraints
     2) Create Admin user and DefaultSchool
     3) Migrate questions from JSON
+    4) Backfill per-question answer counters, school/global statistics rollups,
+       score histograms and trend buckets (once)
+    5) Start the exam paper pool producer, the grading workers and the
+       write-behind counter flusher
     """
+    # Hash and precompress the static assets before the first page asks for them
+    asset_manifest.build()
     init_db()  # Create constraints
     # Create Admin and DefaultSchool
     session = get_db()
@@ -42,6 +66,29 @@ def on_startup():
         migrate_main()
     except Exception as e:
         print(f"Migrate error: {e}")
+    session = get_db()
+    try:
+        if backfill_question_counters(session):
+            print("Question answer counters backfilled.")
+        if backfill_rollups(session):
+            print("School and global statistics rollups backfilled.")
+        if backfill_histograms(session):
+            print("Score histograms backfilled.")
+        if backfill_buckets(session):
+            print("Statistics trend buckets backfilled.")
+    finally:
+        session.close()
+    exam_paper_pool.start(get_db)
+    grading_pool.start()
+    counter_buffer.start(get_db)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    exam_paper_pool.stop()
+    grading_pool.stop()
+    # Flush pending counter deltas last, after the graders have stopped adding them.
+    counter_buffer.stop()
+    password_hasher.stop()
 
 # API Routers
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
@@ -3,6 +3,9 @@ import json
 from pathlib import Path
 from uuid import uuid4
 from tools.database import get_db, init_db
+from tools.question_bank import bump_bank_version
+from tools.answer_keys import answer_key_cache
+from tools.stats_cache import teacher_stats_cache
 
 # Source file paths
 QUESTIONS_DIR = Path("questions")            # e.g., "questions_section1.json" ...
@@ -106,6 +109,9 @@ def main():
                     }
                     session.run(cypher_create_choice, params_choice)
                 print(f"Migrated Q: {ext_id} ({q_item['question'][:30]}...)")
+        bump_bank_version(session)
+        answer_key_cache.invalidate()
+        teacher_stats_cache.invalidate()
         print("Migration completed successfully.")
     finally:
         session.close()
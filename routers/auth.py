@@ -1,10 +1,9 @@
 # routers/auth.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field, root_validator, validator
 from tools.database import get_db
-from tools.user import register_user, login_user
-from tools.token_generator import create_access_token
+from services import auth as auth_service
 
 router = APIRouter()
 
@@ -57,9 +56,9 @@ class LoginResponse(BaseModel):
     role: str
 
 @router.post("/register", response_model=RegisterResponse)
-def register_endpoint(request: RegisterRequest, session = Depends(get_db)):
-    success = register_user(
-        session=session,
+async def register_endpoint(request: RegisterRequest, session = Depends(get_db)):
+    return await auth_service.register(
+        session,
         username=request.username,
         password=request.password,
         name=request.name,
@@ -68,18 +67,7 @@ def register_endpoint(request: RegisterRequest, session = Depends(get_db)):
         role=request.role,
         registered_section=request.registered_section,
     )
-    if not success:
-        raise HTTPException(status_code=400, detail="Username already exists or default school not found.")
-    return {"message": "Registration successful."}
 
 @router.post("/login", response_model=LoginResponse)
-def login_endpoint(body: LoginRequest, session = Depends(get_db)):
-    user = login_user(session, body.username, body.password)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid username or password.")
-    token = create_access_token(user["user_id"])
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-        "role": user["role"]
-    }
+async def login_endpoint(body: LoginRequest, session = Depends(get_db)):
+    return await auth_service.login(session, body.username, body.password)
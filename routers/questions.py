@@ -2,9 +2,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from uuid import uuid4
 from tools.database import get_db
 from tools.token_generator import get_current_user
+from tools.responses import FastJSONResponse
+from services import questions as questions_service
 
 router = APIRouter()
 
@@ -40,46 +41,8 @@ class QuestionResponse(BaseModel):
 
 @router.post("/", response_model=AddQuestionResponse, summary="Add a new question (advanced DB schema)")
 def add_question(body: AddQuestionRequest, session = Depends(get_db), current_user = Depends(get_current_user)):
-    if current_user["role"] != "teacher":
-        raise HTTPException(status_code=403, detail="Only teachers can add questions.")
-    external_id = str(uuid4())
-    question_id = str(uuid4())
-    session.run("""
-    CREATE (q:Question {
-        id: $id,
-        external_id: $external_id,
-        section: $section,
-        question: $question,
-        points: $points,
-        type: $q_type
-    })
-    """, {
-        "id": question_id,
-        "external_id": external_id,
-        "section": body.section,
-        "question": body.question_text,
-        "points": body.points,
-        "q_type": body.q_type
-    })
-    for ch in body.choices:
-        choice_id = str(uuid4())
-        session.run("""
-        MATCH (q:Question {id: $question_id})
-        CREATE (c:Choice {
-            id: $choice_id,
-            choice_text: $choice_text,
-            is_correct: $is_correct,
-            correct_position: $correct_position
-        })
-        CREATE (q)-[:HAS_CHOICE]->(c)
-        """, {
-            "question_id": question_id,
-            "choice_id": choice_id,
-            "choice_text": ch.choice_text.strip(),
-            "is_correct": ch.is_correct or False,
-            "correct_position": ch.correct_position
-        })
-    return {"message": "Question added successfully with new DB schema", "external_id": external_id}
+    return questions_service.add_question(session, current_user, body.question_text, body.q_type, body.points,
+                                          body.section, [ch.dict() for ch in body.choices])
 
 @router.get("/", response_model=List[QuestionResponse], summary="List all questions (advanced DB schema)")
 def list_all_questions(session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -111,4 +74,5 @@ def list_all_questions(session = Depends(get_db), current_user = Depends(get_cur
             "q_type": q["type"],
             "choices": choice_list
         })
-    return results
+    # Built here from the graph; skip re-validating every question against the model.
+    return FastJSONResponse(results)
@@ -1,136 +1,152 @@
 # routers/stats.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Union
+from pydantic import BaseModel
 from tools.database import get_db
 from tools.token_generator import get_current_user
+from tools.question_bank import question_bank_cache
+from tools.exam_pool import exam_paper_pool
+from tools.answer_keys import answer_key_cache
+from tools.submissions import grading_pool
+from tools.counters import counter_buffer
+from tools.http_cache import response_cache, CACHE_CONTROL
+from tools.stats_cache import teacher_stats_cache
+from tools.fragment_cache import fragment_cache
+from tools.auth_cache import user_cache, token_cache
+from tools.utils import password_hasher
+from tools.static_assets import asset_manifest
+from tools.compression import compression_stats
+from tools.responses import FastJSONResponse
+from tools.distribution import load_distribution
+from tools.grading import SECTION_NUMBERS
+from tools.export import export_params, stream_export, EXPORT_MEDIA_TYPES
+from services import stats as stats_service
+from services.stats import get_teacher_sections
 router = APIRouter()
-subject_mapping = {1: "Math", 2: "English", 3: "Science", 4: "History"}
-@router.get("/", summary="View advanced statistics")
-def view_statistics(session = Depends(get_db), current_user = Depends(get_current_user)):
+
+class SectionStats(BaseModel):
+    section_number: int
+    section_name: str
+    correct_answers: int
+    wrong_answers: int
+    exam_takers: int
+    success_rate: float
+
+class SectionSummary(BaseModel):
+    section_number: int
+    section_name: str
+    correct_answers_total: int
+    wrong_answers_total: int
+    exam_takers: int
+    success_rate: float
+    average_percentage: float
+
+class QuestionStats(BaseModel):
+    question_text: str
+    correct_count: int
+    wrong_count: int
+    difficulty: float | None
+    discrimination: float | None
+    distractor_effectiveness: float | None
+    item_flag: str | None
+
+class TeacherStatisticsResponse(BaseModel):
+    teacher_class_stats: List[SectionStats]
+    school_summary: List[SectionSummary]
+    question_stats: Dict[int, List[QuestionStats]]
+
+class StatisticsResponse(BaseModel):
+    # Admin view; students get the same shape, empty.
+    per_class: Dict[str, List[SectionStats]]
+    overall_summary: List[SectionSummary]
+    question_stats: Dict[int, List[QuestionStats]]
+
+@router.get("/", response_model=Union[TeacherStatisticsResponse, StatisticsResponse], summary="View advanced statistics")
+def view_statistics(request: Request, session = Depends(get_db), current_user = Depends(get_current_user)):
+    etag, body = stats_service.statistics(session, current_user, request.headers.get("if-none-match"))
+    if etag is None:
+        return FastJSONResponse(body)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(body, headers=headers)
+
+@router.get("/trends", summary="Statistics time series per section (day or week buckets)")
+def view_trends(
+    period: str = Query("day", regex="^(day|week)$"),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    school_id: str | None = None,
+    class_name: str | None = None,
+    section: List[int] | None = Query(None),
+    session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    return stats_service.trends(session, current_user, period, date_from, date_to, school_id, class_name, section)
+
+@router.get("/distribution", summary="Score histograms and percentiles per section")
+def view_distribution(
+    school_id: str | None = None,
+    class_name: str | None = None,
+    section: List[int] | None = Query(None),
+    session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Without class_name the school histograms are used; admins without
+    # school_id get every school merged.
     if current_user["role"] == "teacher":
-        teacher_class = current_user["class_name"]
-        teacher_sections = []
-        if current_user.get("registered_section"):
-            try:
-                teacher_sections = [int(x.strip()) for x in current_user["registered_section"].split(",") if x.strip().isdigit()]
-            except:
-                teacher_sections = []
-        if not teacher_sections:
-            teacher_sections = [1, 2, 3, 4]
-        # Teacher's own class statistics
-        class_stats_result = session.run("""
-        MATCH (st:Statistics {class_name: $class_name})
-        WHERE st.section_number IN $sections
-        RETURN st
-        """, {"class_name": teacher_class, "sections": teacher_sections})
-        teacher_class_stats = []
-        for record in class_stats_result:
-            st = record["st"]
-            total = st["correct_questions"] + st["wrong_questions"]
-            teacher_class_stats.append({
-                "section_number": st["section_number"],
-                "section_name": subject_mapping.get(st["section_number"], f"Section {st['section_number']}"),
-                "correct_answers": st["correct_questions"],
-                "wrong_answers": st["wrong_questions"],
-                "exam_takers": st["exam_takers"],
-                "success_rate": round((st["correct_questions"]/total)*100, 2) if total > 0 else 0
-            })
-        # School-wide summary statistics (aggregated from all classes)
-        school_stats_result = session.run("""
-        MATCH (st:Statistics {school_id: $school_id})
-        WHERE st.section_number IN $sections
-        RETURN st
-        """, {"school_id": current_user.get("school_id"), "sections": teacher_sections})
-        school_summary_dict = {}
-        for record in school_stats_result:
-            st = record["st"]
-            sec = st["section_number"]
-            if sec not in school_summary_dict:
-                school_summary_dict[sec] = {
-                    "section_number": sec,
-                    "section_name": subject_mapping.get(sec, f"Section {sec}"),
-                    "correct_answers_total": 0,
-                    "wrong_answers_total": 0,
-                    "exam_takers": 0
-                }
-            school_summary_dict[sec]["correct_answers_total"] += st["correct_questions"]
-            school_summary_dict[sec]["wrong_answers_total"] += st["wrong_questions"]
-            school_summary_dict[sec]["exam_takers"] += st["exam_takers"]
-        school_summary = []
-        for sec, data in school_summary_dict.items():
-            total = data["correct_answers_total"] + data["wrong_answers_total"]
-            data["success_rate"] = round((data["correct_answers_total"]/total)*100, 2) if total > 0 else 0
-            school_summary.append(data)
-        # Per-question statistics for each section:
-        question_stats = {}
-        for sec in teacher_sections:
-            qs_result = session.run("""
-            MATCH (q:Question {section: $section})
-            OPTIONAL MATCH (q)<-[r:FOR_QUESTION]-(ea:ExamAnswer)
-            RETURN q.question AS question_text,
-            coalesce(count(CASE WHEN ea.points_earned = q.points THEN 1 ELSE null END), 0) AS correct_count,
-            coalesce(count(CASE WHEN ea.points_earned = 0 THEN 1 ELSE null END), 0) AS wrong_count
-            """, {"section": sec})
-            qs = [record for record in qs_result]
-            if not qs:
-                qs_result = session.run("""
-                MATCH (q:Question {section: $section})
-                RETURN q.question AS question_text, 0 AS correct_count, 0 AS wrong_count
-                """, {"section": sec})
-                qs = [record for record in qs_result]
-            question_stats[sec] = qs
-        return {
-            "teacher_class_stats": teacher_class_stats,
-            "school_summary": school_summary,
-            "question_stats": question_stats
-        }
-    elif current_user["role"] == "admin":
-        result = session.run("""
-        MATCH (st:Statistics)
-        RETURN st
-        """)
-        per_class = {}
-        overall_summary_dict = {}
-        for record in result:
-            st = record["st"]
-            cls = st["class_name"]
-            if cls not in per_class:
-                per_class[cls] = []
-            total = st["correct_questions"] + st["wrong_questions"]
-            stat_entry = {
-                "section_number": st["section_number"],
-                "section_name": subject_mapping.get(st["section_number"], f"Section {st['section_number']}"),
-                "correct_answers": st["correct_questions"],
-                "wrong_answers": st["wrong_questions"],
-                "exam_takers": st["exam_takers"],
-                "success_rate": round((st["correct_questions"]/total)*100, 2) if total > 0 else 0
-            }
-            per_class[cls].append(stat_entry)
-            # Aggregate overall summary by section
-            sec = st["section_number"]
-            if sec not in overall_summary_dict:
-                overall_summary_dict[sec] = {
-                    "section_number": sec,
-                    "section_name": subject_mapping.get(sec, f"Section {sec}"),
-                    "correct_answers_total": 0,
-                    "wrong_answers_total": 0,
-                    "exam_takers": 0
-                }
-            overall_summary_dict[sec]["correct_answers_total"] += st["correct_questions"]
-            overall_summary_dict[sec]["wrong_answers_total"] += st["wrong_questions"]
-            overall_summary_dict[sec]["exam_takers"] += st["exam_takers"]
-        overall_summary = []
-        for sec, data in overall_summary_dict.items():
-            total = data["correct_answers_total"] + data["wrong_answers_total"]
-            data["success_rate"] = round((data["correct_answers_total"]/total)*100, 2) if total > 0 else 0
-            overall_summary.append(data)
-        return {
-            "per_class": per_class,
-            "overall_summary": overall_summary,
-            "question_stats": {}  # Admin view does not include per-question stats
-        }
-    else:
-        return {
-            "per_class": {},
-            "overall_summary": [],
-            "question_stats": {}
-        }
+        school_id = current_user.get("school_id")
+        section = section or get_teacher_sections(current_user)
+    elif current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only teachers and admins can view distributions.")
+    if section and any(s not in SECTION_NUMBERS for s in section):
+        raise HTTPException(status_code=400, detail="Unknown section.")
+    return load_distribution(session, school_id, class_name, section)
+
+@router.get("/export", summary="Export a school's exam results (NDJSON or CSV)")
+def export_school_results(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    school_id: str | None = None,
+    class_name: str | None = None,
+    section: List[int] | None = Query(None),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    current_user = Depends(get_current_user)
+):
+    # Teachers export their own school; admins any school, or all without school_id.
+    if current_user["role"] == "teacher":
+        school_id = current_user.get("school_id")
+    elif current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only teachers and admins can export results.")
+    try:
+        params = export_params(school_id, class_name, section, date_from, date_to, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_export(get_db, params, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="school_{school_id or "all"}_results.{format}"'}
+    )
+
+@router.get("/metrics", summary="View in-process cache metrics (Admin)")
+def view_metrics(current_user = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view metrics.")
+    return {
+        "question_bank_cache": question_bank_cache.stats(),
+        "exam_paper_pool": exam_paper_pool.stats(),
+        "answer_key_cache": answer_key_cache.stats(),
+        "grading_pool": grading_pool.stats(),
+        "counter_buffer": counter_buffer.stats(),
+        "response_cache": response_cache.stats(),
+        "teacher_stats_cache": teacher_stats_cache.stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "static_assets": asset_manifest.stats(),
+        "compression": compression_stats.stats()
+    }
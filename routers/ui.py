@@ -1,14 +1,29 @@
 # routers/ui.py
-import httpx
-from fastapi import APIRouter, Request, Form, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+import os
+from fastapi import APIRouter, Request, Form, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from pydantic import ValidationError
 from starlette import status
-from tools.database import get_db  # Sadece Neo4j için kullanılacak
+from tools.database import get_db
+from tools.token_generator import resolve_user
+from tools.templating import templates
+from tools.utils import PasswordHasherBusy
+from routers.auth import RegisterRequest
+from services import auth as auth_service
+from services import users as users_service
+from services import exams as exams_service
+from services import questions as questions_service
+from services import results as results_service
+from services import stats as stats_service
 
+# The pages call the service functions the JSON routers use, in-process: one
+# UI hit is one request, with no loopback HTTP call holding a second worker.
 ui_router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-API_BASE_URL = "http://app:8000"  # Docker ortamı için
+BUSY_MESSAGE = "Too many sign-in requests, please try again shortly."
+# "async" queues the answers for the grading pool and shows the grading page;
+# "sync" grades inside the request like POST /exams/submit does by default.
+UI_SUBMIT_MODE = os.getenv("UI_SUBMIT_MODE", "async")
 
 def get_token_from_session(request: Request) -> str | None:
     return request.session.get("token")
@@ -16,6 +31,13 @@ def get_token_from_session(request: Request) -> str | None:
 def get_role_from_session(request: Request) -> str | None:
     return request.session.get("role")
 
+def session_user(session, token):
+    """The user behind the session's token, or None when it expired or the user is gone."""
+    try:
+        return resolve_user(session, token)
+    except HTTPException:
+        return None
+
 # School ID mapping (örnek)
 school_id_map = {}
 next_school_index = 1
@@ -57,6 +79,7 @@ def register_page(request: Request):
 @ui_router.post("/register", response_class=HTMLResponse)
 async def register_submit(
     request: Request,
+    session = Depends(get_db),
     role: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
@@ -80,19 +103,23 @@ async def register_submit(
     if role.lower() == "teacher" and registered_section.strip():
         payload["registered_section"] = registered_section.strip()
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(f"{API_BASE_URL}/auth/register", json=payload, timeout=10.0)
-            if r.status_code == 200:
-                return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
-            else:
-                return templates.TemplateResponse("register.html", {
-                    "request": request,
-                    "error": r.json().get("detail", "Register error")
-                })
-    except httpx.ReadTimeout:
+        body = RegisterRequest(**payload)
+        await auth_service.register(session, **body.dict())
+        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+    except ValidationError as e:
+        return templates.TemplateResponse("register.html", {
+            "request": request,
+            "error": "; ".join(err["msg"] for err in e.errors())
+        })
+    except HTTPException as e:
+        return templates.TemplateResponse("register.html", {
+            "request": request,
+            "error": e.detail or "Register error"
+        })
+    except PasswordHasherBusy:
         return templates.TemplateResponse("register.html", {
             "request": request,
-            "error": "The request timed out. Please try again later."
+            "error": BUSY_MESSAGE
         })
     except Exception as e:
         return templates.TemplateResponse("register.html", {
@@ -105,36 +132,40 @@ def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @ui_router.post("/login", response_class=HTMLResponse)
-def login_submit(
+async def login_submit(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
+    session = Depends(get_db),
 ):
-    with httpx.Client() as client:
-        r = client.post(f"{API_BASE_URL}/auth/login", json={"username": username, "password": password})
-        if r.status_code == 200:
-            data = r.json()
-            token = data.get("access_token")
-            role = data.get("role")
-            if not token:
-                return templates.TemplateResponse("login.html", {
-                    "request": request,
-                    "error": "No token received"
-                })
-            request.session["token"] = token
-            request.session["role"] = role
-            request.session["username"] = username
-            if role == "admin":
-                return RedirectResponse(url="/admin_menu", status_code=status.HTTP_303_SEE_OTHER)
-            elif role == "teacher":
-                return RedirectResponse(url="/teacher_menu", status_code=status.HTTP_303_SEE_OTHER)
-            else:
-                return RedirectResponse(url="/student_menu", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return templates.TemplateResponse("login.html", {
-                "request": request,
-                "error": r.json().get("detail", "Login error")
-            })
+    try:
+        data = await auth_service.login(session, username, password)
+    except HTTPException as e:
+        return templates.TemplateResponse("login.html", {
+            "request": request,
+            "error": e.detail or "Login error"
+        })
+    except PasswordHasherBusy:
+        return templates.TemplateResponse("login.html", {
+            "request": request,
+            "error": BUSY_MESSAGE
+        })
+    token = data.get("access_token")
+    role = data.get("role")
+    if not token:
+        return templates.TemplateResponse("login.html", {
+            "request": request,
+            "error": "No token received"
+        })
+    request.session["token"] = token
+    request.session["role"] = role
+    request.session["username"] = username
+    if role == "admin":
+        return RedirectResponse(url="/admin_menu", status_code=status.HTTP_303_SEE_OTHER)
+    elif role == "teacher":
+        return RedirectResponse(url="/teacher_menu", status_code=status.HTTP_303_SEE_OTHER)
+    else:
+        return RedirectResponse(url="/student_menu", status_code=status.HTTP_303_SEE_OTHER)
 
 @ui_router.get("/logout")
 def logout(request: Request):
@@ -144,64 +175,60 @@ def logout(request: Request):
 # ==================== Student Endpoints ====================
 
 @ui_router.get("/student_menu", response_class=HTMLResponse)
-def student_menu(request: Request):
+def student_menu(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "student":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        user_resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if user_resp.status_code == 200:
-            user_data = user_resp.json()
-            global next_school_index
-            if user_data["school_id"] not in school_id_map:
-                school_id_map[user_data["school_id"]] = next_school_index
-                next_school_index += 1
-            mapped_school_id = school_id_map[user_data["school_id"]]
-            left_attempts = max(0, 2 - user_data.get("attempts", 0))
-            return templates.TemplateResponse("student_menu.html", {
-                "request": request,
-                "user_info": user_data,
-                "mapped_school_id": mapped_school_id,
-                "left_attempts": left_attempts
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    user_data = session_user(session, token)
+    if user_data:
+        global next_school_index
+        if user_data["school_id"] not in school_id_map:
+            school_id_map[user_data["school_id"]] = next_school_index
+            next_school_index += 1
+        mapped_school_id = school_id_map[user_data["school_id"]]
+        left_attempts = max(0, 2 - user_data.get("attempts", 0))
+        return templates.TemplateResponse("student_menu.html", {
+            "request": request,
+            "user_info": user_data,
+            "mapped_school_id": mapped_school_id,
+            "left_attempts": left_attempts
+        })
+    else:
+        request.session.clear()
+        return RedirectResponse(url="/login")
 
 @ui_router.get("/student_solve_exam", response_class=HTMLResponse)
-def student_solve_exam(request: Request):
+def student_solve_exam(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "student":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        user_resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if user_resp.status_code != 200:
-            request.session.clear()
-            return RedirectResponse(url="/login")
-        user_data = user_resp.json()
-        if user_data.get("attempts", 0) >= 2:
-            return templates.TemplateResponse("student_no_attempts_left.html", {
-                "request": request,
-                "user_info": user_data
-            })
-        r = client.post(f"{API_BASE_URL}/exams/start", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            data = r.json()
-            exam_id = data["exam_id"]
-            questions = data["questions"]
-            return templates.TemplateResponse("student_solve_exam.html", {
-                "request": request,
-                "exam_id": exam_id,
-                "sections": questions,
-            })
-        else:
-            return HTMLResponse(f"Exam could not be started: {r.text}", status_code=400)
+    user_data = session_user(session, token)
+    if not user_data:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    if user_data.get("attempts", 0) >= 2:
+        return templates.TemplateResponse("student_no_attempts_left.html", {
+            "request": request,
+            "user_info": user_data
+        })
+    try:
+        data = exams_service.start_exam(session, user_data)
+    except HTTPException as e:
+        return HTMLResponse(f"Exam could not be started: {e.detail}", status_code=400)
+    exam_id = data["exam_id"]
+    questions = data["questions"]
+    return templates.TemplateResponse("student_solve_exam.html", {
+        "request": request,
+        "exam_id": exam_id,
+        "sections": questions,
+    })
 
 @ui_router.post("/student_submit_exam", response_class=HTMLResponse)
 async def student_submit_exam(
     request: Request,
+    session = Depends(get_db),
 ):
     token = request.session.get("token")
     role = request.session.get("role")
@@ -215,117 +242,135 @@ async def student_submit_exam(
             value_list = form_data.getlist(key)
             answers_payload[question_id] = {"selected_texts": value_list}
     exam_id = form_data.get("exam_id")
-    submit_data = {
-        "exam_id": exam_id,
-        "answers": answers_payload
-    }
-    async with httpx.AsyncClient() as client:
-        r = await client.post(
-            f"{API_BASE_URL}/exams/submit",
-            headers={"Authorization": f"Bearer {token}"},
-            json=submit_data
-        )
-        if r.status_code == 200:
-            return RedirectResponse(url="/student_view_results?exam_submitted=1", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return HTMLResponse(f"Exam could not be submitted: {r.text}", status_code=400)
+
+    def submit():
+        user_data = session_user(session, token)
+        if not user_data:
+            raise HTTPException(status_code=401, detail="Session expired, please log in again.")
+        return exams_service.submit(session, user_data, exam_id, answers_payload, mode=UI_SUBMIT_MODE)
+
+    # The Neo4j writes are blocking, so they run on the threadpool.
+    try:
+        result = await run_in_threadpool(submit)
+    except HTTPException as e:
+        return HTMLResponse(f"Exam could not be submitted: {e.detail}", status_code=400)
+    if result.get("status") == "pending":
+        submission_id = result.get("submission_id")
+        return RedirectResponse(url=f"/student_grading?submission_id={submission_id}", status_code=status.HTTP_303_SEE_OTHER)
+    return RedirectResponse(url="/student_view_results?exam_submitted=1", status_code=status.HTTP_303_SEE_OTHER)
+
+@ui_router.get("/student_grading", response_class=HTMLResponse)
+def student_grading(request: Request, submission_id: str):
+    token = request.session.get("token")
+    role = request.session.get("role")
+    if not token or role != "student":
+        return RedirectResponse(url="/login")
+    return templates.TemplateResponse("student_grading.html", {
+        "request": request,
+        "submission_id": submission_id
+    })
+
+@ui_router.get("/student_submission_status")
+def student_submission_status(request: Request, submission_id: str, session = Depends(get_db)):
+    token = request.session.get("token")
+    role = request.session.get("role")
+    if not token or role != "student":
+        return JSONResponse({"status": "error", "error": "Not logged in."}, status_code=401)
+    try:
+        user_data = resolve_user(session, token)
+        return JSONResponse(exams_service.submission_status(session, user_data, submission_id))
+    except HTTPException as e:
+        return JSONResponse({"status": "error", "error": e.detail or "Unknown submission"}, status_code=e.status_code)
 
 @ui_router.get("/student_view_results", response_class=HTMLResponse)
-def student_view_results(request: Request):
+def student_view_results(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "student":
         return RedirectResponse(url="/login")
     hide_back = bool(request.query_params.get("exam_submitted", None))
-    with httpx.Client() as client:
-        r = client.get(f"{API_BASE_URL}/students/results_v2", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            data = r.json()
-            return templates.TemplateResponse(
-                "student_view_results.html",
-                {
-                    "request": request,
-                    "results_data": data,
-                    "hide_back_button": hide_back
-                }
-            )
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    try:
+        data = results_service.student_results(session, resolve_user(session, token))
+    except HTTPException:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    return templates.TemplateResponse(
+        "student_view_results.html",
+        {
+            "request": request,
+            "results_data": data,
+            "hide_back_button": hide_back
+        }
+    )
 
 # ==================== Admin Endpoints ====================
 
 @ui_router.get("/admin_menu", response_class=HTMLResponse)
-def admin_menu(request: Request):
+def admin_menu(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "admin":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        user_resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if user_resp.status_code == 200:
-            user_data = user_resp.json()
-            global next_school_index
-            if user_data["school_id"] not in school_id_map:
-                school_id_map[user_data["school_id"]] = next_school_index
-                next_school_index += 1
-            mapped_school_id = school_id_map[user_data["school_id"]]
-            msg = request.query_params.get("msg", "")
-            return templates.TemplateResponse("admin_menu.html", {
-                "request": request,
-                "user_info": user_data,
-                "mapped_school_id": mapped_school_id,
-                "msg": msg
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    user_data = session_user(session, token)
+    if user_data:
+        global next_school_index
+        if user_data["school_id"] not in school_id_map:
+            school_id_map[user_data["school_id"]] = next_school_index
+            next_school_index += 1
+        mapped_school_id = school_id_map[user_data["school_id"]]
+        msg = request.query_params.get("msg", "")
+        return templates.TemplateResponse("admin_menu.html", {
+            "request": request,
+            "user_info": user_data,
+            "mapped_school_id": mapped_school_id,
+            "msg": msg
+        })
+    else:
+        request.session.clear()
+        return RedirectResponse(url="/login")
 
 @ui_router.get("/admin_list_users", response_class=HTMLResponse)
-def admin_list_users(request: Request):
+def admin_list_users(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "admin":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        r = client.get(f"{API_BASE_URL}/users/", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            users_data = r.json()
-            msg = request.query_params.get("msg", "")
-            return templates.TemplateResponse("admin_list_user.html", {
-                "request": request,
-                "users": users_data,
-                "msg": msg
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    try:
+        users_data = users_service.list_users(session, resolve_user(session, token))
+    except HTTPException:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    msg = request.query_params.get("msg", "")
+    return templates.TemplateResponse("admin_list_user.html", {
+        "request": request,
+        "users": users_data,
+        "msg": msg
+    })
 
 @ui_router.get("/admin_update_user", response_class=HTMLResponse)
-def admin_update_user_form(request: Request, username: str):
+def admin_update_user_form(request: Request, username: str, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "admin":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        r = client.get(f"{API_BASE_URL}/users/", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code != 200:
-            request.session.clear()
-            return RedirectResponse(url="/login")
-        all_users = r.json()
-        target_user = None
-        for u in all_users:
-            if u["username"] == username:
-                target_user = u
-                break
-        if not target_user:
-            return HTMLResponse("User to update not found", status_code=404)
-        msg = request.query_params.get("msg", "")
-        return templates.TemplateResponse("admin_update_user.html", {
-            "request": request,
-            "user_info": target_user,
-            "msg": msg
-        })
+    try:
+        all_users = users_service.list_users(session, resolve_user(session, token))
+    except HTTPException:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    target_user = None
+    for u in all_users:
+        if u["username"] == username:
+            target_user = u
+            break
+    if not target_user:
+        return HTMLResponse("User to update not found", status_code=404)
+    msg = request.query_params.get("msg", "")
+    return templates.TemplateResponse("admin_update_user.html", {
+        "request": request,
+        "user_info": target_user,
+        "msg": msg
+    })
 
 @ui_router.post("/admin_update_user", response_class=HTMLResponse)
 def admin_update_user_submit(
@@ -337,92 +382,94 @@ def admin_update_user_submit(
     class_name: str = Form(...),
     role: str = Form(...),
     registered_section: str = Form(""),
-    new_password: str = Form("")
+    new_password: str = Form(""),
+    session = Depends(get_db)
 ):
     token = request.session.get("token")
     role_session = request.session.get("role")
     if not token or role_session != "admin":
         return RedirectResponse(url="/login")
-    payload = {
-        "username": username,
-        "name": name,
-        "surname": surname,
-        "class_name": class_name,
-        "role": role,
-        "registered_section": registered_section
-    }
-    if new_password.strip():
-        payload["new_password"] = new_password.strip()
-    with httpx.Client() as client:
-        r = client.put(
-            f"{API_BASE_URL}/users/{user_id}",
-            headers={"Authorization": f"Bearer {token}"},
-            json=payload
+    try:
+        users_service.admin_update_user(
+            session, resolve_user(session, token), user_id,
+            name=name,
+            surname=surname,
+            class_name=class_name,
+            role=role,
+            registered_section=registered_section,
+            new_password=new_password.strip() or None
         )
-        if r.status_code == 200:
-            return RedirectResponse(url=f"/admin_list_users?msg=User+{username}+successfully+updated", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return RedirectResponse(url=f"/admin_update_user?username={username}&msg=Update+error:{r.text}", status_code=status.HTTP_303_SEE_OTHER)
+    except HTTPException as e:
+        return RedirectResponse(url=f"/admin_update_user?username={username}&msg=Update+error:{e.detail}", status_code=status.HTTP_303_SEE_OTHER)
+    return RedirectResponse(url=f"/admin_list_users?msg=User+{username}+successfully+updated", status_code=status.HTTP_303_SEE_OTHER)
 
 @ui_router.get("/admin_delete_user", response_class=HTMLResponse)
-def admin_delete_user(request: Request, username: str):
+def admin_delete_user(request: Request, username: str, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "admin":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        r = client.delete(f"{API_BASE_URL}/users/{username}", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            return RedirectResponse(url="/admin_list_users?msg=User+deleted", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return RedirectResponse(url=f"/admin_list_users?msg=User+could+not+be+deleted:{r.text}", status_code=status.HTTP_303_SEE_OTHER)
+    try:
+        users_service.admin_delete_user(session, resolve_user(session, token), username)
+    except HTTPException as e:
+        return RedirectResponse(url=f"/admin_list_users?msg=User+could+not+be+deleted:{e.detail}", status_code=status.HTTP_303_SEE_OTHER)
+    return RedirectResponse(url="/admin_list_users?msg=User+deleted", status_code=status.HTTP_303_SEE_OTHER)
+
+def stats_page_data(session, user):
+    """
+    Statistics view (with its ETag, the fragment cache key of the stats
+    tables) and weekly trends for the stats pages; trends are optional.
+    """
+    stats_etag, stats_data = stats_service.statistics(session, user)
+    try:
+        trends = stats_service.trends(session, user, period="week")
+    except HTTPException:
+        trends = None
+    return stats_etag, stats_data, trends
 
 @ui_router.get("/admin_view_stats", response_class=HTMLResponse)
-def admin_view_stats(request: Request):
+def admin_view_stats(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "admin":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        # Use trailing slash to avoid redirect
-        r = client.get(f"{API_BASE_URL}/stats/", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            stats_data = r.json()
-            return templates.TemplateResponse("admin_view_stats.html", {
-                "request": request, 
-                "stats": stats_data, 
-                "overall_summary": stats_data.get("overall_summary", []), 
-                "per_class": stats_data.get("per_class", {})
-            })
-        else:
-            return HTMLResponse("Unable to fetch statistics", status_code=400)
+    try:
+        stats_etag, stats_data, trends = stats_page_data(session, resolve_user(session, token))
+    except HTTPException:
+        return HTMLResponse("Unable to fetch statistics", status_code=400)
+    return templates.TemplateResponse("admin_view_stats.html", {
+        "request": request,
+        "stats": stats_data,
+        "stats_etag": stats_etag,
+        "overall_summary": stats_data.get("overall_summary", []),
+        "per_class": stats_data.get("per_class", {}),
+        "trends": trends
+    })
 # ==================== Teacher Endpoints ====================
 
 @ui_router.get("/teacher_menu", response_class=HTMLResponse)
-def teacher_menu(request: Request):
+def teacher_menu(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "teacher":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        user_resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if user_resp.status_code == 200:
-            user_data = user_resp.json()
-            global next_school_index
-            if user_data["school_id"] not in school_id_map:
-                school_id_map[user_data["school_id"]] = next_school_index
-                next_school_index += 1
-            mapped_school_id = school_id_map[user_data["school_id"]]
-            msg = request.query_params.get("msg", "")
-            return templates.TemplateResponse("teacher_menu.html", {
-                "request": request,
-                "user_info": user_data,
-                "mapped_school_id": mapped_school_id,
-                "msg": msg
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    user_data = session_user(session, token)
+    if user_data:
+        global next_school_index
+        if user_data["school_id"] not in school_id_map:
+            school_id_map[user_data["school_id"]] = next_school_index
+            next_school_index += 1
+        mapped_school_id = school_id_map[user_data["school_id"]]
+        msg = request.query_params.get("msg", "")
+        return templates.TemplateResponse("teacher_menu.html", {
+            "request": request,
+            "user_info": user_data,
+            "mapped_school_id": mapped_school_id,
+            "msg": msg
+        })
+    else:
+        request.session.clear()
+        return RedirectResponse(url="/login")
 
 @ui_router.get("/teacher_add_question", response_class=HTMLResponse)
 def teacher_add_question_form(request: Request):
@@ -450,116 +497,109 @@ def teacher_add_question_submit(
     multi_d: str = Form("", alias="multi_D"),
     tf_correct: str = Form("", alias="tf_correct"),
     ordering_correct: str = Form("", alias="ordering_correct"),
-    ordering_all: str = Form("", alias="ordering_all")
+    ordering_all: str = Form("", alias="ordering_all"),
+    session = Depends(get_db)
 ):
     token = request.session.get("token")
     role_session = request.session.get("role")
     if not token or role_session != "teacher":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        me_resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if me_resp.status_code != 200:
-            request.session.clear()
-            return RedirectResponse(url="/login")
-        me_data = me_resp.json()
-        teacher_section = me_data.get("registered_section")
-        if not teacher_section:
-            return HTMLResponse("You do not have a registered section, you cannot add questions.", status_code=400)
-        choices_list = []
-        if q_type == "true_false":
-            correct_val = tf_correct.strip().lower()
-            choices_list = [
-                {"choice_text": "True", "is_correct": (correct_val == "true"), "correct_position": None},
-                {"choice_text": "False", "is_correct": (correct_val == "false"), "correct_position": None}
-            ]
-        elif q_type == "single_choice":
-            sc = single_correct.upper()
-            choices_list = [
-                {"choice_text": single_a.strip(), "is_correct": (sc == "A"), "correct_position": None},
-                {"choice_text": single_b.strip(), "is_correct": (sc == "B"), "correct_position": None},
-                {"choice_text": single_c.strip(), "is_correct": (sc == "C"), "correct_position": None},
-                {"choice_text": single_d.strip(), "is_correct": (sc == "D"), "correct_position": None},
-            ]
-        elif q_type == "multiple_choice":
-            correct_set = {x.upper() for x in multi_correct}
-            choices_list = [
-                {"choice_text": multi_a.strip(), "is_correct": ("A" in correct_set), "correct_position": None},
-                {"choice_text": multi_b.strip(), "is_correct": ("B" in correct_set), "correct_position": None},
-                {"choice_text": multi_c.strip(), "is_correct": ("C" in correct_set), "correct_position": None},
-                {"choice_text": multi_d.strip(), "is_correct": ("D" in correct_set), "correct_position": None},
-            ]
-        elif q_type == "ordering":
-            correct_seq = [x.strip() for x in ordering_correct.split(",")] if ordering_correct.strip() else []
-            ordering_list = [x.strip() for x in ordering_all.split(",")] if ordering_all.strip() else []
-            correct_map = {}
-            for idx, val in enumerate(correct_seq):
-                correct_map[val.lower()] = idx
-            for item in ordering_list:
-                key = item.lower()
-                cp = correct_map.get(key, None)
-                choices_list.append({
-                    "choice_text": item,
-                    "is_correct": False,
-                    "correct_position": cp
-                })
-        payload = {
-            "question_text": question_text,
-            "q_type": q_type,
-            "points": points,
-            "section": int(teacher_section),
-            "choices": choices_list
-        }
-        r = client.post(
-            f"{API_BASE_URL}/questions/",
-            headers={"Authorization": f"Bearer {token}"},
-            json=payload
-        )
-        if r.status_code == 200:
-            return RedirectResponse(url="/teacher_menu?msg=Question+added", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return templates.TemplateResponse("teacher_add_question.html", {
-                "request": request,
-                "msg": f"Question could not be added: {r.text}"
+    me_data = session_user(session, token)
+    if not me_data:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    teacher_section = me_data.get("registered_section")
+    if not teacher_section:
+        return HTMLResponse("You do not have a registered section, you cannot add questions.", status_code=400)
+    choices_list = []
+    if q_type == "true_false":
+        correct_val = tf_correct.strip().lower()
+        choices_list = [
+            {"choice_text": "True", "is_correct": (correct_val == "true"), "correct_position": None},
+            {"choice_text": "False", "is_correct": (correct_val == "false"), "correct_position": None}
+        ]
+    elif q_type == "single_choice":
+        sc = single_correct.upper()
+        choices_list = [
+            {"choice_text": single_a.strip(), "is_correct": (sc == "A"), "correct_position": None},
+            {"choice_text": single_b.strip(), "is_correct": (sc == "B"), "correct_position": None},
+            {"choice_text": single_c.strip(), "is_correct": (sc == "C"), "correct_position": None},
+            {"choice_text": single_d.strip(), "is_correct": (sc == "D"), "correct_position": None},
+        ]
+    elif q_type == "multiple_choice":
+        correct_set = {x.upper() for x in multi_correct}
+        choices_list = [
+            {"choice_text": multi_a.strip(), "is_correct": ("A" in correct_set), "correct_position": None},
+            {"choice_text": multi_b.strip(), "is_correct": ("B" in correct_set), "correct_position": None},
+            {"choice_text": multi_c.strip(), "is_correct": ("C" in correct_set), "correct_position": None},
+            {"choice_text": multi_d.strip(), "is_correct": ("D" in correct_set), "correct_position": None},
+        ]
+    elif q_type == "ordering":
+        correct_seq = [x.strip() for x in ordering_correct.split(",")] if ordering_correct.strip() else []
+        ordering_list = [x.strip() for x in ordering_all.split(",")] if ordering_all.strip() else []
+        correct_map = {}
+        for idx, val in enumerate(correct_seq):
+            correct_map[val.lower()] = idx
+        for item in ordering_list:
+            key = item.lower()
+            cp = correct_map.get(key, None)
+            choices_list.append({
+                "choice_text": item,
+                "is_correct": False,
+                "correct_position": cp
             })
+    payload = {
+        "question_text": question_text,
+        "q_type": q_type,
+        "points": points,
+        "section": int(teacher_section),
+        "choices": choices_list
+    }
+    try:
+        questions_service.add_question(session, me_data, **payload)
+    except HTTPException as e:
+        return templates.TemplateResponse("teacher_add_question.html", {
+            "request": request,
+            "msg": f"Question could not be added: {e.detail}"
+        })
+    return RedirectResponse(url="/teacher_menu?msg=Question+added", status_code=status.HTTP_303_SEE_OTHER)
 
 @ui_router.get("/teacher_view_stats", response_class=HTMLResponse)
-def teacher_view_stats(request: Request):
+def teacher_view_stats(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     role = request.session.get("role")
     if not token or role != "teacher":
         return RedirectResponse(url="/login")
-    with httpx.Client() as client:
-        r = client.get(f"{API_BASE_URL}/stats/", headers={"Authorization": f"Bearer {token}"})
-        if r.status_code == 200:
-            stats_data = r.json()
-            return templates.TemplateResponse("teacher_view_stats.html", {
-                "request": request,
-                "stats": stats_data
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    try:
+        stats_etag, stats_data, trends = stats_page_data(session, resolve_user(session, token))
+    except HTTPException:
+        request.session.clear()
+        return RedirectResponse(url="/login")
+    return templates.TemplateResponse("teacher_view_stats.html", {
+        "request": request,
+        "stats": stats_data,
+        "stats_etag": stats_etag,
+        "trends": trends
+    })
 
 # ==================== Common: Update Profile =====================
 
 @ui_router.get("/user_profile", response_class=HTMLResponse)
-def user_profile_get(request: Request):
+def user_profile_get(request: Request, session = Depends(get_db)):
     token = request.session.get("token")
     if not token:
         return RedirectResponse(url="/login")
     msg = request.query_params.get("msg", "")
-    with httpx.Client() as client:
-        resp = client.get(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"})
-        if resp.status_code == 200:
-            user_data = resp.json()
-            return templates.TemplateResponse("user_profile.html", {
-                "request": request,
-                "user_data": user_data,
-                "msg": msg
-            })
-        else:
-            request.session.clear()
-            return RedirectResponse(url="/login")
+    user_data = session_user(session, token)
+    if user_data:
+        return templates.TemplateResponse("user_profile.html", {
+            "request": request,
+            "user_data": user_data,
+            "msg": msg
+        })
+    else:
+        request.session.clear()
+        return RedirectResponse(url="/login")
 
 @ui_router.post("/user_profile", response_class=HTMLResponse)
 def user_profile_post(
@@ -567,23 +607,20 @@ def user_profile_post(
     name: str = Form(""),
     surname: str = Form(""),
     class_name: str = Form(""),
-    new_password: str = Form("")
+    new_password: str = Form(""),
+    session = Depends(get_db)
 ):
     token = request.session.get("token")
     if not token:
         return RedirectResponse(url="/login")
-    payload = {}
-    if name:
-        payload["name"] = name
-    if surname:
-        payload["surname"] = surname
-    if class_name:
-        payload["class_name"] = class_name
-    if new_password.strip():
-        payload["new_password"] = new_password.strip()
-    with httpx.Client() as client:
-        r = client.put(f"{API_BASE_URL}/users/me", headers={"Authorization": f"Bearer {token}"}, json=payload)
-        if r.status_code == 200:
-            return RedirectResponse(url="/user_profile?msg=Profile+updated", status_code=status.HTTP_303_SEE_OTHER)
-        else:
-            return RedirectResponse(url=f"/user_profile?msg=Profile+update+error:{r.text}", status_code=status.HTTP_303_SEE_OTHER)
+    try:
+        users_service.update_profile(
+            session, resolve_user(session, token),
+            name=name or None,
+            surname=surname or None,
+            class_name=class_name or None,
+            new_password=new_password.strip() or None
+        )
+    except HTTPException as e:
+        return RedirectResponse(url=f"/user_profile?msg=Profile+update+error:{e.detail}", status_code=status.HTTP_303_SEE_OTHER)
+    return RedirectResponse(url="/user_profile?msg=Profile+updated", status_code=status.HTTP_303_SEE_OTHER)
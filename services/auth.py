@@ -0,0 +1,41 @@
+# services/auth.py
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from tools.user import register_user, find_user_by_username
+from tools.utils import password_hasher
+from tools.token_generator import create_access_token
+
+# Both are coroutines: bcrypt runs on the password pool (a full pool raises
+# PasswordHasherBusy, answered with 503) and the Neo4j calls on the threadpool,
+# so request threads are never held by hashing during a login storm.
+
+async def login(session, username, password):
+    user = await run_in_threadpool(find_user_by_username, session, username)
+    if not user or not await password_hasher.check_async(password, user["password"]):
+        raise HTTPException(status_code=401, detail="Invalid username or password.")
+    return {
+        "access_token": create_access_token(user["user_id"]),
+        "token_type": "bearer",
+        "role": user["role"]
+    }
+
+async def register(session, username, password, name, surname, class_name, role, registered_section=None):
+    # A taken username is answered before any hashing work is queued.
+    if await run_in_threadpool(find_user_by_username, session, username):
+        raise HTTPException(status_code=400, detail="Username already exists or default school not found.")
+    password_hash = await password_hasher.hash_async(password)
+    success = await run_in_threadpool(
+        register_user,
+        session=session,
+        username=username,
+        password=password,
+        name=name,
+        surname=surname,
+        class_name=class_name,
+        role=role,
+        registered_section=registered_section,
+        password_hash=password_hash,
+    )
+    if not success:
+        raise HTTPException(status_code=400, detail="Username already exists or default school not found.")
+    return {"message": "Registration successful."}
@@ -0,0 +1,78 @@
+# services/exams.py
+from fastapi import HTTPException
+from tools.exam import create_exam, question_payload, thaw_paper
+from tools.exam_pool import draw_paper
+from tools.submissions import submit_exam, record_submission, get_submission, grading_pool
+
+def start_exam(session, current_user):
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="Only students can start an exam.")
+    if current_user.get("attempts", 0) >= 2:
+        raise HTTPException(status_code=400, detail="You have no remaining exam attempts.")
+
+    # Check for ongoing exam
+    query = """
+    MATCH (e:Exam {user_id: $user_id})
+    WHERE e.status IN ['in_progress', 'grading']
+    RETURN e ORDER BY e.status ASC LIMIT 1
+    """
+    result = session.run(query, {"user_id": current_user["user_id"]})
+    record = result.single()
+    if record and record["e"]["status"] == "grading":
+        raise HTTPException(status_code=409, detail="Your previous exam is still being graded.")
+    if record:
+        exam_node = record["e"]
+        if exam_node.get("paper"):
+            questions_data = thaw_paper(exam_node["paper"])
+        else:
+            # Exams created before paper snapshots existed.
+            q_result = session.run("""
+            MATCH (e:Exam {exam_id: $exam_id})-[:CONTAINS]->(q:Question)
+            OPTIONAL MATCH (q)-[:HAS_CHOICE]->(c:Choice)
+            RETURN q, collect(c) as choices
+            """, {"exam_id": exam_node["exam_id"]})
+            questions_data = {}
+            for rec in q_result:
+                q = dict(rec["q"])
+                q["choices"] = [dict(c) for c in rec["choices"] if c is not None]
+                questions_data.setdefault(q["section"], []).append(question_payload(q))
+        return {
+            "message": "You have an exam in progress. Please resume it.",
+            "exam_id": exam_node["exam_id"],
+            "questions": questions_data,
+            "status": exam_node["status"]
+        }
+
+    # Create new exam
+    selected_questions = draw_paper(session)
+    if not selected_questions:
+        raise HTTPException(status_code=400, detail="No questions available.")
+    exam_id, questions_data = create_exam(session, current_user, selected_questions)
+    if not exam_id:
+        raise HTTPException(status_code=400, detail="Exam could not be created.")
+    return {
+        "message": "Exam started",
+        "exam_id": exam_id,
+        "questions": questions_data,
+        "status": "in_progress"
+    }
+
+def submit(session, current_user, exam_id, answers, mode="sync"):
+    """
+    Grades the answers in the request (mode 'sync') or queues them for the
+    grading pool (mode 'async', status 'pending' in the returned body).
+    """
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="Only students can submit exam answers.")
+    if current_user.get("attempts", 0) >= 2:
+        raise HTTPException(status_code=400, detail="You have no remaining exam attempts.")
+    if mode == "async":
+        # Answers are stored durably and graded by the worker pool.
+        submission_id = record_submission(session, current_user, exam_id, answers)
+        grading_pool.enqueue(submission_id)
+        return {"message": "Exam received, grading in progress.", "submission_id": submission_id, "status": "pending"}
+    submit_exam(session, current_user, exam_id, answers)
+    return {"message": "Exam submitted successfully."}
+
+def submission_status(session, current_user, submission_id):
+    return get_submission(session, current_user, submission_id)
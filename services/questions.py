@@ -0,0 +1,52 @@
+# services/questions.py
+from fastapi import HTTPException
+from uuid import uuid4
+from tools.question_bank import bump_bank_version
+from tools.answer_keys import answer_key_cache
+from tools.stats_cache import teacher_stats_cache
+
+def add_question(session, current_user, question_text, q_type, points, section, choices):
+    """choices: dicts with choice_text, is_correct and correct_position."""
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Only teachers can add questions.")
+    external_id = str(uuid4())
+    question_id = str(uuid4())
+    session.run("""
+    CREATE (q:Question {
+        id: $id,
+        external_id: $external_id,
+        section: $section,
+        question: $question,
+        points: $points,
+        type: $q_type
+    })
+    """, {
+        "id": question_id,
+        "external_id": external_id,
+        "section": section,
+        "question": question_text,
+        "points": points,
+        "q_type": q_type
+    })
+    for ch in choices:
+        choice_id = str(uuid4())
+        session.run("""
+        MATCH (q:Question {id: $question_id})
+        CREATE (c:Choice {
+            id: $choice_id,
+            choice_text: $choice_text,
+            is_correct: $is_correct,
+            correct_position: $correct_position
+        })
+        CREATE (q)-[:HAS_CHOICE]->(c)
+        """, {
+            "question_id": question_id,
+            "choice_id": choice_id,
+            "choice_text": ch["choice_text"].strip(),
+            "is_correct": ch.get("is_correct") or False,
+            "correct_position": ch.get("correct_position")
+        })
+    bump_bank_version(session)
+    answer_key_cache.invalidate([question_id])
+    teacher_stats_cache.invalidate()
+    return {"message": "Question added successfully with new DB schema", "external_id": external_id}
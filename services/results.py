@@ -0,0 +1,14 @@
+# services/results.py
+from fastapi import HTTPException
+from tools.results import load_exam_results, results_etag
+from tools.http_cache import response_cache
+
+def student_results_etag(session, current_user):
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="Only students can view their exam results.")
+    return results_etag(session, current_user)
+
+def student_results(session, current_user, etag=None):
+    """The student's results page data, shared through the response cache under its ETag."""
+    etag = etag or student_results_etag(session, current_user)
+    return response_cache.get_or_build(etag, lambda: load_exam_results(session, current_user))
@@ -0,0 +1,149 @@
+# services/stats.py
+from fastapi import HTTPException
+from tools.statistics_utils import statistics_revision, rollup_summary
+from tools.http_cache import response_cache, make_etag, etag_matches
+from tools.stats_cache import teacher_stats_cache
+from tools.trends import trend_range, load_trends
+from tools.grading import SECTION_NUMBERS
+
+subject_mapping = {1: "Math", 2: "English", 3: "Science", 4: "History"}
+
+def get_teacher_sections(user):
+    teacher_sections = []
+    if user.get("registered_section"):
+        try:
+            teacher_sections = [int(x.strip()) for x in user["registered_section"].split(",") if x.strip().isdigit()]
+        except:
+            teacher_sections = []
+    return teacher_sections or [1, 2, 3, 4]
+
+def statistics(session, current_user, if_none_match=None):
+    """
+    Returns (etag, body) of the statistics view; body is None when it matches
+    if_none_match, and etag is None for roles whose view is not cached.
+    """
+    if current_user["role"] == "teacher":
+        # Served from the teacher view cache without touching the database;
+        # submissions in the school drop the entry.
+        key = (current_user.get("school_id"), current_user["class_name"], tuple(get_teacher_sections(current_user)))
+        etag, body = teacher_stats_cache.get_or_build(key, lambda: build_statistics(session, current_user))
+    elif current_user["role"] == "admin":
+        etag = make_etag("stats", "admin", statistics_revision(session))
+        body = None
+    else:
+        return None, build_statistics(session, current_user)
+    if etag_matches(if_none_match, etag):
+        return etag, None
+    if body is None:
+        body = response_cache.get_or_build(etag, lambda: build_statistics(session, current_user))
+    return etag, body
+
+def build_statistics(session, current_user):
+    if current_user["role"] == "teacher":
+        teacher_class = current_user["class_name"]
+        teacher_sections = get_teacher_sections(current_user)
+        # Teacher's own class statistics
+        class_stats_result = session.run("""
+        MATCH (st:Statistics {class_name: $class_name})
+        WHERE st.section_number IN $sections
+        RETURN st
+        """, {"class_name": teacher_class, "sections": teacher_sections})
+        teacher_class_stats = []
+        for record in class_stats_result:
+            st = record["st"]
+            total = st["correct_questions"] + st["wrong_questions"]
+            teacher_class_stats.append({
+                "section_number": st["section_number"],
+                "section_name": subject_mapping.get(st["section_number"], f"Section {st['section_number']}"),
+                "correct_answers": st["correct_questions"],
+                "wrong_answers": st["wrong_questions"],
+                "exam_takers": st["exam_takers"],
+                "success_rate": round((st["correct_questions"]/total)*100, 2) if total > 0 else 0
+            })
+        # School-wide summary statistics, from the maintained per-school rollups
+        school_stats_result = session.run("""
+        MATCH (ss:SchoolStatistics {school_id: $school_id})
+        WHERE ss.section_number IN $sections
+        RETURN ss
+        """, {"school_id": current_user.get("school_id"), "sections": teacher_sections})
+        school_summary = rollup_summary([dict(record["ss"]) for record in school_stats_result])
+        # Per-question statistics for each section, from the answer counters the
+        # submit path keeps on every Question.
+        question_stats = {sec: [] for sec in teacher_sections}
+        qs_result = session.run("""
+        MATCH (q:Question)
+        WHERE q.section IN $sections
+        RETURN q.section AS section, q.question AS question_text,
+        coalesce(q.correct_count, 0) AS correct_count,
+        coalesce(q.zero_count, 0) AS wrong_count,
+        q.difficulty AS difficulty, q.discrimination AS discrimination,
+        q.distractor_effectiveness AS distractor_effectiveness, q.item_flag AS item_flag
+        """, {"sections": teacher_sections})
+        for record in qs_result:
+            question_stats[record["section"]].append({
+                "question_text": record["question_text"],
+                "correct_count": record["correct_count"],
+                "wrong_count": record["wrong_count"],
+                # Filled in by the offline item analysis job (tools/item_analysis.py).
+                "difficulty": record["difficulty"],
+                "discrimination": record["discrimination"],
+                "distractor_effectiveness": record["distractor_effectiveness"],
+                "item_flag": record["item_flag"]
+            })
+        return {
+            "teacher_class_stats": teacher_class_stats,
+            "school_summary": school_summary,
+            "question_stats": question_stats
+        }
+    elif current_user["role"] == "admin":
+        result = session.run("""
+        MATCH (st:Statistics)
+        RETURN st
+        """)
+        per_class = {}
+        for record in result:
+            st = record["st"]
+            cls = st["class_name"]
+            if cls not in per_class:
+                per_class[cls] = []
+            total = st["correct_questions"] + st["wrong_questions"]
+            stat_entry = {
+                "section_number": st["section_number"],
+                "section_name": subject_mapping.get(st["section_number"], f"Section {st['section_number']}"),
+                "correct_answers": st["correct_questions"],
+                "wrong_answers": st["wrong_questions"],
+                "exam_takers": st["exam_takers"],
+                "success_rate": round((st["correct_questions"]/total)*100, 2) if total > 0 else 0
+            }
+            per_class[cls].append(stat_entry)
+        # Overall summary, from the maintained global rollups
+        global_result = session.run("""
+        MATCH (gs:GlobalStatistics)
+        RETURN gs
+        """)
+        overall_summary = rollup_summary([dict(record["gs"]) for record in global_result])
+        return {
+            "per_class": per_class,
+            "overall_summary": overall_summary,
+            "question_stats": {}  # Admin view does not include per-question stats
+        }
+    else:
+        return {
+            "per_class": {},
+            "overall_summary": [],
+            "question_stats": {}
+        }
+
+def trends(session, current_user, period="day", date_from=None, date_to=None, school_id=None, class_name=None, section=None):
+    if current_user["role"] == "teacher":
+        school_id, class_name = current_user.get("school_id"), current_user["class_name"]
+        section = section or get_teacher_sections(current_user)
+    elif current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only teachers and admins can view trends.")
+    if section and any(s not in SECTION_NUMBERS for s in section):
+        raise HTTPException(status_code=400, detail="Unknown section.")
+    try:
+        start, end = trend_range(period, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return load_trends(session, period, start, end, school_id, class_name, section)
@@ -0,0 +1,73 @@
+# services/users.py
+from fastapi import HTTPException
+from tools.user import delete_user, update_user
+from tools.utils import hash_password
+
+def validate_password_strength(password: str) -> bool:
+    if len(password) < 8:
+        return False
+    if not any(c.isupper() for c in password):
+        return False
+    if not any(c.islower() for c in password):
+        return False
+    if not any(c.isdigit() for c in password):
+        return False
+    return True
+
+def _update_fields(new_password=None, **fields):
+    update_fields = {key: value for key, value in fields.items() if value is not None}
+    if new_password is not None and new_password.strip() != "":
+        if not validate_password_strength(new_password.strip()):
+            raise HTTPException(status_code=400, detail="Password does not meet complexity rules.")
+        update_fields["password"] = hash_password(new_password.strip())
+    return update_fields
+
+def update_profile(session, current_user, name=None, surname=None, class_name=None, new_password=None):
+    update_fields = _update_fields(new_password, name=name, surname=surname, class_name=class_name)
+    if not update_fields:
+        return {"message": "No changes provided."}
+    success = update_user(session, current_user, current_user["user_id"], **update_fields)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not updated.")
+    current_user_dict = dict(current_user)
+    current_user_dict.update(update_fields)
+    return {"message": "Profile updated successfully.", "user": current_user_dict}
+
+def list_users(session, current_user):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can list users.")
+    # Grafik modeline göre kullanıcı bilgilerini ilişkilerden almak için sorgu:
+    query = """
+    MATCH (u:User)
+    OPTIONAL MATCH (u)-[:BELONGS_TO]->(c:Class)
+    OPTIONAL MATCH (c)<-[:HAS_CLASS]-(s:School)
+    RETURN u, c.name as class_name, s.school_id as school_id
+    """
+    result = session.run(query)
+    users = []
+    for record in result:
+        # Node objesini dict'e çeviriyoruz
+        user = dict(record["u"])
+        user["class_name"] = record.get("class_name") or ""
+        user["school_id"] = record.get("school_id") or ""
+        users.append(user)
+    return users
+
+def admin_update_user(session, current_user, user_id, name=None, surname=None, class_name=None, role=None,
+                      registered_section=None, new_password=None):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can update users.")
+    update_fields = _update_fields(new_password, name=name, surname=surname, class_name=class_name, role=role,
+                                   registered_section=registered_section)
+    success = update_user(session, current_user, user_id, **update_fields)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found or not updated.")
+    return {"message": "User updated successfully."}
+
+def admin_delete_user(session, current_user, username):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can delete users.")
+    success = delete_user(session, current_user, username)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found or not deleted.")
+    return {"message": f"User {username} deleted successfully."}
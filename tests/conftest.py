@@ -0,0 +1,27 @@
+# tests/conftest.py
+import os
+import pytest
+
+@pytest.fixture
+def graph():
+    """
+    A session on a real, emptied Neo4j database for the queries' own tests.
+    Only runs when NEO4J_TEST_URI points at a throwaway database, since every
+    node in it is deleted before and after the test.
+    """
+    uri = os.getenv("NEO4J_TEST_URI")
+    if not uri:
+        pytest.skip("NEO4J_TEST_URI is not set")
+    neo4j = pytest.importorskip("neo4j")
+    # Users are registered through tools.user, which hashes with bcrypt.
+    pytest.importorskip("bcrypt")
+    driver = neo4j.GraphDatabase.driver(uri, auth=(os.getenv("NEO4J_TEST_USER", "neo4j"),
+                                                   os.getenv("NEO4J_TEST_PASSWORD", "neo4j")))
+    session = driver.session()
+    session.run("MATCH (n) DETACH DELETE n").consume()
+    try:
+        yield session
+    finally:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+        session.close()
+        driver.close()
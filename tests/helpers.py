@@ -0,0 +1,122 @@
+# tests/helpers.py
+import time
+
+class FakeResult:
+    """Iterates the records lazily, like a neo4j result cursor."""
+
+    def __init__(self, records=()):
+        self._records = iter(records)
+
+    def __iter__(self):
+        return self._records
+
+    def single(self):
+        return next(self._records, None)
+
+    def data(self):
+        return list(self._records)
+
+    def consume(self):
+        for _ in self._records:
+            pass
+
+class FakeSession:
+    """
+    Stands in for a neo4j session (and for the transaction handed to
+    execute_write). Every statement is kept in `calls`; `responses` maps a
+    query string to the records it returns, or is a callable(query, params)
+    returning them. Unknown queries return no records. `rtt` simulates the
+    network round trip of every statement and commit.
+    """
+
+    def __init__(self, responses=None, rtt=0.0):
+        self.responses = responses or {}
+        self.rtt = rtt
+        self.calls = []
+        self.commits = 0
+        self.closed = False
+
+    @property
+    def queries(self):
+        return [query for query, _ in self.calls]
+
+    @property
+    def round_trips(self):
+        return len(self.calls) + self.commits
+
+    def _round_trip(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def run(self, query, params=None, **kwargs):
+        self.calls.append((query, params))
+        self._round_trip()
+        if callable(self.responses):
+            records = self.responses(query, params)
+        else:
+            records = self.responses.get(query)
+        return FakeResult(records or ())
+
+    def execute_write(self, fn, *args, **kwargs):
+        result = fn(self, *args, **kwargs)
+        self.commits += 1
+        self._round_trip()
+        return result
+
+    def execute_read(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    def close(self):
+        self.closed = True
+
+# Seeding a real graph (see the `graph` fixture in conftest.py). Everything is
+# written through the application's own code paths, so the tests see the same
+# node and edge shapes production does.
+
+def seed_school(session, school_id="s1"):
+    session.run("CREATE (s:School {school_id: $school_id, name: 'DefaultSchool'})", {"school_id": school_id}).consume()
+    return school_id
+
+def add_questions(session, per_section=2):
+    """`per_section` single-choice questions per section; choice 'A' is the correct one."""
+    from tools.answer_keys import answer_key_cache
+    questions = []
+    for sec in (1, 2, 3, 4):
+        for i in range(per_section):
+            qid = f"q{sec}_{i}"
+            questions.append({
+                "id": qid, "section": sec, "points": 1, "type": "single_choice", "question": f"Soru {sec}.{i}",
+                "choices": [{"id": f"{qid}_{t}", "choice_text": t, "is_correct": t == "A", "correct_position": None}
+                            for t in "AB"]
+            })
+    session.run("""
+    UNWIND $questions AS q
+    CREATE (qn:Question {id: q.id, external_id: q.id, section: q.section, points: q.points, type: q.type,
+                         question: q.question, correct_count: 0, wrong_count: 0})
+    WITH qn, q
+    UNWIND q.choices AS c
+    CREATE (qn)-[:HAS_CHOICE]->(:Choice {id: c.id, choice_text: c.choice_text, is_correct: c.is_correct,
+                                         correct_position: c.correct_position, selected_count: 0})
+    """, {"questions": questions}).consume()
+    answer_key_cache.invalidate()
+    return questions
+
+def add_student(session, username, class_name, school_id="s1"):
+    from tools.user import register_user
+    assert register_user(session, username, "Secret123", "Ad", "Soyad", class_name, "student", password_hash="x")
+    record = session.run("MATCH (u:User {username: $username}) RETURN u.user_id AS user_id", {"username": username}).single()
+    return {"user_id": record["user_id"], "username": username, "role": "student", "attempts": 0,
+            "class_name": class_name, "school_id": school_id}
+
+def record_exam(session, user, questions, correct_ids, end_time):
+    """Creates and grades an exam in which exactly the questions in `correct_ids` are answered right."""
+    from tools.exam import create_exam, process_results
+    selection = {}
+    for q in questions:
+        selection.setdefault(q["section"], []).append(q)
+    exam_id, _ = create_exam(session, user, selection)
+    answers = {q["id"]: {"selected_texts": ["A" if q["id"] in correct_ids else "B"]} for q in questions}
+    exam_node = {"exam_id": exam_id, "start_time": end_time}
+    process_results(session, user, exam_node, questions, answers, end_time)
+    user["attempts"] += 1
+    return exam_id
@@ -0,0 +1,194 @@
+# tests/legacy_grading.py
+"""
+The submit path as it was before grading was batched (baseline
+tools/exam.py process_results and tools/statistics_utils.update_statistics,
+plus the Exam status update the router ran afterwards), kept verbatim so
+tests/test_grading_benchmark.py measures the old code rather than a model
+of it.
+"""
+from uuid import uuid4
+
+def legacy_process_results(session, user, exam_node, selected_questions, answers_dict, end_time):
+    # Calculate scores per section.
+    section_scores = {sec: [0, 0] for sec in range(1, 5)}
+    section_correct_wrong = {sec: [0, 0] for sec in range(1, 5)}
+    for q in selected_questions:
+        qid = q["id"]
+        ans_data = answers_dict.get(str(qid))
+        if not ans_data:
+            points_earned = 0
+        else:
+            if isinstance(ans_data, dict):
+                selected = ans_data.get("selected_texts", [])
+            else:
+                selected = ans_data.selected_texts or []
+            result = session.run("""
+MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
+WHERE c.is_correct = true
+RETURN collect(c.choice_text) as correct
+""", {"qid": qid})
+            correct_choices = result.single()["correct"]
+            if set(selected) == set(correct_choices):
+                points_earned = q.get("points", 1)
+            elif set(selected) & set(correct_choices):
+                points_earned = q.get("points", 1) / 2
+            else:
+                points_earned = 0
+        section_scores[q["section"]][0] += points_earned
+        section_scores[q["section"]][1] += q.get("points", 1)
+        if points_earned == q.get("points", 1):
+            section_correct_wrong[q["section"]][0] += 1
+        else:
+            section_correct_wrong[q["section"]][1] += 1
+        exam_answer_id = str(uuid4())
+        session.run("""
+MATCH (e:Exam {exam_id: $exam_id}), (q:Question {id: $qid})
+CREATE (ea:ExamAnswer {
+    id: $exam_answer_id,
+    points_earned: $points_earned,
+    question_id: $qid
+})
+CREATE (e)-[:HAS_ANSWER]->(ea)
+CREATE (ea)-[:FOR_QUESTION]->(q)
+CREATE (ea)-[:ANSWER_FOR]->(q)
+""", {"exam_id": exam_node["exam_id"], "qid": qid, "exam_answer_id": exam_answer_id, "points_earned": points_earned})
+        if points_earned < q.get("points", 1):
+            session.run("""
+MATCH (q:Question {id: $qid})
+SET q.wrong_count = coalesce(q.wrong_count, 0) + 1
+""", {"qid": qid})
+        if ans_data:
+            if isinstance(ans_data, dict):
+                selected = ans_data.get("selected_texts", [])
+            else:
+                selected = ans_data.selected_texts or []
+            for answer_text in selected:
+                session.run("""
+MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
+WHERE toLower(c.choice_text) = toLower($answer_text)
+SET c.selected_count = coalesce(c.selected_count, 0) + 1
+""", {"qid": qid, "answer_text": answer_text.strip()})
+                session.run("""
+MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
+WHERE toLower(c.choice_text) = toLower($answer_text) AND c.is_correct = true
+SET c.selected_correct_count = coalesce(c.selected_correct_count, 0) + 1
+""", {"qid": qid, "answer_text": answer_text.strip()})
+                session.run("""
+MATCH (ea:ExamAnswer {id: $exam_answer_id})
+MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
+WHERE toLower(c.choice_text) = toLower($answer_text)
+CREATE (ea)-[:CHOSE]->(c)
+""", {"exam_answer_id": exam_answer_id, "qid": qid, "answer_text": answer_text.strip()})
+    total_earned = sum(section_scores[s][0] for s in section_scores)
+    total_possible = sum(section_scores[s][1] for s in section_scores)
+    final_score = round((total_earned / total_possible) * 100, 2) if total_possible > 0 else 0.0
+    attempt_number = user.get("attempts", 0) + 1
+    exam_result_id = str(uuid4())
+    session.run("""
+CREATE (er:ExamResult {
+    id: $exam_result_id,
+    exam_id: $exam_id,
+    student_id: $user_id,
+    attempt_number: $attempt_number,
+    exam_percentage: $final_score,
+    timestamp: datetime($end_time)
+})
+""", {
+        "exam_result_id": exam_result_id,
+        "exam_id": exam_node["exam_id"],
+        "user_id": user["user_id"],
+        "attempt_number": attempt_number,
+        "final_score": final_score,
+        "end_time": end_time
+    })
+    session.run("""
+MATCH (u:User {user_id: $user_id}), (er:ExamResult {id: $exam_result_id})
+CREATE (u)-[:HAS_RESULT]->(er)
+""", {"user_id": user["user_id"], "exam_result_id": exam_result_id})
+    for sec in range(1, 5):
+        session.run("""
+MATCH (er:ExamResult {id: $exam_result_id}),
+(st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $sec})
+MERGE (er)-[:RESULT_FOR {section: $sec}]->(st)
+""", {
+            "exam_result_id": exam_result_id,
+            "school_id": user.get("school_id"),
+            "class_name": user.get("class_name"),
+            "sec": sec
+        })
+    # Update user's exam attempt count and score average in one query.
+    session.run("""
+    MATCH (u:User {user_id: $user_id})
+    WITH u, coalesce(u.attempts, 0) as old_attempts, coalesce(u.score_avg, 0) as old_avg
+    SET u.score_avg = CASE 
+        WHEN old_attempts = 0 THEN $final_score 
+        ELSE round(((old_avg * old_attempts) + $final_score) / (old_attempts + 1), 2)
+    END,
+    u.attempts = old_attempts + 1
+    """, {"user_id": user["user_id"], "final_score": final_score})
+    legacy_update_statistics(session, user.get("school_id"), user.get("class_name"), section_scores, section_correct_wrong, attempt_number=attempt_number)
+
+def legacy_update_statistics(session, school_id, class_name, section_scores: dict, section_correct_wrong: dict, attempt_number):
+    """
+    Her bölüm için istatistik düğümü oluşturulur veya güncellenir.
+    Ek olarak, attempt_number bilgisine göre ilk ve ikinci sınav yüzdeleri ayrı tutulur.
+    Bu istatistik düğümleri, ilgili Section, Class ve School düğümleriyle ilişkilendirilecektir.
+    """
+    subject_mapping = {1: "Math", 2: "English", 3: "Science", 4: "History"}
+    for sec in range(1, 5):
+        sum_earned, sum_possible = section_scores.get(sec, [0, 0])
+        section_percentage = round((sum_earned / sum_possible) * 100, 2) if sum_possible > 0 else 0
+        session.run("""
+        MERGE (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+        SET st.correct_questions = coalesce(st.correct_questions, 0) + $correct,
+            st.wrong_questions = coalesce(st.wrong_questions, 0) + $wrong,
+            st.section_percentage = $section_percentage,
+            st.exam_takers = coalesce(st.exam_takers, 0) + 1,
+            st.section_name = $section_name,
+            st.success_rate = CASE WHEN ($correct + $wrong) > 0 THEN round(($correct * 1.0 / ($correct + $wrong)) * 100, 2) ELSE 0 END
+        """, {
+            "school_id": school_id,
+            "class_name": class_name,
+            "section_number": sec,
+            "correct": section_correct_wrong.get(sec, [0, 0])[0],
+            "wrong": section_correct_wrong.get(sec, [0, 0])[1],
+            "section_percentage": section_percentage,
+            "section_name": subject_mapping.get(sec, f"Section {sec}")
+        })
+        if attempt_number == 1:
+            session.run("""
+            MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+            SET st.first_exam_percentage = coalesce(st.first_exam_percentage, 0) + $section_percentage,
+                st.first_exam_count = coalesce(st.first_exam_count, 0) + 1
+            """, {"school_id": school_id, "class_name": class_name, "section_number": sec, "section_percentage": section_percentage})
+        elif attempt_number == 2:
+            session.run("""
+            MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+            SET st.second_exam_percentage = coalesce(st.second_exam_percentage, 0) + $section_percentage,
+                st.second_exam_count = coalesce(st.second_exam_count, 0) + 1
+            """, {"school_id": school_id, "class_name": class_name, "section_number": sec, "section_percentage": section_percentage})
+        # İstatistik düğümünü ilgili Section düğümüyle ilişkilendiriyoruz.
+        session.run("""
+        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+        MERGE (sec:Section {section_number: $section_number})
+        MERGE (st)-[:OF_SECTION]->(sec)
+        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
+        # İstatistik düğümünü Class düğümüyle ilişkilendiriyoruz.
+        session.run("""
+        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+        MERGE (c:Class {name: $class_name})
+        MERGE (c)-[:HAS_STATISTICS]->(st)
+        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
+        # İstatistik düğümünü School düğümüyle ilişkilendiriyoruz.
+        session.run("""
+        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
+        MATCH (s:School {school_id: $school_id})
+        MERGE (s)-[:HAS_STATISTICS]->(st)
+        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
+
+def legacy_submit(session, user, exam_node, selected_questions, answers_dict, end_time):
+    legacy_process_results(session, user, exam_node, selected_questions, answers_dict, end_time)
+    session.run("""
+    MATCH (e:Exam {exam_id: $exam_id})
+    SET e.end_time = datetime($end_time), e.status = 'submitted'
+    """, {"exam_id": exam_node["exam_id"], "end_time": end_time})
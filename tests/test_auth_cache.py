@@ -0,0 +1,56 @@
+# tests/test_auth_cache.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.auth_cache import PrincipalCache, TokenCache
+
+USER = {"user_id": "u1", "username": "ali", "role": "student", "attempts": 0}
+
+def test_user_is_resolved_once():
+    cache = PrincipalCache(max_size=16, ttl=60)
+    loads = []
+    def load():
+        loads.append(1)
+        return dict(USER)
+    for _ in range(100):
+        user = cache.get_or_load("u1", load)
+        user["attempts"] = 99  # callers may mutate their copy
+    assert len(loads) == 1
+    assert cache.get_or_load("u1", load)["attempts"] == 0
+    stats = cache.stats()
+    assert stats["hits"] == 100 and stats["hit_rate"] > 0.99
+
+def test_invalidation_reloads_and_misses_are_not_cached():
+    cache = PrincipalCache(max_size=16, ttl=60)
+    cache.get_or_load("u1", lambda: dict(USER))
+    cache.invalidate("u1")
+    assert cache.get_or_load("u1", lambda: dict(USER, attempts=1))["attempts"] == 1
+    assert cache.get_or_load("gone", lambda: None) is None
+    assert cache.get_or_load("gone", lambda: dict(USER, user_id="gone"))["user_id"] == "gone"
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = PrincipalCache(max_size=16, ttl=60)
+    def load():
+        # A submission commits while the user is being read.
+        cache.invalidate("u1")
+        return dict(USER)
+    cache.get_or_load("u1", load)
+    assert cache.get_or_load("u1", lambda: dict(USER, attempts=1))["attempts"] == 1
+
+def test_tokens_cached_until_expiry():
+    cache = TokenCache(max_size=16)
+    calls = []
+    def verify(token):
+        calls.append(token)
+        if token == "bad":
+            return None
+        return {"user_id": "u1", "exp": time.time() + (0.05 if token == "short" else 3600)}
+    for _ in range(10):
+        assert cache.get_or_verify("good", verify)["user_id"] == "u1"
+        assert cache.get_or_verify("bad", verify) is None
+    assert calls.count("good") == 1 and calls.count("bad") == 10
+    cache.get_or_verify("short", verify)
+    time.sleep(0.1)
+    cache.get_or_verify("short", verify)
+    assert calls.count("short") == 2
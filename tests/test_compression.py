@@ -0,0 +1,72 @@
+# tests/test_compression.py
+import sys
+import os
+import gzip
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.compression import CompressionMiddleware, CompressionStats
+
+def make_app(body, content_type=b"application/json", extra_headers=(), chunks=1):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers + list(extra_headers)})
+        size = len(body) // chunks
+        for i in range(chunks):
+            part = body[i * size:] if i == chunks - 1 else body[i * size:(i + 1) * size]
+            await send({"type": "http.response.body", "body": part, "more_body": i < chunks - 1})
+    return app
+
+def call(app, accept_encoding="gzip"):
+    stats = CompressionStats()
+    middleware = CompressionMiddleware(app, minimum_size=100, stats=stats)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    asyncio.run(middleware({"type": "http", "headers": headers}, receive, send))
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return dict(start["headers"]), body, stats.stats()
+
+BODY = b'{"questions":[' + b",".join(b'{"question":"What is 2+2?","points":1}' for _ in range(100)) + b"]}"
+
+def test_large_json_is_gzipped():
+    headers, body, stats = call(make_app(BODY))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == BODY
+    assert stats["compressed_responses"] == 1 and stats["bytes_in"] == len(BODY)
+
+def test_compressed_body_gets_its_own_etag():
+    etag = (b"etag", b'"abc123"')
+    headers, _, _ = call(make_app(BODY, extra_headers=[etag]))
+    assert headers[b"etag"] == b'"abc123-gzip"'
+    headers, _, _ = call(make_app(BODY, extra_headers=[etag]), None)
+    assert headers[b"etag"] == b'"abc123"'
+
+def test_identity_when_not_accepted():
+    for accept in (None, "identity", "gzip;q=0"):
+        headers, body, _ = call(make_app(BODY), accept)
+        assert b"content-encoding" not in headers and body == BODY
+
+def test_small_and_binary_bodies_pass_through():
+    headers, body, _ = call(make_app(b'{"ok":true}'))
+    assert b"content-encoding" not in headers
+    headers, body, _ = call(make_app(BODY, content_type=b"image/png"))
+    assert b"content-encoding" not in headers and body == BODY
+
+def test_already_encoded_is_not_compressed_twice():
+    precompressed = gzip.compress(BODY)
+    app = make_app(precompressed, content_type=b"text/css", extra_headers=[(b"content-encoding", b"gzip")])
+    headers, body, stats = call(app)
+    assert body == precompressed and stats["compressed_responses"] == 0
+
+def test_streamed_bodies_pass_through():
+    headers, body, _ = call(make_app(BODY, content_type=b"text/csv", chunks=3))
+    assert b"content-encoding" not in headers and body == BODY
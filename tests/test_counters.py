@@ -0,0 +1,41 @@
+# tests/test_counters.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tests.helpers import FakeSession, add_questions
+from tools.counters import backfill_question_counters, BACKFILL_QUESTION_COUNTERS_QUERY
+
+def test_backfill_is_recorded_on_a_migration_marker():
+    assert "MERGE (m:Migration {name: 'question_answer_counters'})" in BACKFILL_QUESTION_COUNTERS_QUERY
+    assert "SET b.answer_counters_backfilled" not in BACKFILL_QUESTION_COUNTERS_QUERY
+    assert backfill_question_counters(FakeSession({BACKFILL_QUESTION_COUNTERS_QUERY: [{"backfilled": True}]}))
+    # Already applied (no row), or applied earlier under the QuestionBank flag.
+    assert not backfill_question_counters(FakeSession())
+    assert not backfill_question_counters(FakeSession({BACKFILL_QUESTION_COUNTERS_QUERY: [{"backfilled": False}]}))
+
+COUNTS_QUERY = "MATCH (q:Question {id: 'q1_0'}) RETURN q.correct_count AS correct, q.zero_count AS zero"
+
+def test_backfill_counts_answers_on_graph(graph):
+    add_questions(graph, per_section=1)
+    graph.run("""
+    MATCH (q:Question {id: 'q1_0'})
+    UNWIND [1, 1, 0] AS earned
+    CREATE (:ExamAnswer {question_id: q.id, points_earned: earned})-[:FOR_QUESTION]->(q)
+    """).consume()
+    assert backfill_question_counters(graph) is True
+    assert graph.run(COUNTS_QUERY).single().data() == {"correct": 2, "zero": 1}
+    assert backfill_question_counters(graph) is False
+
+    # A database that ran the backfill under the old QuestionBank flag is not recounted.
+    graph.run("MATCH (m:Migration) DELETE m").consume()
+    graph.run("""
+    MATCH (q:Question {id: 'q1_0'}) SET q.correct_count = 7
+    MERGE (b:QuestionBank {name: 'main'}) SET b.answer_counters_backfilled = true
+    """).consume()
+    assert backfill_question_counters(graph) is False
+    assert graph.run(COUNTS_QUERY).single()["correct"] == 7
+    marker = graph.run("""
+    MATCH (m:Migration {name: 'question_answer_counters'}), (b:QuestionBank {name: 'main'})
+    RETURN m.applied_at IS NOT NULL AS applied, b.answer_counters_backfilled AS flag
+    """).single()
+    assert marker["applied"] and marker["flag"] is None
@@ -0,0 +1,42 @@
+# tests/test_create_exam.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tests.helpers import FakeSession
+from tools.exam import create_exam, build_exam_questions, CREATE_EXAM_QUERY
+
+USER = {"user_id": "u1", "username": "ayse", "class_name": "7-A", "attempts": 0}
+
+def make_selection(per_section=5):
+    return {
+        sec: [
+            {"id": f"q{sec}_{i}", "section": sec, "points": 1, "type": "single_choice", "question": f"Soru {sec}.{i}",
+             "choices": [{"id": f"q{sec}_{i}_{t}", "choice_text": t} for t in "AB"]}
+            for i in range(per_section)
+        ]
+        for sec in (1, 2, 3, 4)
+    }
+
+def echo_exam_id(query, params):
+    return [{"exam_id": params["exam_id"]}] if query == CREATE_EXAM_QUERY else []
+
+def test_exam_is_created_in_one_statement_and_one_commit():
+    session = FakeSession(echo_exam_id)
+    selection = make_selection()
+    exam_id, questions_data = create_exam(session, USER, selection)
+    assert exam_id
+    # One UNWIND statement in one transaction, instead of ~40 auto-commits, and no read-back.
+    assert session.queries == [CREATE_EXAM_QUERY] and session.commits == 1
+    params = session.calls[0][1]
+    assert params["exam_id"] == exam_id and params["class_name"] == "7-A"
+    assert params["question_ids"] == [q["id"] for sec in (1, 2, 3, 4) for q in selection[sec]]
+    # A NEXT_QUESTION chain per section: n - 1 links each.
+    assert len(params["links"]) == 4 * 4
+    assert params["links"][0] == {"from_id": "q1_0", "to_id": "q1_1", "section": 1}
+    assert questions_data == build_exam_questions(selection)
+    assert questions_data[2][0]["choices"] == [{"choice_id": "q2_0_A", "choice_text": "A"},
+                                               {"choice_id": "q2_0_B", "choice_text": "B"}]
+
+def test_failed_write_returns_no_exam():
+    session = FakeSession()
+    assert create_exam(session, USER, make_selection()) == (None, {})
@@ -0,0 +1,91 @@
+# tests/test_distribution.py
+import sys
+import os
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tests.helpers import FakeSession, seed_school, add_questions, add_student, record_exam
+from tools.distribution import percentile, percentile_rank, merge_histograms, load_distribution, backfill_histograms
+from tools.distribution import CLASS_HISTOGRAMS_QUERY, SCHOOL_HISTOGRAMS_QUERY, BACKFILL_HISTOGRAMS_QUERY
+from tools.statistics_utils import bin_index, HISTOGRAM_BINS, BIN_WIDTH
+
+def histogram_of(scores):
+    h = [0] * HISTOGRAM_BINS
+    for s in scores:
+        h[bin_index(s)] += 1
+    return h
+
+def test_bins_cover_full_range():
+    assert bin_index(0) == 0
+    assert bin_index(4.99) == 0
+    assert bin_index(5) == 1
+    assert bin_index(100) == HISTOGRAM_BINS - 1
+
+def test_percentiles_close_to_exact():
+    rng = random.Random(3)
+    scores = [min(100, max(0, rng.gauss(68, 15))) for _ in range(5000)]
+    h = histogram_of(scores)
+    ordered = sorted(scores)
+    for q in (10, 25, 50, 75, 90):
+        exact = ordered[int(len(ordered) * q / 100)]
+        assert abs(percentile(h, q) - exact) <= BIN_WIDTH
+    for score in (40, 68, 95):
+        exact = sum(1 for s in scores if s < score) / len(scores) * 100
+        assert abs(percentile_rank(h, score) - exact) <= 3
+
+def test_empty_histograms():
+    assert percentile([0] * HISTOGRAM_BINS, 50) is None
+    assert percentile_rank(None, 80) is None
+    assert percentile_rank([0] * HISTOGRAM_BINS, 80) is None
+
+def test_histograms_merge_across_classes():
+    a, b = histogram_of([10, 55, 90]), histogram_of([55, 60])
+    assert merge_histograms([a, b, None]) == histogram_of([10, 55, 90, 55, 60])
+    records = [
+        {"section_number": 1, "histogram": a},
+        {"section_number": 1, "histogram": b},
+        {"section_number": 2, "histogram": None}
+    ]
+    session = FakeSession(lambda query, params: records)
+    dist = load_distribution(session, school_id=None, sections=[2, 1])
+    assert session.queries == [SCHOOL_HISTOGRAMS_QUERY]
+    math, english = dist["sections"]
+    assert math["count"] == 5 and english["count"] == 0
+    assert math["percentiles"]["p50"] is not None and english["percentiles"]["p50"] is None
+    assert len(math["bins"]) == HISTOGRAM_BINS
+    load_distribution(session, class_name="7-A")
+    assert session.queries[-1] == CLASS_HISTOGRAMS_QUERY
+
+def test_backfill_reports_whether_it_applied(capsys):
+    row = {"applied": False, "results": 4, "covered": 3, "histograms": 4}
+    assert backfill_histograms(FakeSession({BACKFILL_HISTOGRAMS_QUERY: [row]})) is False
+    assert "3 of 4" in capsys.readouterr().out
+    assert backfill_histograms(FakeSession({BACKFILL_HISTOGRAMS_QUERY: [{**row, "applied": True, "covered": 4}]}))
+    assert "u.school_id" not in BACKFILL_HISTOGRAMS_QUERY and "u.class_name" not in BACKFILL_HISTOGRAMS_QUERY
+
+HISTOGRAMS_QUERY = """
+MATCH (st:Statistics)
+OPTIONAL MATCH (ss:SchoolStatistics {school_id: st.school_id, section_number: st.section_number})
+RETURN st.class_name AS class_name, st.section_number AS section, st.histogram AS histogram,
+       ss.histogram AS school_histogram
+ORDER BY class_name, section
+"""
+
+def test_backfill_rebuilds_histograms_on_graph(graph):
+    seed_school(graph, "s1")
+    questions = add_questions(graph)
+    for username, class_name, correct_sections in (("ali", "7-A", {1}), ("ayse", "7-A", {1, 2}), ("can", "7-B", {3})):
+        student = add_student(graph, username, class_name)
+        record_exam(graph, student, questions, {q["id"] for q in questions if q["section"] in correct_sections},
+                    "2025-03-03T10:00:00")
+    # Histograms written by the submit path are what the backfill must reproduce.
+    expected = graph.run(HISTOGRAMS_QUERY).data()
+    assert len(expected) == 2 * 4 and all(sum(row["histogram"]) > 0 for row in expected)
+    graph.run("MATCH (st:Statistics) REMOVE st.histogram").consume()
+    graph.run("MATCH (ss:SchoolStatistics) REMOVE ss.histogram").consume()
+
+    assert backfill_histograms(graph) is True
+    assert graph.run(HISTOGRAMS_QUERY).data() == expected
+    math = load_distribution(graph, school_id="s1", class_name="7-A", sections=[1])["sections"][0]
+    assert math["count"] == 2 and math["bins"][-1]["count"] == 2
+    english = load_distribution(graph, school_id="s1", sections=[2])["sections"][0]
+    assert english["count"] == 3 and english["bins"][0]["count"] == 2
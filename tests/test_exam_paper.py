@@ -0,0 +1,34 @@
+# tests/test_exam_paper.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from tests.helpers import FakeSession
+from tools.exam import create_exam, freeze_paper, thaw_paper, paper_questions, CREATE_EXAM_QUERY
+from tests.test_create_exam import USER, make_selection, echo_exam_id
+
+def test_snapshot_round_trip_keeps_section_numbers():
+    _, questions_data = create_exam(FakeSession(echo_exam_id), USER, make_selection())
+    assert thaw_paper(freeze_paper(questions_data)) == questions_data
+    assert sorted(thaw_paper(freeze_paper(questions_data))) == [1, 2, 3, 4]
+
+def test_snapshot_is_stored_with_the_exam():
+    session = FakeSession(echo_exam_id)
+    _, questions_data = create_exam(session, USER, make_selection())
+    blob = session.calls[0][1]["paper"]
+    assert thaw_paper(blob) == questions_data
+    questions = paper_questions(thaw_paper(blob))
+    assert len(questions) == 20
+    assert questions[0] == {"id": "q1_0", "section": 1, "points": 1, "type": "single_choice", "question": "Soru 1.0"}
+
+def test_resume_reads_only_the_snapshot():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("neo4j")
+    from services.exams import start_exam
+    _, issued = create_exam(FakeSession(echo_exam_id), USER, make_selection())
+    exam_node = {"exam_id": "e1", "status": "in_progress", "paper": freeze_paper(issued)}
+    session = FakeSession(lambda query, params: [{"e": exam_node}])
+    body = start_exam(session, {**USER, "role": "student"})
+    # One lookup of the in-progress exam; no CONTAINS/HAS_CHOICE traversal.
+    assert len(session.calls) == 1 and CREATE_EXAM_QUERY not in session.queries
+    assert body["exam_id"] == "e1" and body["questions"] == issued
@@ -0,0 +1,107 @@
+# tests/test_exam_pool.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+import tools.exam_pool as exam_pool
+from tools.exam import REQUIRED_TYPES, SECTIONS, validate_paper, sample_questions
+from tools.exam_pool import ExamPaperPool, draw_paper
+from tools.question_bank import QuestionIndex
+
+def make_index(types=REQUIRED_TYPES, per_type=3, prefix="q"):
+    questions = [
+        {"id": f"{prefix}{sec}_{t}_{i}", "section": sec, "type": t, "points": 1, "choices": []}
+        for sec in SECTIONS for t in types for i in range(per_type)
+    ]
+    return QuestionIndex(questions)
+
+class FakeBank:
+    def __init__(self, version, index):
+        self.version = version
+        self.index = index
+
+    def get_versioned_index(self, session):
+        return self.version, self.index
+
+class ClosingSession:
+    def close(self):
+        pass
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(bank, **kwargs):
+        options = {"size": 5, "refill_per_second": 500, "wait_timeout": 0.5, "bank_check_seconds": 0.05}
+        options.update(kwargs)
+        pool = ExamPaperPool(bank=bank, **options)
+        pool.start(ClosingSession)
+        pools.append(pool)
+        return pool
+    yield make
+    for pool in pools:
+        pool.stop()
+
+def test_take_returns_valid_paper(make_pool):
+    pool = make_pool(FakeBank(1, make_index()))
+    assert wait_for(lambda: pool.stats()["depth"] == 5)
+    paper = pool.take(1)
+    assert validate_paper(paper)
+    stats = pool.stats()
+    assert stats["served"] == 1 and stats["produced"] >= 5 and not stats["starved"]
+
+def test_draw_paper_falls_back_inline(monkeypatch):
+    bank = FakeBank(1, make_index())
+    monkeypatch.setattr(exam_pool, "question_bank_cache", bank)
+    stopped = ExamPaperPool(bank=bank)
+    monkeypatch.setattr(exam_pool, "exam_paper_pool", stopped)
+    assert validate_paper(draw_paper(ClosingSession()))
+    assert stopped.stats()["served"] == 0
+
+def test_inline_fallback_is_validated(monkeypatch):
+    # Ordering questions are missing, so no draw can satisfy the type rule.
+    bank = FakeBank(1, make_index(types=REQUIRED_TYPES[:-1]))
+    monkeypatch.setattr(exam_pool, "question_bank_cache", bank)
+    monkeypatch.setattr(exam_pool, "exam_paper_pool", ExamPaperPool(bank=bank))
+    drawn = []
+    monkeypatch.setattr(exam_pool, "sample_questions", lambda index: drawn.append(sample_questions(index)) or drawn[-1])
+    assert draw_paper(ClosingSession(), attempts=3) is None
+    assert len(drawn) == 3 and not any(validate_paper(paper) for paper in drawn)
+
+def test_stale_papers_are_dropped(make_pool):
+    bank = FakeBank(1, make_index())
+    pool = make_pool(bank)
+    assert wait_for(lambda: pool.stats()["depth"] == 5)
+    bank.version, bank.index = 2, make_index(prefix="v2_")
+    assert wait_for(lambda: pool.stats()["discarded"] >= 5)
+    paper = pool.take(2)
+    assert validate_paper(paper)
+    assert all(q["id"].startswith("v2_") for qs in paper.values() for q in qs)
+    # Asking for a version the pool has no papers for ends in the inline fallback.
+    assert pool.take(3) is None and pool.stats()["fallbacks"] == 1
+
+def test_starved_bank_backs_off_and_skips_the_wait(make_pool):
+    # No ordering questions: every paper is rejected.
+    bank = FakeBank(1, make_index(types=REQUIRED_TYPES[:3]))
+    pool = make_pool(bank, wait_timeout=1.0, starve_after=3, bank_check_seconds=0.2)
+    assert wait_for(lambda: pool.stats()["starved"])
+    rejected = pool.stats()["rejected"]
+    time.sleep(0.2)
+    # Backing off: a handful of draws at most instead of ~100 at 500/s.
+    assert pool.stats()["rejected"] - rejected < 10
+    started = time.perf_counter()
+    assert pool.take(1) is None
+    assert time.perf_counter() - started < 0.05
+    # A bank update that fixes the problem ends the starvation.
+    bank.version, bank.index = 2, make_index()
+    assert wait_for(lambda: pool.stats()["depth"] > 0)
+    assert not pool.stats()["starved"] and validate_paper(pool.take(2))
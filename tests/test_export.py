@@ -0,0 +1,133 @@
+# tests/test_export.py
+import sys
+import os
+import csv
+import io
+import json
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from tests.helpers import FakeSession, seed_school, add_questions, add_student, record_exam
+from tools.export import export_params, stream_export, iter_export_rows, decode_cursor, encode_cursor, EXPORT_QUERY
+
+def make_record(i):
+    return {
+        "exam_result_id": f"r{i:07d}",
+        "exam_id": f"e{i}",
+        "timestamp": f"2025-01-01T10:00:{i % 60:02d}Z",
+        "attempt_number": 1,
+        "exam_percentage": 62.5,
+        "student_id": f"u{i}",
+        "username": f"student{i}",
+        "okul_no": i,
+        "school_id": "s1",
+        "class_name": "7-A",
+        "questions": [
+            {"question_id": f"q{n}", "section": n % 4 + 1, "points_earned": 5 if n % 2 else 0, "points_possible": 5}
+            for n in range(20)
+        ]
+    }
+
+class StreamingSession(FakeSession):
+    """Yields `count` export records lazily, like a neo4j result cursor."""
+
+    def __init__(self, count):
+        super().__init__(self._records)
+        self.count = count
+        self.produced = 0
+
+    @property
+    def params(self):
+        return self.calls[-1][1]
+
+    def _records(self, query, params):
+        assert query == EXPORT_QUERY
+        for i in range(self.count):
+            self.produced += 1
+            yield make_record(i)
+
+def test_ndjson_rows_and_cursor():
+    session = StreamingSession(3)
+    lines = list(stream_export(lambda: session, export_params(class_name="7-A"), "ndjson"))
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == 3 and session.closed
+    assert rows[0]["sections"] == [
+        {"section_number": sec, "earned": 25 if sec % 2 == 0 else 0, "possible": 25} for sec in (1, 2, 3, 4)
+    ]
+    assert len(rows[0]["questions"]) == 20
+    assert decode_cursor(rows[1]["cursor"]) == ("2025-01-01T10:00:01Z", "r0000001")
+    resumed = export_params(class_name="7-A", cursor=rows[1]["cursor"], limit=100)
+    assert resumed["after_ts"] == "2025-01-01T10:00:01Z" and resumed["after_id"] == "r0000001"
+    assert resumed["limit"] == 100
+
+def test_csv_section_filter():
+    session = StreamingSession(2)
+    text = "".join(stream_export(lambda: session, export_params(sections=[2, 1]), "csv"))
+    rows = list(csv.reader(io.StringIO(text)))
+    header = rows[0]
+    assert "section_1_earned" in header and "section_2_possible" in header
+    assert "section_3_earned" not in header
+    assert session.params["sections"] == [1, 2]
+    assert len(rows) == 3
+    assert rows[1][header.index("cursor")] == encode_cursor("2025-01-01T10:00:00Z", "r0000000")
+
+def test_csv_without_rows_has_header():
+    text = "".join(stream_export(lambda: StreamingSession(0), export_params(), "csv"))
+    assert text.startswith("exam_result_id,")
+
+def test_invalid_filters():
+    with pytest.raises(ValueError):
+        export_params(cursor="not a cursor!")
+    with pytest.raises(ValueError):
+        export_params(date_from="yesterday")
+    with pytest.raises(ValueError):
+        export_params(sections=[7])
+
+def test_export_memory_is_flat():
+    peaks = {}
+    for count in (1000, 8000):
+        session = StreamingSession(count)
+        tracemalloc.start()
+        for _ in stream_export(lambda: session, export_params(), "ndjson"):
+            pass
+        peaks[count] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert session.produced == count
+    print(f"\npeak memory: {peaks[1000] / 1024:.0f} KiB for 1k rows, {peaks[8000] / 1024:.0f} KiB for 8k rows")
+    assert peaks[8000] < peaks[1000] * 2
+
+def test_export_filters_on_the_class_graph(graph):
+    seed_school(graph, "s1")
+    questions = add_questions(graph)
+    ali, ayse = add_student(graph, "ali", "7-A"), add_student(graph, "ayse", "7-B")
+    record_exam(graph, ali, questions, {q["id"] for q in questions if q["section"] == 1}, "2025-03-01T10:00:00")
+    record_exam(graph, ayse, questions, {q["id"] for q in questions}, "2025-03-02T10:00:00")
+
+    # Teacher export: one school and class.
+    rows = list(iter_export_rows(graph, export_params(school_id="s1", class_name="7-A")))
+    assert [(r["username"], r["school_id"], r["class_name"]) for r in rows] == [("ali", "s1", "7-A")]
+    assert rows[0]["sections"][0] == {"section_number": 1, "earned": 2, "possible": 2}
+    assert rows[0]["sections"][1] == {"section_number": 2, "earned": 0, "possible": 2}
+    # School export, then resumed after its first row.
+    school = list(iter_export_rows(graph, export_params(school_id="s1")))
+    assert [(r["username"], r["class_name"]) for r in school] == [("ali", "7-A"), ("ayse", "7-B")]
+    resumed = list(iter_export_rows(graph, export_params(school_id="s1", cursor=school[0]["cursor"])))
+    assert [r["username"] for r in resumed] == ["ayse"]
+    # Unfiltered admin export carries the school and class columns.
+    assert all(r["school_id"] == "s1" and r["class_name"] for r in iter_export_rows(graph, export_params()))
+    assert list(iter_export_rows(graph, export_params(school_id="other"))) == []
+    # An ExamResult whose Exam was deleted still exports, without questions.
+    graph.run("MATCH (e:Exam {user_id: $user_id}) DETACH DELETE e", {"user_id": ali["user_id"]}).consume()
+    rows = list(iter_export_rows(graph, export_params(school_id="s1")))
+    assert [(r["username"], len(r["questions"])) for r in rows] == [("ali", 0), ("ayse", 8)]
+
+def test_result_without_exam_is_exported():
+    session = FakeSession({EXPORT_QUERY: [dict(make_record(0), questions=None), make_record(1)]})
+    rows = [json.loads(line) for line in stream_export(lambda: session, export_params(), "ndjson")]
+    assert [r["exam_result_id"] for r in rows] == ["r0000000", "r0000001"]
+    assert rows[0]["questions"] == [] and rows[0]["sections"][0] == {"section_number": 1, "earned": 0, "possible": 0}
+
+def test_school_and_class_come_from_edges():
+    # User nodes carry neither property; see test_export_filters_on_the_class_graph.
+    assert "u.school_id" not in EXPORT_QUERY and "u.class_name" not in EXPORT_QUERY
+    assert "(u)-[:BELONGS_TO]->(c:Class)<-[:HAS_CLASS]-(s:School)" in EXPORT_QUERY
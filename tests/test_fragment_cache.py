@@ -0,0 +1,59 @@
+# tests/test_fragment_cache.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+jinja2 = pytest.importorskip("jinja2")
+from tools.cache import LRUCache
+from tools.fragment_cache import FragmentCacheExtension
+
+TEMPLATE = """
+{% cache "exam_sections", exam_id %}
+{% for q in questions %}<div>{{ q }}</div>{% endfor %}
+{% endcache %}
+"""
+
+def make_env(templates):
+    env = jinja2.Environment(loader=jinja2.DictLoader(templates), extensions=[FragmentCacheExtension], autoescape=True)
+    env.fragment_cache = LRUCache(max_size=16)
+    return env
+
+def test_fragment_rendered_once_per_key():
+    env = make_env({"exam.html": TEMPLATE})
+    template = env.get_template("exam.html")
+    rendered = []
+    def questions():
+        rendered.append(1)
+        return ["<b>2+2</b>", "3+3"]
+    class Lazy:
+        def __iter__(self):
+            return iter(questions())
+    first = template.render(exam_id="e1", questions=Lazy())
+    assert "&lt;b&gt;2+2&lt;/b&gt;" in first
+    assert template.render(exam_id="e1", questions=Lazy()) == first
+    assert len(rendered) == 1
+    template.render(exam_id="e2", questions=Lazy())
+    assert len(rendered) == 2
+    assert env.fragment_cache.stats()["hits"] == 1
+
+def test_none_key_is_not_cached():
+    env = make_env({"exam.html": TEMPLATE})
+    template = env.get_template("exam.html")
+    assert "a" in template.render(exam_id=None, questions=["a"])
+    assert "b" in template.render(exam_id=None, questions=["b"])
+    assert len(env.fragment_cache) == 0
+
+def test_cached_render_is_faster():
+    heavy = "{% cache 'heavy', key %}{% for i in range(3000) %}<p>{{ i }} {{ text | upper }}</p>{% endfor %}{% endcache %}"
+    env = make_env({"heavy.html": heavy})
+    template = env.get_template("heavy.html")
+    started = time.perf_counter()
+    template.render(key="k", text="row")
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(20):
+        template.render(key="k", text="row")
+    warm = (time.perf_counter() - started) / 20
+    print(f"\nfragment render: cold {cold * 1000:.2f} ms, cached {warm * 1000:.3f} ms")
+    assert warm < cold
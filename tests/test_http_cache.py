@@ -0,0 +1,58 @@
+# tests/test_http_cache.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.cache import LRUCache
+from tools.http_cache import ResponseCache, make_etag, etag_matches, encoded_etag
+
+def test_etag_changes_with_stamp():
+    etag = make_etag("results_v2", "u1", 1, 40)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("results_v2", "u1", 1, 40)
+    assert etag != make_etag("results_v2", "u1", 2, 40)
+    assert etag != make_etag("results_v2", "u1", 1, 44)
+
+def test_if_none_match():
+    etag = make_etag("stats", "admin", 7)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+def test_compressed_representation_etags():
+    etag = make_etag("stats", "admin", 3)
+    gzipped = encoded_etag(etag, "gzip")
+    assert gzipped == etag[:-1] + '-gzip"' and gzipped != etag
+    assert encoded_etag("W/" + etag, "br") == "W/" + etag[:-1] + '-br"'
+    # Revalidating with either representation's validator matches the body.
+    assert etag_matches(gzipped, etag) and etag_matches(f"W/{encoded_etag(etag, 'br')}", etag)
+    assert not etag_matches(encoded_etag('"other"', "gzip"), etag)
+
+def test_lru_eviction_and_ttl():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    short = LRUCache(ttl=0.01)
+    short.set("a", 1)
+    time.sleep(0.02)
+    assert short.get("a") is None
+
+def test_response_cache_builds_once_per_etag():
+    cache = ResponseCache(max_size=8)
+    calls = []
+    def build():
+        calls.append(1)
+        return {"exams": []}
+    etag = make_etag("results_v2", "u1", 0, 0)
+    assert cache.get_or_build(etag, build) == {"exams": []}
+    assert cache.get_or_build(etag, build) == {"exams": []}
+    assert len(calls) == 1
+    cache.get_or_build(make_etag("results_v2", "u1", 1, 4), build)
+    assert len(calls) == 2
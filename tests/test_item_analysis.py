@@ -0,0 +1,113 @@
+# tests/test_item_analysis.py
+import sys
+import os
+import time
+import random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+np = pytest.importorskip("numpy")
+from tests.helpers import FakeSession, seed_school, add_questions, add_student, record_exam
+from tools.item_analysis import build_matrix, analyze, distractor_effectiveness, result_rows, write_back, run
+from tools.item_analysis import QUESTIONS_QUERY, ANSWERS_QUERY, CHOICES_QUERY, WRITE_BACK_QUERY
+
+def test_indices_match_reference():
+    rng = random.Random(5)
+    ability = [rng.random() for _ in range(200)]
+    question_points = {"q1": 1, "q2": 2, "q3": 1}
+    records = []
+    for a, skill in enumerate(ability):
+        records.append((f"e{a}", "q1", 1 if rng.random() < skill else 0))
+        records.append((f"e{a}", "q2", 2 if rng.random() < skill else 0))
+        records.append((f"e{a}", "q3", 1 if rng.random() < 0.5 else 0))  # unrelated to ability
+    records.append(("e0", "unknown", 1))
+    rows, cols, scores, n_attempts = build_matrix(records, question_points)
+    assert n_attempts == 200 and len(scores) == 600
+    responses, difficulty, discrimination = analyze(rows, cols, scores, n_attempts, 3)
+    matrix = np.zeros((200, 3))
+    matrix[rows, cols] = scores
+    for q in range(3):
+        rest = np.delete(matrix, q, axis=1).mean(axis=1)
+        assert difficulty[q] == pytest.approx(matrix[:, q].mean())
+        assert discrimination[q] == pytest.approx(np.corrcoef(matrix[:, q], rest)[0, 1])
+    assert list(responses) == [200, 200, 200]
+    assert discrimination[0] > 0.1 and abs(discrimination[2]) < 0.2
+
+def test_distractor_effectiveness_and_flags():
+    index = {"q1": 0, "q2": 1}
+    choices = [
+        ("q1", True, 70), ("q1", False, 20), ("q1", False, 8), ("q1", False, 2),
+        ("q2", True, 10)
+    ]
+    effectiveness = distractor_effectiveness(choices, index)
+    assert effectiveness[0] == pytest.approx(2 / 3)
+    assert np.isnan(effectiveness[1])
+    rows = result_rows(["q1", "q2"], np.array([100, 0]), np.array([0.98, np.nan]),
+                       np.array([0.5, np.nan]), effectiveness)
+    assert rows[0]["flag"] == "review" and rows[0]["difficulty"] == 0.98
+    assert rows[1] == {"id": "q2", "responses": 0, "difficulty": None, "discrimination": None,
+                       "distractor_effectiveness": None, "flag": None}
+
+def test_write_back_is_batched():
+    session = FakeSession()
+    write_back(session, [{"id": f"q{i}"} for i in range(2500)], batch_size=1000)
+    assert [len(p["rows"]) for _, p in session.calls] == [1000, 1000, 500]
+    assert all(q == WRITE_BACK_QUERY for q, _ in session.calls)
+
+def written_rows(session):
+    return {row["id"]: row for query, params in session.calls if query == WRITE_BACK_QUERY for row in params["rows"]}
+
+def test_run_analyzes_query_results():
+    session = FakeSession({
+        QUESTIONS_QUERY: [{"id": "q1", "points": 1}, {"id": "q2", "points": 2}, {"id": "q3", "points": 1}],
+        ANSWERS_QUERY: [
+            {"exam_id": "e1", "question_id": "q1", "points_earned": 1},
+            {"exam_id": "e1", "question_id": "q2", "points_earned": 2},
+            {"exam_id": "e2", "question_id": "q1", "points_earned": 0},
+            {"exam_id": "e2", "question_id": "q2", "points_earned": 1},
+            {"exam_id": "e3", "question_id": "q2", "points_earned": 0}
+        ],
+        CHOICES_QUERY: [
+            {"question_id": "q1", "is_correct": True, "selected_count": 1},
+            {"question_id": "q1", "is_correct": False, "selected_count": 1},
+            {"question_id": "q1", "is_correct": False, "selected_count": 0}
+        ]
+    })
+    summary = run(session)
+    assert summary["answers"] == 5 and summary["attempts"] == 3 and summary["questions"] == 3
+    rows = written_rows(session)
+    assert rows["q1"]["responses"] == 2 and rows["q1"]["difficulty"] == 0.5
+    assert rows["q2"]["difficulty"] == 0.5 and rows["q2"]["distractor_effectiveness"] is None
+    assert rows["q1"]["distractor_effectiveness"] == 0.5
+    assert rows["q3"] == {"id": "q3", "responses": 0, "difficulty": None, "discrimination": None,
+                          "distractor_effectiveness": None, "flag": None}
+
+def test_run_on_graph(graph):
+    seed_school(graph, "s1")
+    questions = add_questions(graph, per_section=1)
+    ali, ayse = add_student(graph, "ali", "7-A"), add_student(graph, "ayse", "7-A")
+    record_exam(graph, ali, questions, {"q1_0"}, "2025-03-03T10:00:00")
+    record_exam(graph, ayse, questions, {"q1_0", "q2_0"}, "2025-03-03T11:00:00")
+    summary = run(graph)
+    assert summary["answers"] == 8 and summary["attempts"] == 2
+    stored = {r["id"]: r for r in graph.run("""
+    MATCH (q:Question)
+    RETURN q.id AS id, q.item_responses AS responses, q.difficulty AS difficulty,
+           q.distractor_effectiveness AS distractor_effectiveness
+    """).data()}
+    assert stored["q1_0"] == {"id": "q1_0", "responses": 2, "difficulty": 1.0, "distractor_effectiveness": 0.0}
+    assert stored["q2_0"]["difficulty"] == 0.5 and stored["q2_0"]["distractor_effectiveness"] == 1.0
+    assert stored["q3_0"]["difficulty"] == 0.0
+
+def test_million_answers_in_one_pass():
+    n_attempts, per_attempt, n_questions = 50_000, 20, 500
+    rng = np.random.default_rng(1)
+    rows = np.repeat(np.arange(n_attempts, dtype=np.int32), per_attempt)
+    cols = rng.integers(0, n_questions, size=rows.size, dtype=np.int32)
+    scores = (rng.random(rows.size) < 0.6).astype(np.float64)
+    start = time.perf_counter()
+    responses, difficulty, discrimination = analyze(rows, cols, scores, n_attempts, n_questions)
+    elapsed = time.perf_counter() - start
+    assert responses.sum() == 1_000_000
+    assert np.all(np.abs(difficulty - 0.6) < 0.1)
+    assert np.all(np.abs(discrimination) < 0.2)
+    assert elapsed < 5
@@ -0,0 +1,128 @@
+# tests/test_json_benchmark.py
+import sys
+import os
+import gzip
+import json
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.fast_json import dumps, orjson
+from tools.compression import compress_body, AVAILABLE_ENCODINGS
+
+ROUNDS = 20
+
+# Payloads in the shapes the endpoints send; test_payloads_match_response_models
+# keeps them in step with the routes' response models.
+
+def question(i, section):
+    return {
+        "id": f"q{i}", "external_id": f"ext-{i}", "section": section,
+        "question": f"Soru {i}: Aşağıdakilerden hangisi doğrudur? " * 2, "points": 1 + i % 3, "q_type": "multiple_choice",
+        "choices": [{"choice_text": f"Seçenek {t} / {i}", "is_correct": t == "A", "correct_position": None} for t in "ABCD"]
+    }
+
+def question_bank():
+    return [question(i, 1 + i % 4) for i in range(800)]
+
+def paper_question(i, section):
+    return {
+        "question_id": f"q{section}_{i}", "external_id": f"ext-{section}-{i}",
+        "question": f"Soru {i}: Aşağıdakilerden hangisi doğrudur? " * 2, "points": 1 + i % 3, "type": "multiple_choice",
+        "choices": [{"choice_id": f"q{section}_{i}_{t}", "choice_text": f"Seçenek {t} / {i}"} for t in "ABCD"]
+    }
+
+def exam_start():
+    return {
+        "message": "Exam started", "exam_id": "e1", "status": "in_progress",
+        "questions": {section: [paper_question(i, section) for i in range(25)] for section in range(1, 5)}
+    }
+
+def statistics():
+    # Teacher view, the one served to most clients.
+    sections = (1, 2, 3, 4)
+    return {
+        "teacher_class_stats": [
+            {"section_number": s, "section_name": f"Section {s}", "correct_answers": 412, "wrong_answers": 188,
+             "exam_takers": 30, "success_rate": 68.67} for s in sections
+        ],
+        "school_summary": [
+            {"section_number": s, "section_name": f"Section {s}", "correct_answers_total": 2410,
+             "wrong_answers_total": 1190, "exam_takers": 180, "success_rate": 66.94, "average_percentage": 64.2}
+            for s in sections
+        ],
+        "question_stats": {s: [
+            {"question_text": f"Soru {i}: Aşağıdakilerden hangisi doğrudur?", "correct_count": 20, "wrong_count": 10,
+             "difficulty": 0.66, "discrimination": 0.31, "distractor_effectiveness": 0.67, "item_flag": None}
+            for i in range(200)
+        ] for s in sections}
+    }
+
+def results_v2():
+    return {"student_number": 17, "class_name": "9A", "attempts": 2, "overall_percentage": 74.5, "exams": [{
+        "start_time": "Jan 10, 2025 09:00:00", "end_time": "Jan 10, 2025 10:00:00", "pass_fail": "failed", "exam_percentage": 74.5,
+        "sections_details": [{"section_number": s, "correct_answers": 18, "wrong_answers": 7, "so": 65.2, "oo": 61.0,
+                              "notu": 72.0, "ort": 70.1, "percentile_rank": 0.62, "school_percentile_rank": 0.58} for s in range(1, 5)],
+        "questions_details": [{"question_text": f"Soru {i}", "student_answers": ["A"], "correct_answers": ["A", "B"],
+                               "status": "Partially Correct" if i % 5 == 0 else "Correct",
+                               "points_earned": 0.5 if i % 5 == 0 else 1, "points_possible": 1} for i in range(100)]
+    } for _ in range(2)]}
+
+# endpoint -> (payload, router module, path within the router)
+ENDPOINTS = {
+    "GET /questions/": (question_bank, "questions", "/"),
+    "POST /exams/start": (exam_start, "exams", "/start"),
+    "GET /stats/": (statistics, "stats", "/"),
+    "GET /students/results_v2": (results_v2, "results", "/results_v2")
+}
+
+def stdlib_dumps(content):
+    # What JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def cpu_ms(fn, content):
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        fn(content)
+    return (time.process_time() - started) / ROUNDS * 1000
+
+def test_bytes_on_wire_and_serialization_cpu():
+    print(f"\n{'endpoint':24} {'identity':>9} {'gzip':>8} {'br':>8} {'stdlib ms':>10} {'fast ms':>8}")
+    for name, (build, _, _) in ENDPOINTS.items():
+        content = build()
+        body = dumps(content)
+        # Section keys become strings on the wire either way.
+        assert json.loads(body) == json.loads(stdlib_dumps(content))
+        gz = compress_body(body, "gzip")
+        assert gzip.decompress(gz) == body and len(gz) < len(body) / 3
+        br = len(compress_body(body, "br")) if "br" in AVAILABLE_ENCODINGS else None
+        stdlib_cpu, fast_cpu = cpu_ms(stdlib_dumps, content), cpu_ms(dumps, content)
+        print(f"{name:24} {len(body):9} {len(gz):8} {br or '-':>8} {stdlib_cpu:10.3f} {fast_cpu:8.3f}")
+        if orjson is not None:
+            assert fast_cpu < stdlib_cpu
+
+def test_default_response_path_cost():
+    # FastAPI's path for a returned dict: response_model validation, jsonable_encoder, stdlib JSON.
+    pytest.importorskip("fastapi")
+    pytest.importorskip("neo4j")
+    from typing import List
+    from pydantic import parse_obj_as
+    from fastapi.encoders import jsonable_encoder
+    from routers.questions import QuestionResponse
+    bank = question_bank()
+    default_cpu = cpu_ms(lambda c: stdlib_dumps(jsonable_encoder(parse_obj_as(List[QuestionResponse], c))), bank)
+    fast_cpu = cpu_ms(dumps, bank)
+    print(f"\nGET /questions/ serialization: default {default_cpu:.2f} ms, FastJSONResponse {fast_cpu:.2f} ms")
+    assert fast_cpu < default_cpu
+
+def test_payloads_match_response_models():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("neo4j")
+    import importlib
+    from pydantic import parse_obj_as
+    from fastapi.encoders import jsonable_encoder
+    for name, (build, module, path) in ENDPOINTS.items():
+        method = name.split()[0]
+        router = importlib.import_module(f"routers.{module}").router
+        model = next(r.response_model for r in router.routes if r.path == path and method in r.methods)
+        body = json.loads(dumps(build()))
+        assert json.loads(json.dumps(jsonable_encoder(parse_obj_as(model, body)))) == body, name
@@ -0,0 +1,93 @@
+# tests/test_password_pool.py
+import sys
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+bcrypt = pytest.importorskip("bcrypt")
+from tools.utils import PasswordHasher, PasswordHasherBusy
+
+ROUNDS = 10
+STORM = 100
+REQUEST_THREADS = 8
+
+def cheap_submit():
+    time.sleep(0.001)  # stands in for a graded submit
+
+async def submit_latency_during(storm):
+    loop = asyncio.get_running_loop()
+    tasks = [asyncio.ensure_future(login()) for login in storm]
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    await loop.run_in_executor(None, cheap_submit)
+    latency = time.perf_counter() - started
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return latency, results
+
+def run_with_request_pool(coro_factory):
+    request_pool = ThreadPoolExecutor(max_workers=REQUEST_THREADS)
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(request_pool)
+    try:
+        return loop.run_until_complete(coro_factory())
+    finally:
+        loop.close()
+        request_pool.shutdown(wait=True)
+
+def test_hash_and_check_roundtrip():
+    hasher = PasswordHasher(workers=1, queue_limit=4, rounds=4)
+    try:
+        hashed = hasher.hash("Secret123")
+        assert hashed.startswith("$2b$04$")
+        assert hasher.check("Secret123", hashed) and not hasher.check("wrong", hashed)
+        assert hasher.stats()["completed"] == 3 and hasher.stats()["pending"] == 0
+    finally:
+        hasher.stop()
+
+def test_submit_latency_flat_during_login_storm():
+    hashed = bcrypt.hashpw(b"Secret123", bcrypt.gensalt(rounds=ROUNDS)).decode()
+
+    async def inline():
+        # Before: bcrypt on the request threads.
+        loop = asyncio.get_running_loop()
+        storm = [lambda: loop.run_in_executor(None, bcrypt.checkpw, b"Secret123", hashed.encode())
+                 for _ in range(STORM)]
+        return await submit_latency_during(storm)
+
+    hasher = PasswordHasher(workers=2, queue_limit=16, rounds=ROUNDS)
+
+    async def pooled():
+        storm = [lambda: hasher.check_async("Secret123", hashed) for _ in range(STORM)]
+        return await submit_latency_during(storm)
+
+    inline_latency, _ = run_with_request_pool(inline)
+    try:
+        pooled_latency, results = run_with_request_pool(pooled)
+    finally:
+        hasher.stop()
+    rejected = sum(1 for r in results if isinstance(r, PasswordHasherBusy))
+    print(f"\nsubmit latency during {STORM} logins: inline {inline_latency * 1000:.1f} ms, "
+          f"pooled {pooled_latency * 1000:.1f} ms ({rejected} logins answered 503)")
+    assert rejected >= STORM // 2
+    assert all(r is True for r in results if not isinstance(r, PasswordHasherBusy))
+    assert pooled_latency < 0.1
+    assert pooled_latency < inline_latency / 3
+
+def test_taken_username_is_rejected_before_hashing(monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi import HTTPException
+    from tests.helpers import FakeSession
+    import services.auth as auth
+    hasher = PasswordHasher(workers=1, queue_limit=4, rounds=4)
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    session = FakeSession(lambda query, params: [{"u": {"username": params["username"]}}])
+    try:
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.register(session, " Ali ", "Secret123", "Ali", "Veli", "7-A", "student"))
+    finally:
+        hasher.stop()
+    assert exc.value.status_code == 400
+    assert hasher.stats()["completed"] == 0 and len(session.calls) == 1
+    assert session.calls[0][1] == {"username": "ali"}
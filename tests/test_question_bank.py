@@ -0,0 +1,70 @@
+# tests/test_question_bank.py
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tests.helpers import FakeSession
+from tools.question_bank import QuestionBankCache, bump_bank_version
+
+class BankGraph:
+    """A QuestionBank version counter and its questions, answered through FakeSession."""
+
+    def __init__(self, questions):
+        self.version = 1
+        self.questions = questions
+
+    def respond(self, query, params):
+        if "MERGE (b:QuestionBank" in query:
+            self.version += 1
+            return [{"version": self.version}]
+        if "MATCH (b:QuestionBank" in query:
+            return [{"version": self.version}]
+        if "MATCH (q:Question)" in query:
+            return [{"q": {k: v for k, v in q.items() if k != "choices"}, "choices": q["choices"] + [None]}
+                    for q in self.questions]
+        return []
+
+def question(qid, section, q_type="single_choice"):
+    return {"id": qid, "section": section, "type": q_type, "choices": [{"id": f"{qid}_A", "choice_text": "A"}]}
+
+def bank_reads(session):
+    return sum(1 for query in session.queries if "MATCH (q:Question)" in query)
+
+def test_unchanged_version_reads_only_the_counter():
+    bank = BankGraph([question("q1", 1), question("q2", 1, "true_false"), question("q3", 2)])
+    session = FakeSession(bank.respond)
+    cache = QuestionBankCache()
+    index = cache.get_index(session)
+    assert len(index) == 3 and index.by_section[1] == ["q1", "q2"]
+    assert index.by_section_type[(1, "true_false")] == ["q2"]
+    assert index.by_id["q1"]["choices"] == [{"id": "q1_A", "choice_text": "A"}]
+    for _ in range(5):
+        assert cache.get_index(session) is index
+    assert bank_reads(session) == 1 and len(session.calls) == 7
+    stats = cache.stats()
+    assert (stats["version"], stats["size"], stats["hits"], stats["misses"]) == (1, 3, 5, 1)
+    assert stats["hit_rate"] == round(5 / 6, 4)
+
+def test_version_bump_reloads_and_notifies_listeners():
+    bank = BankGraph([question("q1", 1)])
+    session = FakeSession(bank.respond)
+    cache = QuestionBankCache()
+    reloads = []
+    cache.add_listener(lambda questions: reloads.append([q["id"] for q in questions]))
+    old = cache.get_index(session)
+    bank.questions.append(question("q2", 3))
+    # Another worker's write is invisible until the version moves.
+    assert cache.get_index(session) is old and reloads == [["q1"]]
+    assert bump_bank_version(session) == 2
+    version, index = cache.get_versioned_index(session)
+    assert version == 2 and index is not old and index.by_section[3] == ["q2"]
+    assert reloads == [["q1"], ["q1", "q2"]] and bank_reads(session) == 2
+    assert cache.stats()["misses"] == 2
+
+def test_invalidate_forces_a_reload():
+    bank = BankGraph([question("q1", 1)])
+    session = FakeSession(bank.respond)
+    cache = QuestionBankCache()
+    cache.get(session)
+    cache.invalidate()
+    assert cache.stats()["size"] == 0 and cache.stats()["version"] is None
+    assert [q["id"] for q in cache.get(session)] == ["q1"] and bank_reads(session) == 2
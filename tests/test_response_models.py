@@ -0,0 +1,81 @@
+# tests/test_response_models.py
+import sys
+import os
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+pytest.importorskip("fastapi")
+pytest.importorskip("neo4j")
+from pydantic import parse_obj_as
+from fastapi.encoders import jsonable_encoder
+from tests.helpers import FakeSession
+from tools.responses import FastJSONResponse
+from tools.results import load_exam_results, summarize_exam, freeze_summary, SUMMARIES_QUERY
+from services.stats import build_statistics
+from routers import questions as questions_router, results as results_router, stats as stats_router
+
+# FastJSONResponse bypasses response_model, so these check the bodies the
+# routes actually send against the models they declare.
+
+def declared_model(router, path):
+    return next(route.response_model for route in router.routes if route.path == path and "GET" in route.methods)
+
+def assert_matches_model(router, path, response):
+    body = json.loads(response.body)
+    parsed = parse_obj_as(declared_model(router, path), body)
+    # Validation must not coerce anything (e.g. 2.5 points down to 2).
+    assert json.loads(json.dumps(jsonable_encoder(parsed))) == body
+
+def test_results_v2_body_matches_model():
+    answers = [{
+        "points_earned": earned,
+        "question": {"id": f"q{i}", "question": f"Soru {i}", "section": 1 + i % 4, "points": 5, "type": "multiple_choice"},
+        "choices": [{"id": f"q{i}_{t}", "choice_text": t, "is_correct": t in "AB", "correct_position": None} for t in "ABC"],
+        "chosen": [f"q{i}_A"]
+    } for i, earned in enumerate([5, 2.5, 0, 5])]
+    summary = freeze_summary(summarize_exam("2025-03-03T10:00:00", "2025-03-03T10:40:00", answers))
+    stats = [{"section_number": 1, "section_percentage": 61.2, "school_percentage_sum": 300.0, "school_exam_takers": 5,
+              "histogram": [1] * 20, "school_histogram": None}]
+    session = FakeSession({SUMMARIES_QUERY: [{"stats": stats, "summaries": [summary], "results": 1}]})
+    user = {"user_id": "u1", "school_id": "s1", "class_name": "7-A", "okul_no": 3, "attempts": 1, "score_avg": 62.5}
+    response = FastJSONResponse(load_exam_results(session, user))
+    assert json.loads(response.body)["exams"][0]["questions_details"][1]["points_earned"] == 2.5
+    assert_matches_model(results_router.router, "/results_v2", response)
+
+def test_questions_body_matches_model():
+    session = FakeSession(lambda query, params: [
+        {"q": {"id": "q1", "external_id": "ext-1", "section": 2, "question": "Soru 1", "points": 1, "type": "ordering"},
+         "choices": [{"choice_text": "A", "is_correct": False, "correct_position": 1}, None]},
+        {"q": {"id": "q2", "external_id": "ext-2", "section": 1, "question": "Soru 2", "points": 2, "type": "true_false"},
+         "choices": [{"choice_text": "Doğru", "is_correct": True, "correct_position": None}]}
+    ])
+    response = questions_router.list_all_questions(session=session, current_user={"role": "teacher"})
+    assert isinstance(response, FastJSONResponse)
+    assert_matches_model(questions_router.router, "/", response)
+
+def statistics_records(query, params):
+    st = {"school_id": "s1", "class_name": "7-A", "section_number": 1, "correct_questions": 12, "wrong_questions": 4,
+          "exam_takers": 4}
+    rollup = {"section_number": 1, "correct_questions": 30, "wrong_questions": 10, "exam_takers": 10,
+              "percentage_sum": 712.5}
+    if "MATCH (st:Statistics" in query:
+        return [{"st": st}, {"st": dict(st, section_number=2, correct_questions=0, wrong_questions=0, exam_takers=0)}]
+    if "SchoolStatistics" in query:
+        return [{"ss": rollup}]
+    if "GlobalStatistics" in query:
+        return [{"gs": rollup}]
+    return [
+        {"section": 1, "question_text": "Soru 1", "correct_count": 3, "wrong_count": 1, "difficulty": 0.7125,
+         "discrimination": 0.31, "distractor_effectiveness": 0.5, "item_flag": None},
+        {"section": 2, "question_text": "Soru 2", "correct_count": 0, "wrong_count": 0, "difficulty": None,
+         "discrimination": None, "distractor_effectiveness": None, "item_flag": "review"}
+    ]
+
+@pytest.mark.parametrize("user", [
+    {"role": "teacher", "school_id": "s1", "class_name": "7-A", "registered_section": "1,2"},
+    {"role": "admin"},
+    {"role": "student"}
+])
+def test_stats_body_matches_model(user):
+    response = FastJSONResponse(build_statistics(FakeSession(statistics_records), user))
+    assert_matches_model(stats_router.router, "/", response)
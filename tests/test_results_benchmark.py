@@ -0,0 +1,126 @@
+# tests/test_results_benchmark.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.results import load_exam_results, summarize_exam, freeze_summary, SUMMARIES_QUERY, RESULTS_QUERY
+
+class FakeResult:
+    def __init__(self, records=()):
+        self._records = list(records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+class CountingSession:
+    """Returns `summaries` for the summary lookup and `record` for the legacy rebuild."""
+
+    def __init__(self, record=None, summaries=None):
+        self.record = record
+        self.summaries = summaries
+        self.queries = 0
+
+    def run(self, query, params=None):
+        self.queries += 1
+        if query == SUMMARIES_QUERY:
+            if self.summaries is None:
+                # Results exist but none carries a summary yet.
+                return FakeResult([{"stats": [], "summaries": [], "results": len(self.record["exams"]) if self.record else 0}])
+            return FakeResult([self.summaries])
+        assert query == RESULTS_QUERY
+        return FakeResult([self.record] if self.record else [])
+
+def make_exam(num_questions, start_time):
+    answers = []
+    for i in range(num_questions):
+        qid = f"q{i}"
+        choices = [
+            {"id": f"{qid}_{t}", "choice_text": t, "is_correct": t == "A", "correct_position": None}
+            for t in ("A", "B", "C", "D")
+        ]
+        chosen = [f"{qid}_A"] if i % 3 else [f"{qid}_B"]
+        answers.append({
+            "points_earned": 5 if i % 3 else 0,
+            "question": {"id": qid, "question": f"Question {i}", "section": i % 4 + 1, "points": 5, "type": "single_choice"},
+            "choices": choices,
+            "chosen": chosen
+        })
+    return {"start_time": start_time, "end_time": start_time, "answers": answers}
+
+def legacy_queries(num_exams, num_questions):
+    # Exams, statistics, then per exam the ExamAnswer read and per answer two
+    # Question lookups, the HAS_CHOICE fetch and the CHOSE lookup.
+    return 2 + num_exams * (1 + 4 * num_questions)
+
+USER = {"user_id": "u1", "school_id": "s1", "class_name": "7-A", "okul_no": 12, "attempts": 2, "score_avg": 66.67}
+
+STATS = [
+    {"section_number": s, "section_percentage": 61.234, "school_percentage_sum": 1450.0, "school_exam_takers": 20,
+     "histogram": [0] * 10 + [4] * 10, "school_histogram": [1] * 20}
+    for s in (1, 2, 3, 4)
+]
+
+def summaries_record(exams):
+    summaries = [freeze_summary(summarize_exam(e["start_time"], e["end_time"], e["answers"])) for e in exams]
+    return {"stats": STATS, "summaries": summaries, "results": len(summaries)}
+
+def test_results_read_stored_summaries():
+    print("\n--- results_v2 with stored summaries ---")
+    for num_questions in (20, 80):
+        exams = [make_exam(num_questions, "2025-01-01T10:00:00"), make_exam(num_questions, "2025-01-02T10:00:00")]
+        session = CountingSession(summaries=summaries_record(exams))
+        started = time.perf_counter()
+        response = load_exam_results(session, USER)
+        elapsed = time.perf_counter() - started
+        print(f"questions={num_questions:>3}  {session.queries} query, {elapsed * 1000:.2f} ms")
+        assert session.queries == 1
+        legacy = load_exam_results(CountingSession(record={"stats": STATS, "exams": exams}), USER)
+        assert response == legacy
+
+def test_results_query_count_is_fixed():
+    print("\n--- results_v2 queries per request (legacy results) ---")
+    for num_questions in (20, 80):
+        record = {
+            "stats": STATS,
+            "exams": [make_exam(num_questions, "2025-01-01T10:00:00"), make_exam(num_questions, "2025-01-02T10:00:00")]
+        }
+        session = CountingSession(record=record)
+        started = time.perf_counter()
+        response = load_exam_results(session, USER)
+        elapsed = time.perf_counter() - started
+        print(f"questions={num_questions:>3}  before: {legacy_queries(2, num_questions):>4} queries"
+              f"  after: {session.queries} queries, shaping {elapsed * 1000:.2f} ms")
+        assert session.queries == 2
+        assert len(response["exams"]) == 2
+        exam = response["exams"][0]
+        assert len(exam["questions_details"]) == num_questions
+        assert [s["section_number"] for s in exam["sections_details"]] == [1, 2, 3, 4]
+        assert exam["sections_details"][0]["so"] == 61.23
+        assert exam["sections_details"][0]["oo"] == 72.5
+        if num_questions == 20:
+            # Section 1 scores 60% and section 2 80%; the class histogram puts 40
+            # scores evenly over the 50-100 bins.
+            assert exam["sections_details"][0]["notu"] == 60.0
+            assert exam["sections_details"][0]["percentile_rank"] == 20.0
+            assert exam["sections_details"][1]["percentile_rank"] == 60.0
+        assert exam["start_time"] == "Jan 01, 2025 10:00:00"
+
+def test_results_shape_answers():
+    record = {"stats": [], "exams": [make_exam(3, "2025-01-01T10:00:00")]}
+    response = load_exam_results(CountingSession(record=record), USER)
+    details = response["exams"][0]["questions_details"]
+    assert details[0]["status"] == "Wrong"
+    assert details[0]["student_answers"] == ["B"]
+    assert details[0]["correct_answers"] == ["A"]
+    assert details[1]["status"] == "Correct"
+    assert response["exams"][0]["pass_fail"] == "failed"
+    assert response["exams"][0]["sections_details"][0]["so"] == 0
+    assert response["exams"][0]["sections_details"][0]["oo"] == 0
+    assert response["exams"][0]["sections_details"][0]["percentile_rank"] is None
+
+def test_results_without_exams():
+    session = CountingSession(summaries={"stats": [], "summaries": [], "results": 0})
+    response = load_exam_results(session, USER)
+    assert session.queries == 1
+    assert response["exams"] == []
+    assert response["overall_percentage"] == 0.0
@@ -0,0 +1,108 @@
+# tests/test_services.py
+import sys
+import os
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+pytest.importorskip("fastapi")
+pytest.importorskip("neo4j")
+from fastapi import HTTPException
+from tests.helpers import FakeSession
+from tools.exam import freeze_paper
+import services.exams as exams_service
+import services.users as users_service
+import services.auth as auth_service
+import services.stats as stats_service
+import services.results as results_service
+
+STUDENT = {"user_id": "u1", "username": "ali", "role": "student", "attempts": 0, "class_name": "7-A", "school_id": "s1"}
+
+class FakeGradingPool:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, submission_id):
+        self.enqueued.append(submission_id)
+        return True
+
+@pytest.fixture
+def submit_paths(monkeypatch):
+    calls = {"graded": [], "recorded": []}
+    pool = FakeGradingPool()
+    monkeypatch.setattr(exams_service, "submit_exam", lambda *args: calls["graded"].append(args))
+    monkeypatch.setattr(exams_service, "record_submission",
+                        lambda *args: calls["recorded"].append(args) or "sub-1")
+    monkeypatch.setattr(exams_service, "grading_pool", pool)
+    calls["pool"] = pool
+    return calls
+
+def test_sync_submit_grades_in_the_request(submit_paths):
+    answers = {"q1": {"selected_texts": ["4"]}}
+    assert exams_service.submit(None, STUDENT, "e1", answers) == {"message": "Exam submitted successfully."}
+    assert submit_paths["graded"] == [(None, STUDENT, "e1", answers)]
+    assert submit_paths["recorded"] == [] and submit_paths["pool"].enqueued == []
+
+def test_async_submit_queues_for_the_grading_pool(submit_paths):
+    result = exams_service.submit(None, STUDENT, "e1", {}, mode="async")
+    assert result["status"] == "pending" and result["submission_id"] == "sub-1"
+    assert submit_paths["pool"].enqueued == ["sub-1"] and submit_paths["graded"] == []
+
+def test_submit_rules(submit_paths):
+    for user, code in ((dict(STUDENT, role="teacher"), 403), (dict(STUDENT, attempts=2), 400)):
+        with pytest.raises(HTTPException) as exc:
+            exams_service.submit(None, user, "e1", {}, mode="async")
+        assert exc.value.status_code == code
+    assert submit_paths["graded"] == [] and submit_paths["recorded"] == []
+
+def test_start_resumes_the_frozen_paper():
+    paper = {1: [{"question_id": "q1", "external_id": "x1", "question": "2+2?", "points": 1, "type": "single_choice",
+                  "choices": [{"choice_id": "c1", "choice_text": "4"}]}]}
+    session = FakeSession(lambda query, params: [{"e": {"exam_id": "e1", "status": "in_progress",
+                                                       "paper": freeze_paper(paper)}}])
+    body = exams_service.start_exam(session, STUDENT)
+    assert body["exam_id"] == "e1" and body["status"] == "in_progress" and body["questions"] == paper
+    assert len(session.calls) == 1
+    grading = FakeSession(lambda query, params: [{"e": {"exam_id": "e1", "status": "grading"}}])
+    with pytest.raises(HTTPException) as exc:
+        exams_service.start_exam(grading, STUDENT)
+    assert exc.value.status_code == 409
+
+def test_update_profile_rules(monkeypatch):
+    updated = []
+    monkeypatch.setattr(users_service, "update_user", lambda session, user, user_id, **fields: updated.append(fields) or True)
+    assert users_service.update_profile(None, STUDENT) == {"message": "No changes provided."}
+    with pytest.raises(HTTPException) as exc:
+        users_service.update_profile(None, STUDENT, new_password="short")
+    assert exc.value.status_code == 400 and updated == []
+    result = users_service.update_profile(None, STUDENT, name="Ali", surname=None)
+    assert updated == [{"name": "Ali"}] and result["user"]["name"] == "Ali"
+
+def test_list_users_reads_class_edges():
+    with pytest.raises(HTTPException) as exc:
+        users_service.list_users(FakeSession(), STUDENT)
+    assert exc.value.status_code == 403
+    session = FakeSession(lambda query, params: [
+        {"u": {"user_id": "u1", "username": "ali"}, "class_name": "7-A", "school_id": "s1"},
+        {"u": {"user_id": "a1", "username": "admin"}, "class_name": None, "school_id": None}
+    ])
+    users = users_service.list_users(session, {"role": "admin"})
+    assert [(u["username"], u["class_name"], u["school_id"]) for u in users] == [("ali", "7-A", "s1"), ("admin", "", "")]
+    assert "BELONGS_TO" in session.calls[0][0]
+
+def test_login_rejects_an_unknown_user():
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(auth_service.login(FakeSession(), "nobody", "Secret123"))
+    assert exc.value.status_code == 401
+
+def test_role_checks():
+    with pytest.raises(HTTPException) as exc:
+        stats_service.trends(FakeSession(), STUDENT)
+    assert exc.value.status_code == 403
+    with pytest.raises(HTTPException) as exc:
+        stats_service.trends(FakeSession(), {"role": "admin"}, section=[9])
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        results_service.student_results_etag(FakeSession(), dict(STUDENT, role="teacher"))
+    assert exc.value.status_code == 403
+    assert stats_service.statistics(FakeSession(), STUDENT) == (None, {"per_class": {}, "overall_summary": [],
+                                                                      "question_stats": {}})
@@ -0,0 +1,45 @@
+# tests/test_static_assets.py
+import sys
+import os
+import gzip
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tools.static_assets import AssetManifest, choose_encoding, fingerprint
+
+def make_static(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "style.css").write_text("body { color: #333; }\n" * 200)
+    (tmp_path / "js" / "timer.js").write_text("let t = 0;\n")
+    return AssetManifest(directory=str(tmp_path))
+
+def test_fingerprint_keeps_directory_and_extension():
+    assert fingerprint("js/timer.js", "abc123") == "js/timer.abc123.js"
+
+def test_urls_are_content_hashed(tmp_path):
+    manifest = make_static(tmp_path)
+    url = manifest.url("style.css")
+    assert url.startswith("/static/style.") and url.endswith(".css") and url != "/static/style.css"
+    assert manifest.url("/js/timer.js").startswith("/static/js/timer.")
+    assert manifest.url("missing.png") == "/static/missing.png"
+
+    (tmp_path / "style.css").write_text("body { color: #000; }\n" * 200)
+    manifest.build()
+    assert manifest.url("style.css") != url
+
+def test_precompressed_bodies(tmp_path):
+    manifest = make_static(tmp_path)
+    css = manifest.lookup(manifest.url("style.css")[len("/static/"):])
+    assert css.media_type == "text/css"
+    assert gzip.decompress(css.bodies["gzip"]) == css.bodies["identity"]
+    assert len(css.bodies["gzip"]) < len(css.bodies["identity"]) // 10
+    # Too small to bother compressing
+    js = manifest.lookup(manifest.url("js/timer.js")[len("/static/"):])
+    assert set(js.bodies) == {"identity"}
+    assert manifest.lookup("style.css") is None
+
+def test_choose_encoding():
+    both = {"identity": b"", "gzip": b"", "br": b""}
+    assert choose_encoding("gzip, deflate, br", both) == "br"
+    assert choose_encoding("gzip, br;q=0", both) == "gzip"
+    assert choose_encoding("br", {"identity": b"", "gzip": b""}) == "identity"
+    assert choose_encoding("*", both) == "br"
+    assert choose_encoding(None, both) == "identity"
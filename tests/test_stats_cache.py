@@ -0,0 +1,131 @@
+# tests/test_stats_cache.py
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from tests.helpers import FakeSession, seed_school, add_questions, add_student, record_exam
+from tools.counters import CounterBuffer, counter_buffer
+from tools.stats_cache import StatsViewCache, teacher_stats_cache
+from tools.statistics_utils import rollup_summary
+
+KEY = ("s1", "7-A", (1, 2, 3, 4))
+
+def test_teacher_view_is_built_once():
+    cache = StatsViewCache(max_size=16, ttl=60)
+    builds = []
+    def build():
+        builds.append(1)
+        time.sleep(0.02)  # stands in for the statistics queries
+        return {"teacher_class_stats": []}
+    etag, body = cache.get_or_build(KEY, build)
+    started = time.perf_counter()
+    for _ in range(1000):
+        assert cache.get_or_build(KEY, build) == (etag, body)
+    per_hit = (time.perf_counter() - started) / 1000
+    print(f"\nteacher view cache hit: {per_hit * 1e6:.1f} us")
+    assert len(builds) == 1
+    assert per_hit < 0.001
+
+def test_submission_invalidates_only_its_school():
+    cache = StatsViewCache(max_size=16, ttl=60)
+    other = ("s2", "8-B", (1,))
+    etag, _ = cache.get_or_build(KEY, lambda: {"v": 1})
+    other_etag, _ = cache.get_or_build(other, lambda: {"v": 1})
+    cache.invalidate_school("s1")
+    new_etag, body = cache.get_or_build(KEY, lambda: {"v": 2})
+    assert body == {"v": 2} and new_etag != etag
+    assert cache.get_or_build(other, lambda: {"v": 2})[0] == other_etag
+
+def test_build_racing_an_invalidation_is_not_stored():
+    cache = StatsViewCache(max_size=16, ttl=60)
+    def build():
+        # A submission lands while the view is being built.
+        cache.invalidate_school("s1")
+        return {"v": "stale"}
+    cache.get_or_build(KEY, build)
+    assert cache.get_or_build(KEY, lambda: {"v": "fresh"})[1] == {"v": "fresh"}
+
+def test_rollup_summary():
+    summary = rollup_summary([
+        {"section_number": 2, "correct_questions": 30, "wrong_questions": 10, "exam_takers": 8, "percentage_sum": 560.0},
+        {"section_number": 1, "correct_questions": 0, "wrong_questions": 0, "exam_takers": 0}
+    ])
+    assert [s["section_number"] for s in summary] == [1, 2]
+    assert summary[0]["success_rate"] == 0 and summary[0]["average_percentage"] == 0
+    assert summary[1]["success_rate"] == 75.0
+    assert summary[1]["average_percentage"] == 70.0
+    assert summary[1]["section_name"] == "English"
+
+DELTA = {"id": "q1", "correct_count": 1, "wrong_count": 0, "zero_count": 0}
+
+def make_buffer(cache):
+    buffer = CounterBuffer(flush_interval=60)
+    buffer.add_listener(cache.invalidate)
+    buffer._session_factory = FakeSession
+    return buffer
+
+def test_counter_flush_drops_cached_views():
+    assert teacher_stats_cache.invalidate in counter_buffer._listeners
+    cache = StatsViewCache(max_size=16, ttl=60)
+    buffer = make_buffer(cache)
+    etag, _ = cache.get_or_build(KEY, lambda: {"correct_count": 0})
+    buffer.flush()  # nothing pending, nothing written
+    assert cache.get_or_build(KEY, lambda: {"correct_count": 1})[0] == etag
+    # Counters queued by a submission reach the graph only with the flush.
+    buffer.add([DELTA], [])
+    assert cache.get_or_build(KEY, lambda: {"correct_count": 1})[0] == etag
+    buffer.flush()
+    new_etag, body = cache.get_or_build(KEY, lambda: {"correct_count": 1})
+    assert body == {"correct_count": 1} and new_etag != etag
+
+def test_build_racing_a_counter_flush_is_not_stored():
+    cache = StatsViewCache(max_size=16, ttl=60)
+    buffer = make_buffer(cache)
+    def build():
+        buffer.add([DELTA], [])
+        buffer.flush()
+        return {"correct_count": 0}
+    cache.get_or_build(KEY, build)
+    assert cache.get_or_build(KEY, lambda: {"correct_count": 1})[1] == {"correct_count": 1}
+
+TEACHER = {"role": "teacher", "class_name": "7-A", "school_id": "s1", "registered_section": "1,2"}
+
+def test_teacher_view_shapes_query_results():
+    pytest.importorskip("fastapi")
+    from services.stats import build_statistics
+
+    def respond(query, params):
+        if "MATCH (st:Statistics" in query:
+            return [{"st": {"section_number": 1, "correct_questions": 6, "wrong_questions": 2, "exam_takers": 2}}]
+        if "MATCH (ss:SchoolStatistics" in query:
+            return [{"ss": {"section_number": 1, "correct_questions": 9, "wrong_questions": 3, "exam_takers": 3,
+                            "percentage_sum": 225.0}}]
+        if "MATCH (q:Question)" in query:
+            return [{"section": 2, "question_text": "Soru", "correct_count": 4, "wrong_count": 1, "difficulty": 0.8,
+                     "discrimination": 0.3, "distractor_effectiveness": 0.5, "item_flag": None}]
+        return []
+    session = FakeSession(respond)
+    body = build_statistics(session, TEACHER)
+    assert all(params["sections"] == [1, 2] for _, params in session.calls)
+    assert body["teacher_class_stats"][0]["success_rate"] == 75.0
+    assert body["school_summary"][0]["average_percentage"] == 75.0
+    assert body["question_stats"] == {1: [], 2: [{
+        "question_text": "Soru", "correct_count": 4, "wrong_count": 1, "difficulty": 0.8,
+        "discrimination": 0.3, "distractor_effectiveness": 0.5, "item_flag": None
+    }]}
+
+def test_teacher_view_on_graph(graph):
+    pytest.importorskip("fastapi")
+    from services.stats import build_statistics
+    seed_school(graph, "s1")
+    questions = add_questions(graph)
+    ali = add_student(graph, "ali", "7-A")
+    record_exam(graph, ali, questions, {q["id"] for q in questions if q["section"] == 1}, "2025-03-01T10:00:00")
+    body = build_statistics(graph, TEACHER)
+    by_section = {st["section_number"]: st for st in body["teacher_class_stats"]}
+    assert by_section[1]["correct_answers"] == 2 and by_section[1]["exam_takers"] == 1
+    assert by_section[2]["wrong_answers"] == 2
+    assert sum(q["correct_count"] for q in body["question_stats"][1]) == 2
+    assert sum(q["wrong_count"] for q in body["question_stats"][2]) == 2
+    assert [s["exam_takers"] for s in body["school_summary"]] == [1, 1]
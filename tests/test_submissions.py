@@ -0,0 +1,104 @@
+# tests/test_submissions.py
+import sys
+import os
+import threading
+from datetime import datetime, timezone, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+pytest.importorskip("fastapi")
+pytest.importorskip("neo4j")
+import tools.submissions as submissions
+from tests.helpers import FakeSession
+from tools.exam import freeze_paper, RECORD_ANSWERS_QUERY, RECORD_RESULT_QUERY, SUBMISSION_GRADED_QUERY
+
+PAPER = freeze_paper({1: [{"question_id": "q1", "question": "2+2?", "points": 1, "type": "single_choice", "choices": []}]})
+
+def test_submitted_time_formats():
+    assert submissions.submitted_time({"submitted_at": "2025-03-01T10:00:00"}) == "2025-03-01T10:00:00"
+    aware = datetime(2025, 3, 1, 13, 0, tzinfo=timezone(timedelta(hours=3)))
+    assert submissions.submitted_time({"submitted_at": aware}) == "2025-03-01T10:00:00"
+
+def test_backlogged_submission_keeps_its_submit_time(monkeypatch):
+    submitted_at = datetime(2025, 3, 1, 10, 0, tzinfo=timezone.utc)
+    submission = {"id": "s1", "user_id": "u1", "exam_id": "e1", "answers": '{"q1":{"selected_texts":["4"]}}',
+                  "submitted_at": submitted_at, "claim": "c1"}
+
+    def respond(query, params):
+        if "MATCH (s:Submission" in query:
+            return [{"s": submission}]
+        if "MATCH (e:Exam" in query:
+            return [{"e": {"exam_id": "e1", "paper": PAPER, "start_time": "2025-03-01T09:30:00"}}]
+        return []
+    graded = []
+    monkeypatch.setattr(submissions, "fetch_user", lambda session, user_id: {"user_id": user_id, "attempts": 0})
+    monkeypatch.setattr(submissions, "process_results", lambda *args, **kwargs: graded.append((args, kwargs)))
+    submissions.grade_submission(FakeSession(respond), "s1")
+    (args, kwargs), = graded
+    assert args[5] == "2025-03-01T10:00:00" and kwargs["submission_id"] == "s1" and kwargs["claim"] == "c1"
+
+class SubmissionGraph:
+    """One Submission's status and claim, locked the way the queries lock the node."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submission = {"id": "s1", "user_id": "u1", "exam_id": "e1", "status": "pending", "claim": None,
+                           "answers": '{"q1":{"selected_texts":["4"]}}', "submitted_at": "2025-03-01T10:00:00"}
+        self.expired = False
+
+    def respond(self, query, params):
+        with self.lock:
+            s = self.submission
+            if "SET s.status = 'grading'" in query:
+                if s["status"] == "pending" or (s["status"] == "grading" and self.expired):
+                    s.update(status="grading", claim=params["claim"])
+                    self.expired = False
+                    return [{"s": dict(s)}]
+                return []
+            if query == SUBMISSION_GRADED_QUERY:
+                if s["status"] == "grading" and s["claim"] == params["claim"]:
+                    s["status"] = "graded"
+                    return [{"id": s["id"]}]
+                return []
+            if "MATCH (e:Exam" in query:
+                return [{"e": {"exam_id": "e1", "paper": PAPER, "start_time": "2025-03-01T09:30:00"}}]
+            return []
+
+def test_taken_over_claim_records_once(monkeypatch):
+    monkeypatch.setattr(submissions, "fetch_user", lambda session, user_id: {"user_id": user_id, "attempts": 0,
+                                                                            "school_id": "s1", "class_name": "7-A"})
+    state = SubmissionGraph()
+    session = FakeSession(state.respond)
+    stale = submissions.claim_submission(session, "s1")
+    assert submissions.claim_submission(session, "s1") is None  # still held
+    state.expired = True  # the first worker outlived GRADING_CLAIM_TIMEOUT_SECONDS
+    fresh = submissions.claim_submission(session, "s1")
+    assert fresh["claim"] != stale["claim"]
+    workers = [threading.Thread(target=submissions.grade_claimed, args=(session, s)) for s in (stale, fresh)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert state.submission["status"] == "graded" and state.submission["claim"] == fresh["claim"]
+    assert session.queries.count(SUBMISSION_GRADED_QUERY) == 2
+    assert session.queries.count(RECORD_ANSWERS_QUERY) == 1 and session.queries.count(RECORD_RESULT_QUERY) == 1
+
+def test_taken_over_claim_records_once_on_graph(graph):
+    from tests.helpers import seed_school, add_questions, add_student
+    from tools.exam import create_exam
+    seed_school(graph, "s1")
+    questions = add_questions(graph, per_section=1)
+    ali = add_student(graph, "ali", "7-A")
+    exam_id, _ = create_exam(graph, ali, {q["section"]: [q] for q in questions})
+    submission_id = submissions.record_submission(graph, ali, exam_id, {q["id"]: {"selected_texts": ["A"]} for q in questions})
+    stale = submissions.claim_submission(graph, submission_id)
+    graph.run("MATCH (s:Submission {id: $id}) SET s.claimed_at = datetime() - duration({hours: 1})",
+              {"id": submission_id}).consume()
+    submissions.grade_submission(graph, submission_id)  # takes the claim over and records
+    submissions.grade_claimed(graph, stale)
+    counts = graph.run("""
+    MATCH (s:Submission {id: $id}), (e:Exam {exam_id: $exam_id})
+    RETURN s.status AS status, COUNT { (e)-[:HAS_ANSWER]->() } AS answers,
+           COUNT { (:ExamResult {exam_id: $exam_id}) } AS results
+    """, {"id": submission_id, "exam_id": exam_id}).single()
+    assert (counts["status"], counts["answers"], counts["results"]) == ("graded", 4, 1)
+    assert graph.run("MATCH (q:Question) RETURN sum(q.correct_count) AS n").single()["n"] == 4
@@ -0,0 +1,89 @@
+# tests/test_trends.py
+import sys
+import os
+from datetime import date
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from tests.helpers import FakeSession, seed_school, add_questions, add_student, record_exam
+from tools.trends import trend_range, load_trends, backfill_buckets, TRENDS_QUERY, BACKFILL_BUCKETS_QUERY
+
+def test_default_ranges():
+    today = date(2025, 3, 12)  # a Wednesday
+    assert trend_range("day", today=today) == (date(2025, 2, 11), today)
+    start, end = trend_range("week", today=today)
+    assert start.weekday() == 0 and end == today
+    assert (end - start).days // 7 + 1 == 12
+
+def test_invalid_ranges():
+    with pytest.raises(ValueError):
+        trend_range("month")
+    with pytest.raises(ValueError):
+        trend_range("day", date_from="2025-03-10", date_to="2025-03-01")
+    with pytest.raises(ValueError):
+        trend_range("day", date_from="2020-01-01", date_to="2025-01-01")
+    with pytest.raises(ValueError):
+        trend_range("day", date_from="last week")
+
+def test_series_reads_one_range_query():
+    records = [
+        {"start": "2025-03-03", "section_number": 1, "correct": 30, "wrong": 10, "exam_takers": 8, "percentage_sum": 600.0},
+        {"start": "2025-03-10", "section_number": 1, "correct": 5, "wrong": 15, "exam_takers": 4, "percentage_sum": 100.0},
+        {"start": "2025-03-10", "section_number": 3, "correct": 0, "wrong": 0, "exam_takers": 0, "percentage_sum": None}
+    ]
+    session = FakeSession({TRENDS_QUERY: records})
+    start, end = trend_range("week", "2025-03-01", "2025-03-12")
+    trends = load_trends(session, "week", start, end, school_id="s1", class_name="7-A", sections=[3, 1])
+    assert len(session.calls) == 1
+    query, params = session.calls[0]
+    assert query == TRENDS_QUERY
+    assert params["date_from"] == "2025-02-24" and params["sections"] == [1, 3]
+    math, science = trends["sections"]
+    assert math["section_name"] == "Math"
+    assert [p["average_percentage"] for p in math["points"]] == [75.0, 25.0]
+    assert math["points"][0]["success_rate"] == 75.0
+    assert science["points"][0]["average_percentage"] == 0
+
+def test_backfill_reports_whether_it_applied(capsys):
+    applied = FakeSession({BACKFILL_BUCKETS_QUERY: [{"applied": True, "results": 3, "covered": 3, "buckets": 16}]})
+    assert backfill_buckets(applied) is True
+    partial = FakeSession({BACKFILL_BUCKETS_QUERY: [{"applied": False, "results": 3, "covered": 2, "buckets": 8}]})
+    assert backfill_buckets(partial) is False
+    assert "2 of 3" in capsys.readouterr().out
+    # Already applied: the query returns no row.
+    assert backfill_buckets(FakeSession()) is False
+
+def test_backfill_joins_the_class_graph():
+    assert "u.school_id" not in BACKFILL_BUCKETS_QUERY and "u.class_name" not in BACKFILL_BUCKETS_QUERY
+    assert "(u)-[:BELONGS_TO]->(c:Class)<-[:HAS_CLASS]-(s:School)" in BACKFILL_BUCKETS_QUERY
+
+BUCKETS_QUERY = """
+MATCH (b:StatisticsBucket)
+RETURN b.school_id AS school_id, b.class_name AS class_name, b.section_number AS section, b.period AS period,
+       toString(b.start) AS start, b.correct_questions AS correct, b.wrong_questions AS wrong,
+       b.exam_takers AS takers, b.percentage_sum AS percentage_sum
+ORDER BY school_id, class_name, section, period, start
+"""
+
+def test_backfill_rebuilds_buckets_on_graph(graph):
+    seed_school(graph, "s1")
+    questions = add_questions(graph)
+    ali, ayse = add_student(graph, "ali", "7-A"), add_student(graph, "ayse", "7-A")
+    record_exam(graph, ali, questions, {q["id"] for q in questions if q["section"] == 1}, "2025-03-03T10:00:00")
+    record_exam(graph, ayse, questions, {q["id"] for q in questions}, "2025-03-05T10:00:00")
+    # The buckets submit wrote are what the backfill must reproduce for older history.
+    expected = graph.run(BUCKETS_QUERY).data()
+    assert len(expected) == 4 * (2 + 1)
+    graph.run("MATCH (b:StatisticsBucket) DETACH DELETE b").consume()
+
+    # A result whose student has lost its class cannot be bucketed: no marker.
+    graph.run("MATCH (u:User {username: 'ali'})-[r:BELONGS_TO]->() DELETE r").consume()
+    assert backfill_buckets(graph) is False
+    assert graph.run("MATCH (m:Migration {name: 'statistics_buckets'}) RETURN m.applied_at AS at").single()["at"] is None
+    graph.run("MATCH (u:User {username: 'ali'}), (c:Class {name: '7-A'}) CREATE (u)-[:BELONGS_TO]->(c)").consume()
+
+    assert backfill_buckets(graph) is True
+    assert graph.run(BUCKETS_QUERY).data() == expected
+    assert backfill_buckets(graph) is False  # applied once
+    start, end = trend_range("week", "2025-03-03", "2025-03-09")
+    math = load_trends(graph, "week", start, end, school_id="s1", class_name="7-A", sections=[1])["sections"][0]
+    assert [(p["start"], p["exam_takers"], p["correct_answers"]) for p in math["points"]] == [("2025-03-03", 2, 4)]
@@ -0,0 +1,67 @@
+# tools/answer_keys.py
+import threading
+from tools.grading import build_answer_key
+from tools.question_bank import question_bank_cache
+
+ANSWER_KEY_QUERY = """
+UNWIND $question_ids AS qid
+MATCH (q:Question {id: qid})
+OPTIONAL MATCH (q)-[:HAS_CHOICE]->(c:Choice)
+RETURN q.id AS id, collect(c {.id, .choice_text, .is_correct, .correct_position}) AS choices
+"""
+
+def fetch_answer_keys(session, question_ids):
+    result = session.run(ANSWER_KEY_QUERY, {"question_ids": list(question_ids)})
+    return {record["id"]: build_answer_key(record["choices"]) for record in result}
+
+class AnswerKeyCache:
+    """
+    Read-through cache of answer keys by question id. Misses are fetched in one
+    query; the whole table is replaced whenever the question bank cache reloads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, session, question_ids):
+        with self._lock:
+            found = {qid: self._keys[qid] for qid in question_ids if qid in self._keys}
+        missing = [qid for qid in question_ids if qid not in found]
+        if missing:
+            fetched = fetch_answer_keys(session, missing)
+            found.update(fetched)
+            with self._lock:
+                self._keys.update(fetched)
+        with self._lock:
+            self.hits += len(question_ids) - len(missing)
+            self.misses += len(missing)
+        return found
+
+    def load(self, questions):
+        keys = {q["id"]: build_answer_key(q.get("choices", [])) for q in questions}
+        with self._lock:
+            self._keys = keys
+
+    def invalidate(self, question_ids=None):
+        with self._lock:
+            if question_ids is None:
+                self._keys = {}
+            else:
+                for qid in question_ids:
+                    self._keys.pop(qid, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._keys),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total > 0 else 0.0
+            }
+
+answer_key_cache = AnswerKeyCache()
+question_bank_cache.add_listener(answer_key_cache.load)
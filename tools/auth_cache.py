@@ -0,0 +1,74 @@
+# tools/auth_cache.py
+import hashlib
+import os
+import threading
+import time
+from tools.cache import LRUCache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+# Bounds staleness from changes made by other worker processes, which do not
+# see our invalidations.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "8192"))
+
+class PrincipalCache:
+    """
+    Resolved user dicts (User + Class + School) keyed by user_id. A generation
+    counter keeps a load that raced with an invalidation from being stored.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self._entries = LRUCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get_or_load(self, user_id, load):
+        user = self._entries.get(user_id)
+        if user is not None:
+            return dict(user)
+        with self._lock:
+            generation = self._generation
+        user = load()
+        if user is not None:
+            with self._lock:
+                if self._generation == generation:
+                    self._entries.set(user_id, dict(user))
+        return user
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation += 1
+        if user_id is None:
+            self._entries.invalidate()
+        else:
+            self._entries.pop(user_id)
+
+    def stats(self):
+        return self._entries.stats()
+
+class TokenCache:
+    """Verified token payloads keyed by the token's SHA-256, kept until the token expires."""
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE):
+        self._entries = LRUCache(max_size=max_size)
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_or_verify(self, token, verify):
+        key = self._key(token)
+        payload = self._entries.get(key)
+        if payload is not None:
+            return payload
+        payload = verify(token)
+        exp = payload.get("exp") if payload else None
+        if isinstance(exp, (int, float)) and exp > time.time():
+            self._entries.set(key, payload, ttl=exp - time.time())
+        return payload
+
+    def stats(self):
+        return self._entries.stats()
+
+user_cache = PrincipalCache()
+token_cache = TokenCache()
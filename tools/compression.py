@@ -0,0 +1,119 @@
+# tools/compression.py
+import gzip
+import os
+import threading
+from tools.static_assets import brotli, choose_encoding, COMPRESSIBLE_TYPES
+from tools.http_cache import encoded_etag
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Per-request brotli; the static pipeline precompresses at quality 11 instead.
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+AVAILABLE_ENCODINGS = {"identity", "gzip"} | ({"br"} if brotli is not None else set())
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+class CompressionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compressed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def record(self, bytes_in, bytes_out):
+        with self._lock:
+            self._compressed += 1
+            self._bytes_in += bytes_in
+            self._bytes_out += bytes_out
+
+    def stats(self):
+        with self._lock:
+            return {
+                "compressed_responses": self._compressed,
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+                "ratio": round(self._bytes_out / self._bytes_in, 3) if self._bytes_in else None,
+                "encodings": sorted(AVAILABLE_ENCODINGS - {"identity"})
+            }
+
+compression_stats = CompressionStats()
+
+class CompressionMiddleware:
+    """
+    Compresses buffered HTTP responses larger than COMPRESSION_MIN_SIZE with
+    the best encoding the client accepts (br, then gzip). Responses that are
+    already encoded (precompressed static assets), streamed (exports), or not
+    text-like pass through untouched. A compressed body is a different byte
+    representation, so its ETag gets the encoding appended (see encoded_etag).
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, stats=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        # Starlette builds the middleware itself, so /metrics reads the shared counters.
+        self.stats = stats or compression_stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = choose_encoding(accept_encoding, AVAILABLE_ENCODINGS)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            # First body message decides.
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._should_compress(start["headers"], body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            compressed = compress_body(body, encoding)
+            headers = [
+                (k, encoded_etag(v.decode("latin-1"), encoding).encode("latin-1") if k == b"etag" else v)
+                for k, v in start["headers"] if k != b"content-length"
+            ]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1"))
+            ]
+            if not any(k == b"vary" for k, _ in headers):
+                headers.append((b"vary", b"Accept-Encoding"))
+            self.stats.record(len(body), len(compressed))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, headers, body):
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,186 @@
+# tools/counters.py
+import os
+import threading
+import time
+from tools.question_bank import BANK_NAME
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "2"))
+COUNTER_FLUSH_MAX_BATCH = int(os.getenv("COUNTER_FLUSH_MAX_BATCH", "1000"))
+
+QUESTION_COUNTERS_QUERY = """
+UNWIND $deltas AS d
+MATCH (q:Question {id: d.id})
+SET q.wrong_count = coalesce(q.wrong_count, 0) + d.wrong_count,
+    q.correct_count = coalesce(q.correct_count, 0) + d.correct_count,
+    q.zero_count = coalesce(q.zero_count, 0) + d.zero_count
+"""
+
+CHOICE_COUNTERS_QUERY = """
+UNWIND $deltas AS d
+MATCH (c:Choice {id: d.id})
+SET c.selected_count = coalesce(c.selected_count, 0) + d.selected_count,
+    c.selected_correct_count = CASE WHEN d.selected_correct_count > 0
+        THEN coalesce(c.selected_correct_count, 0) + d.selected_correct_count
+        ELSE c.selected_correct_count END
+"""
+
+# One-off: derive correct_count / zero_count for answers recorded before the
+# counters existed. Like the other backfills it runs once, recorded on a
+# Migration marker; trees that ran it under the older QuestionBank flag just
+# move that flag onto the marker.
+BACKFILL_QUESTION_COUNTERS_QUERY = """
+MERGE (m:Migration {name: 'question_answer_counters'})
+SET m._lock = true
+REMOVE m._lock
+WITH m
+WHERE m.applied_at IS NULL
+OPTIONAL MATCH (b:QuestionBank {name: $name})
+WHERE b.answer_counters_backfilled
+CALL {
+    WITH b
+    WITH b
+    WHERE b IS NULL
+    MATCH (q:Question)
+    OPTIONAL MATCH (q)<-[:FOR_QUESTION]-(ea:ExamAnswer)
+    WITH q,
+         count(CASE WHEN ea.points_earned = q.points THEN 1 END) AS correct,
+         count(CASE WHEN ea.points_earned = 0 THEN 1 END) AS zero
+    SET q.correct_count = correct, q.zero_count = zero
+}
+SET m.applied_at = datetime()
+REMOVE b.answer_counters_backfilled
+RETURN b IS NULL AS backfilled
+"""
+
+def backfill_question_counters(session):
+    record = session.run(BACKFILL_QUESTION_COUNTERS_QUERY, {"name": BANK_NAME}).single()
+    return bool(record and record["backfilled"])
+
+def _merge(target, deltas):
+    for d in deltas:
+        entry = target.setdefault(d["id"], {"id": d["id"]})
+        for key, value in d.items():
+            if key != "id":
+                entry[key] = entry.get(key, 0) + value
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def write_counters(tx, question_deltas, choice_deltas, batch_size=COUNTER_FLUSH_MAX_BATCH):
+    for chunk in _chunks(question_deltas, batch_size):
+        tx.run(QUESTION_COUNTERS_QUERY, {"deltas": chunk}).consume()
+    for chunk in _chunks(choice_deltas, batch_size):
+        tx.run(CHOICE_COUNTERS_QUERY, {"deltas": chunk}).consume()
+
+class CounterBuffer:
+    """
+    Write-behind aggregator for the hot Question/Choice counters. Submissions add
+    deltas in memory; a background thread sums them per node and writes them in
+    one transaction every COUNTER_FLUSH_INTERVAL seconds, or sooner once
+    COUNTER_FLUSH_MAX_BATCH nodes are pending.
+    """
+
+    def __init__(self, flush_interval=COUNTER_FLUSH_INTERVAL, max_batch=COUNTER_FLUSH_MAX_BATCH):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._questions = {}
+        self._choices = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session_factory = None
+        self._listeners = []
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, callback):
+        # callback() runs after every flush that wrote counters, e.g. to drop
+        # views built from the values they replaced.
+        self._listeners.append(callback)
+
+    def start(self, session_factory):
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Pending deltas are flushed before returning.
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
+
+    def add(self, question_deltas, choice_deltas):
+        with self._lock:
+            _merge(self._questions, question_deltas)
+            _merge(self._choices, choice_deltas)
+            pending = len(self._questions) + len(self._choices)
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._questions) + len(self._choices)
+
+    def flush(self):
+        if self._session_factory is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                questions, self._questions = self._questions, {}
+                choices, self._choices = self._choices, {}
+            if not questions and not choices:
+                return
+            started = time.perf_counter()
+            session = self._session_factory()
+            try:
+                session.execute_write(write_counters, list(questions.values()), list(choices.values()), self.max_batch)
+            except Exception as e:
+                print(f"Counter flush failed, will retry: {e}")
+                self.add(list(questions.values()), list(choices.values()))
+                self.failures += 1
+                return
+            finally:
+                session.close()
+            self.flushes += 1
+            self.flushed_rows += len(questions) + len(choices)
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+        for callback in self._listeners:
+            callback()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Counter flusher error: {e}")
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "pending": self.pending(),
+            "flush_interval": self.flush_interval,
+            "max_batch": self.max_batch,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+counter_buffer = CounterBuffer()
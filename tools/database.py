@@ -60,6 +60,35 @@ def init_db():
         FOR (e:Exam)
         REQUIRE e.exam_id IS UNIQUE
         """)
+        # Exam için index (öğrencinin devam eden sınavını bulmak için)
+        session.run("""
+        CREATE INDEX exam_user_id_index IF NOT EXISTS
+        FOR (e:Exam)
+        ON (e.user_id)
+        """)
+        # Submission için constraint ve durum index'i (not kuyruğu)
+        session.run("""
+        CREATE CONSTRAINT submission_id_unique IF NOT EXISTS
+        FOR (s:Submission)
+        REQUIRE s.id IS UNIQUE
+        """)
+        session.run("""
+        CREATE INDEX submission_status_index IF NOT EXISTS
+        FOR (s:Submission)
+        ON (s.status)
+        """)
+        # ExamResult için index (sonuç sayfası öğrencinin özetlerini okur)
+        session.run("""
+        CREATE INDEX exam_result_student_id_index IF NOT EXISTS
+        FOR (er:ExamResult)
+        ON (er.student_id)
+        """)
+        # ExamResult için zaman index'i (toplu dışa aktarım sırası ve tarih filtresi)
+        session.run("""
+        CREATE INDEX exam_result_timestamp_index IF NOT EXISTS
+        FOR (er:ExamResult)
+        ON (er.timestamp)
+        """)
         # ExamAnswer için constraint
         session.run("""
         CREATE CONSTRAINT examAnswer_id_unique IF NOT EXISTS
@@ -72,6 +101,28 @@ def init_db():
         FOR (st:Statistics)
         REQUIRE st.id IS UNIQUE
         """)
+        # Okul ve genel bölüm toplamları için index/constraint
+        session.run("""
+        CREATE INDEX school_statistics_index IF NOT EXISTS
+        FOR (ss:SchoolStatistics)
+        ON (ss.school_id, ss.section_number)
+        """)
+        session.run("""
+        CREATE CONSTRAINT global_statistics_section_unique IF NOT EXISTS
+        FOR (gs:GlobalStatistics)
+        REQUIRE gs.section_number IS UNIQUE
+        """)
+        # Trend kovaları için index (dönem + başlangıç tarihi aralığı)
+        session.run("""
+        CREATE INDEX statistics_bucket_index IF NOT EXISTS
+        FOR (b:StatisticsBucket)
+        ON (b.period, b.start)
+        """)
+        session.run("""
+        CREATE CONSTRAINT migration_name_unique IF NOT EXISTS
+        FOR (m:Migration)
+        REQUIRE m.name IS UNIQUE
+        """)
         # Section için constraint
         session.run("""
         CREATE CONSTRAINT section_unique IF NOT EXISTS
@@ -84,5 +135,11 @@ def init_db():
         FOR (c:Class)
         REQUIRE c.name IS UNIQUE
         """)
+        # QuestionBank (soru bankası sürüm sayacı) için constraint
+        session.run("""
+        CREATE CONSTRAINT question_bank_name_unique IF NOT EXISTS
+        FOR (b:QuestionBank)
+        REQUIRE b.name IS UNIQUE
+        """)
     finally:
         session.close()
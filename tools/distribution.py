@@ -0,0 +1,130 @@
+# tools/distribution.py
+from tools.grading import SECTION_NUMBERS
+from tools.statistics_utils import SUBJECT_MAPPING, HISTOGRAM_BINS, BIN_WIDTH, bin_index
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+CLASS_HISTOGRAMS_QUERY = """
+MATCH (st:Statistics {class_name: $class_name})
+WHERE ($school_id IS NULL OR st.school_id = $school_id) AND st.section_number IN $sections
+RETURN st.section_number AS section_number, st.histogram AS histogram
+"""
+
+SCHOOL_HISTOGRAMS_QUERY = """
+MATCH (ss:SchoolStatistics)
+WHERE ($school_id IS NULL OR ss.school_id = $school_id) AND ss.section_number IN $sections
+RETURN ss.section_number AS section_number, ss.histogram AS histogram
+"""
+
+# One-off fill of the histograms from ExamResults recorded before they existed.
+# School and class come from the student's class edges; as with the trend
+# buckets, the marker is only set once every ExamResult was counted.
+BACKFILL_HISTOGRAMS_QUERY = """
+MERGE (m:Migration {name: 'statistics_histograms'})
+SET m._lock = true
+REMOVE m._lock
+WITH m
+WHERE m.applied_at IS NULL
+CALL {
+    MATCH (:User)-[:HAS_RESULT]->(er:ExamResult)
+    RETURN count(er) AS results
+}
+CALL {
+    MATCH (u:User)-[:HAS_RESULT]->(er:ExamResult)
+    WHERE EXISTS { (u)-[:BELONGS_TO]->(:Class)<-[:HAS_CLASS]-(:School) }
+    RETURN count(er) AS covered
+}
+CALL {
+    MATCH (u:User)-[:HAS_RESULT]->(er:ExamResult)
+    MATCH (u)-[:BELONGS_TO]->(c:Class)<-[:HAS_CLASS]-(s:School)
+    MATCH (e:Exam {exam_id: er.exam_id})-[:HAS_ANSWER]->(ea:ExamAnswer)-[:FOR_QUESTION]->(q:Question)
+    WITH s, c, er, q.section AS section, sum(ea.points_earned) AS earned, sum(q.points) AS possible
+    WITH s.school_id AS school_id, c.name AS class_name, section,
+         CASE WHEN possible > 0 THEN earned * 100.0 / possible ELSE 0 END AS percentage
+    WITH school_id, class_name, section,
+         CASE WHEN toInteger(percentage / $width) >= $bins THEN $bins - 1 ELSE toInteger(percentage / $width) END AS bin
+    WITH school_id, class_name, section, collect(bin) AS bin_list
+    OPTIONAL MATCH (st:Statistics {school_id: school_id, class_name: class_name, section_number: section})
+    SET st.histogram = [i IN range(0, $bins - 1) | size([b IN bin_list WHERE b = i])]
+    RETURN count(st) AS histograms
+}
+CALL {
+    MATCH (st:Statistics)
+    WHERE st.school_id IS NOT NULL AND st.histogram IS NOT NULL
+    WITH st.school_id AS school_id, st.section_number AS section, collect(st.histogram) AS histograms
+    MATCH (ss:SchoolStatistics {school_id: school_id, section_number: section})
+    SET ss.histogram = [i IN range(0, $bins - 1) | reduce(total = 0, h IN histograms | total + h[i])]
+}
+FOREACH (_ IN CASE WHEN covered = results AND (results = 0 OR histograms > 0) THEN [1] ELSE [] END |
+    SET m.applied_at = datetime())
+RETURN m.applied_at IS NOT NULL AS applied, results, covered, histograms
+"""
+
+def backfill_histograms(session):
+    record = session.run(BACKFILL_HISTOGRAMS_QUERY, {"bins": HISTOGRAM_BINS, "width": BIN_WIDTH}).single()
+    if record and not record["applied"]:
+        print(f"Score histogram backfill counted {record['covered']} of {record['results']} exam results; "
+              "it will run again on the next start.")
+    return bool(record and record["applied"])
+
+def merge_histograms(histograms):
+    merged = [0] * HISTOGRAM_BINS
+    for h in histograms:
+        for i, count in enumerate(h or []):
+            merged[i] += count
+    return merged
+
+def percentile(histogram, q):
+    """Score below which q% of the scores fall, interpolated inside the bin."""
+    total = sum(histogram)
+    if total == 0:
+        return None
+    target = total * q / 100
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        if count and cumulative + count >= target:
+            return round(i * BIN_WIDTH + (target - cumulative) / count * BIN_WIDTH, 2)
+        cumulative += count
+    return 100.0
+
+def percentile_rank(histogram, score):
+    """Share of scores below `score`, interpolating inside its bin."""
+    if not histogram:
+        return None
+    total = sum(histogram)
+    if total == 0:
+        return None
+    b = bin_index(score)
+    fraction = min(max((score - b * BIN_WIDTH) / BIN_WIDTH, 0), 1)
+    return round((sum(histogram[:b]) + histogram[b] * fraction) / total * 100, 2)
+
+def describe(histogram):
+    return {
+        "count": sum(histogram),
+        "bins": [
+            {"from": round(i * BIN_WIDTH, 2), "to": round((i + 1) * BIN_WIDTH, 2), "count": count}
+            for i, count in enumerate(histogram)
+        ],
+        "percentiles": {f"p{q}": percentile(histogram, q) for q in PERCENTILES}
+    }
+
+def load_distribution(session, school_id=None, class_name=None, sections=None):
+    """
+    Score distribution per section for a class, a school or every school, from
+    the stored histograms (one query, no ExamResult scan).
+    """
+    sections = sorted(set(sections)) if sections else list(SECTION_NUMBERS)
+    query = CLASS_HISTOGRAMS_QUERY if class_name else SCHOOL_HISTOGRAMS_QUERY
+    result = session.run(query, {"school_id": school_id, "class_name": class_name, "sections": sections})
+    by_section = {sec: [] for sec in sections}
+    for record in result:
+        by_section[record["section_number"]].append(record["histogram"])
+    return {
+        "school_id": school_id,
+        "class_name": class_name,
+        "sections": [
+            dict(section_number=sec, section_name=SUBJECT_MAPPING.get(sec, f"Section {sec}"),
+                 **describe(merge_histograms(by_section[sec])))
+            for sec in sections
+        ]
+    }
@@ -1,161 +1,301 @@
 # tools/exam.py
+import json
 import random
 from datetime import datetime
 from uuid import uuid4
 from tools.statistics_utils import update_statistics
+from tools.question_bank import question_bank_cache
+from tools.answer_keys import answer_key_cache
+from tools.grading import score_exam
+from tools.counters import counter_buffer, write_counters
+from tools.results import summarize_exam, freeze_summary
+from tools.stats_cache import teacher_stats_cache
+from tools.auth_cache import user_cache
 
 def load_questions(session):
-    result = session.run("MATCH (q:Question) RETURN q")
-    return [record["q"] for record in result]
+    return question_bank_cache.get(session)
 
-def select_questions(session, user):
-    if user.get("attempts", 0) >= 2:
-        return {}
-    questions = load_questions(session)
+SECTIONS = (1, 2, 3, 4)
+QUESTIONS_PER_SECTION = 5
+REQUIRED_TYPES = ("true_false", "single_choice", "multiple_choice", "ordering")
+
+def sample_questions(index, per_section=QUESTIONS_PER_SECTION, rng=random):
+    """
+    Draws `per_section` questions for every section from a QuestionIndex while
+    guaranteeing one question of each required type. Cost depends only on the
+    number of questions drawn, not on the size of the bank.
+    """
+    # Reserve one question per required type first, in a section that still has room.
+    reserved = {sec: [] for sec in SECTIONS}
+    types = list(REQUIRED_TYPES)
+    rng.shuffle(types)
+    for q_type in types:
+        sections, weights = [], []
+        for sec in SECTIONS:
+            ids = index.by_section_type.get((sec, q_type))
+            if ids and len(reserved[sec]) < per_section:
+                sections.append(sec)
+                weights.append(len(ids))
+        if not sections:
+            continue
+        sec = rng.choices(sections, weights)[0]
+        reserved[sec].append(rng.choice(index.by_section_type[(sec, q_type)]))
+    # Fill the remaining slots of each section.
     selected = {}
-    for sec in range(1, 5):
-        sec_questions = [q for q in questions if q.get("section") == sec]
-        if len(sec_questions) < 5:
-            selected[sec] = sec_questions.copy()
+    for sec in SECTIONS:
+        ids = index.by_section.get(sec, [])
+        if len(ids) <= per_section:
+            picked = list(ids)
         else:
-            selected[sec] = random.sample(sec_questions, 5)
-    total_selected = [q for sec in selected for q in selected[sec]]
-    required_types = {"true_false", "single_choice", "multiple_choice", "ordering"}
-    types_present = set(q.get("type") for q in total_selected)
-    missing_types = required_types - types_present
-    for m_type in missing_types:
-        candidates = [q for q in questions if q.get("type") == m_type]
-        if candidates:
-            candidate = random.choice(candidates)
-            sec = candidate.get("section")
-            replaced = False
-            for i, q in enumerate(selected.get(sec, [])):
-                type_count = sum(1 for x in total_selected if x.get("type") == q.get("type"))
-                if type_count > 1:
-                    selected[sec][i] = candidate
-                    replaced = True
+            picked = reserved[sec]
+            needed = per_section - len(picked)
+            for qid in rng.sample(ids, min(len(ids), per_section + len(picked))):
+                if needed == 0:
                     break
-            if not replaced and sec in selected:
-                selected[sec][0] = candidate
-    final_dict = {sec: selected.get(sec, []) for sec in range(1, 5)}
-    return final_dict
-
-def process_results(session, user, exam_node, selected_questions, answers_dict, end_time):
-    # Calculate scores per section.
-    section_scores = {sec: [0, 0] for sec in range(1, 5)}
-    section_correct_wrong = {sec: [0, 0] for sec in range(1, 5)}
-    for q in selected_questions:
-        qid = q["id"]
-        ans_data = answers_dict.get(str(qid))
-        if not ans_data:
-            points_earned = 0
-        else:
-            if isinstance(ans_data, dict):
-                selected = ans_data.get("selected_texts", [])
-            else:
-                selected = ans_data.selected_texts or []
-            result = session.run("""
-MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
-WHERE c.is_correct = true
-RETURN collect(c.choice_text) as correct
-""", {"qid": qid})
-            correct_choices = result.single()["correct"]
-            if set(selected) == set(correct_choices):
-                points_earned = q.get("points", 1)
-            elif set(selected) & set(correct_choices):
-                points_earned = q.get("points", 1) / 2
-            else:
-                points_earned = 0
-        section_scores[q["section"]][0] += points_earned
-        section_scores[q["section"]][1] += q.get("points", 1)
-        if points_earned == q.get("points", 1):
-            section_correct_wrong[q["section"]][0] += 1
-        else:
-            section_correct_wrong[q["section"]][1] += 1
-        exam_answer_id = str(uuid4())
-        session.run("""
-MATCH (e:Exam {exam_id: $exam_id}), (q:Question {id: $qid})
+                if qid not in picked:
+                    picked.append(qid)
+                    needed -= 1
+            rng.shuffle(picked)
+        selected[sec] = [index.by_id[qid] for qid in picked]
+    return selected
+
+def validate_paper(paper):
+    ids = [q["id"] for qs in paper.values() for q in qs]
+    if not ids or len(ids) != len(set(ids)):
+        return False
+    if any(len(qs) > QUESTIONS_PER_SECTION for qs in paper.values()):
+        return False
+    return {q.get("type") for qs in paper.values() for q in qs} >= set(REQUIRED_TYPES)
+
+def select_questions(session, user):
+    if user.get("attempts", 0) >= 2:
+        return {}
+    index = question_bank_cache.get_index(session)
+    return sample_questions(index)
+
+def question_payload(q):
+    return {
+        "question_id": q["id"],
+        "external_id": q.get("external_id"),
+        "question": q.get("question"),
+        "points": q.get("points"),
+        "type": q.get("type"),
+        "choices": [{"choice_id": c["id"], "choice_text": c["choice_text"]} for c in q.get("choices", [])]
+    }
+
+def build_exam_questions(selected_questions):
+    return {sec: [question_payload(q) for q in qs] for sec, qs in selected_questions.items() if qs}
+
+def freeze_paper(questions_data):
+    # Compact, immutable snapshot of the rendered paper stored on the Exam node.
+    return json.dumps(questions_data, separators=(",", ":"), ensure_ascii=False)
+
+def thaw_paper(blob):
+    return {int(sec): qs for sec, qs in json.loads(blob).items()}
+
+def paper_questions(paper):
+    return [
+        {"id": q["question_id"], "section": sec, "points": q["points"], "type": q["type"], "question": q.get("question")}
+        for sec, qs in paper.items() for q in qs
+    ]
+
+CREATE_EXAM_QUERY = """
+MATCH (u:User {user_id: $user_id})
+MERGE (c:Class {name: $class_name})
+CREATE (e:Exam {
+    exam_id: $exam_id,
+    user_id: $user_id,
+    exam_title: $exam_title,
+    start_time: datetime($start_time),
+    status: 'in_progress',
+    paper: $paper
+})
+MERGE (u)-[:TAKES_EXAM]->(e)
+CREATE (e)-[:FOR_CLASS]->(c)
+WITH e
+CALL {
+    WITH e
+    UNWIND $question_ids AS qid
+    MATCH (q:Question {id: qid})
+    CREATE (e)-[:CONTAINS]->(q)
+}
+CALL {
+    UNWIND $links AS link
+    MATCH (q1:Question {id: link.from_id}), (q2:Question {id: link.to_id})
+    CREATE (q1)-[:NEXT_QUESTION {exam_id: $exam_id, section: link.section}]->(q2)
+}
+RETURN e.exam_id AS exam_id
+"""
+
+def _create_exam_tx(tx, params):
+    return tx.run(CREATE_EXAM_QUERY, params).single()
+
+def create_exam(session, user, selected_questions):
+    """
+    Writes the Exam node, its TAKES_EXAM / FOR_CLASS edges, every CONTAINS edge and
+    the per-section NEXT_QUESTION chain in a single write transaction.
+    Returns (exam_id, questions_data) where questions_data is built from the
+    selection in hand instead of being read back, and is also frozen onto the
+    Exam node so resume and submit never traverse the bank again.
+    """
+    exam_id = str(uuid4())
+    attempt_number = user.get("attempts", 0) + 1
+    question_ids = []
+    links = []
+    for sec, qs in selected_questions.items():
+        question_ids.extend(q["id"] for q in qs)
+        for i in range(len(qs) - 1):
+            links.append({"from_id": qs[i]["id"], "to_id": qs[i + 1]["id"], "section": sec})
+    questions_data = build_exam_questions(selected_questions)
+    record = session.execute_write(_create_exam_tx, {
+        "exam_id": exam_id,
+        "user_id": user["user_id"],
+        "class_name": user["class_name"],
+        "exam_title": f"{user['username']} Exam {attempt_number}",
+        "start_time": datetime.utcnow().isoformat(),
+        "question_ids": question_ids,
+        "links": links,
+        "paper": freeze_paper(questions_data)
+    })
+    if not record:
+        return None, {}
+    return exam_id, questions_data
+
+RECORD_ANSWERS_QUERY = """
+MATCH (e:Exam {exam_id: $exam_id})
+SET e.end_time = datetime($end_time), e.status = 'submitted'
+WITH e
+UNWIND $answers AS a
+MATCH (q:Question {id: a.question_id})
 CREATE (ea:ExamAnswer {
-    id: $exam_answer_id,
-    points_earned: $points_earned,
-    question_id: $qid
+    id: a.id,
+    points_earned: a.points_earned,
+    question_id: a.question_id
 })
 CREATE (e)-[:HAS_ANSWER]->(ea)
 CREATE (ea)-[:FOR_QUESTION]->(q)
 CREATE (ea)-[:ANSWER_FOR]->(q)
-""", {"exam_id": exam_node["exam_id"], "qid": qid, "exam_answer_id": exam_answer_id, "points_earned": points_earned})
-        if points_earned < q.get("points", 1):
-            session.run("""
-MATCH (q:Question {id: $qid})
-SET q.wrong_count = coalesce(q.wrong_count, 0) + 1
-""", {"qid": qid})
-        if ans_data:
-            if isinstance(ans_data, dict):
-                selected = ans_data.get("selected_texts", [])
-            else:
-                selected = ans_data.selected_texts or []
-            for answer_text in selected:
-                session.run("""
-MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
-WHERE toLower(c.choice_text) = toLower($answer_text)
-SET c.selected_count = coalesce(c.selected_count, 0) + 1
-""", {"qid": qid, "answer_text": answer_text.strip()})
-                session.run("""
-MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
-WHERE toLower(c.choice_text) = toLower($answer_text) AND c.is_correct = true
-SET c.selected_correct_count = coalesce(c.selected_correct_count, 0) + 1
-""", {"qid": qid, "answer_text": answer_text.strip()})
-                session.run("""
-MATCH (ea:ExamAnswer {id: $exam_answer_id})
-MATCH (q:Question {id: $qid})-[:HAS_CHOICE]->(c:Choice)
-WHERE toLower(c.choice_text) = toLower($answer_text)
+WITH ea, a
+UNWIND a.chosen AS choice_id
+MATCH (c:Choice {id: choice_id})
 CREATE (ea)-[:CHOSE]->(c)
-""", {"exam_answer_id": exam_answer_id, "qid": qid, "answer_text": answer_text.strip()})
-    total_earned = sum(section_scores[s][0] for s in section_scores)
-    total_possible = sum(section_scores[s][1] for s in section_scores)
-    final_score = round((total_earned / total_possible) * 100, 2) if total_possible > 0 else 0.0
-    attempt_number = user.get("attempts", 0) + 1
-    exam_result_id = str(uuid4())
-    session.run("""
+"""
+
+RECORD_RESULT_QUERY = """
+MATCH (u:User {user_id: $user_id})
 CREATE (er:ExamResult {
     id: $exam_result_id,
     exam_id: $exam_id,
     student_id: $user_id,
     attempt_number: $attempt_number,
     exam_percentage: $final_score,
-    timestamp: datetime($end_time)
+    timestamp: datetime($end_time),
+    summary: $summary
 })
-""", {
-        "exam_result_id": exam_result_id,
-        "exam_id": exam_node["exam_id"],
-        "user_id": user["user_id"],
-        "attempt_number": attempt_number,
-        "final_score": final_score,
-        "end_time": end_time
-    })
-    session.run("""
-MATCH (u:User {user_id: $user_id}), (er:ExamResult {id: $exam_result_id})
 CREATE (u)-[:HAS_RESULT]->(er)
-""", {"user_id": user["user_id"], "exam_result_id": exam_result_id})
-    for sec in range(1, 5):
-        session.run("""
-MATCH (er:ExamResult {id: $exam_result_id}),
-(st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $sec})
-MERGE (er)-[:RESULT_FOR {section: $sec}]->(st)
-""", {
-            "exam_result_id": exam_result_id,
+WITH u, er
+CALL {
+    WITH er
+    UNWIND [1, 2, 3, 4] AS sec
+    MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: sec})
+    MERGE (er)-[:RESULT_FOR {section: sec}]->(st)
+}
+WITH u, coalesce(u.attempts, 0) as old_attempts, coalesce(u.score_avg, 0) as old_avg
+SET u.score_avg = CASE
+    WHEN old_attempts = 0 THEN $final_score
+    ELSE round(((old_avg * old_attempts) + $final_score) / (old_attempts + 1), 2)
+END,
+u.attempts = old_attempts + 1
+"""
+
+# Locks the Submission and only matches while the caller still holds its
+# grading claim; a worker whose claim expired and was taken over gets no row.
+SUBMISSION_GRADED_QUERY = """
+MATCH (s:Submission {id: $submission_id})
+SET s._lock = true
+REMOVE s._lock
+WITH s
+WHERE s.status = 'grading' AND s.claim = $claim
+SET s.status = 'graded', s.graded_at = datetime(), s.exam_percentage = $final_score
+RETURN s.id AS id
+"""
+
+def _record_submission_tx(tx, params, user, section_scores, section_correct_wrong):
+    if params["submission_id"]:
+        graded = tx.run(SUBMISSION_GRADED_QUERY, {"submission_id": params["submission_id"], "claim": params["claim"],
+                                                  "final_score": params["result"]["final_score"]}).single()
+        if not graded:
+            return False
+    tx.run(RECORD_ANSWERS_QUERY, params["answers"]).consume()
+    if params["question_deltas"] or params["choice_deltas"]:
+        write_counters(tx, params["question_deltas"], params["choice_deltas"])
+    tx.run(RECORD_RESULT_QUERY, params["result"]).consume()
+    update_statistics(tx, user.get("school_id"), user.get("class_name"), section_scores, section_correct_wrong,
+                      attempt_number=params["result"]["attempt_number"], submitted_at=params["result"]["end_time"])
+    return True
+
+def process_results(session, user, exam_node, selected_questions, answers_dict, end_time, submission_id=None, claim=None):
+    """
+    Grades a submission and records it. Answer keys come from the in-process
+    answer key cache, so a warm worker grades without any read query; ExamAnswers,
+    CHOSE edges, the ExamResult, the user's averages and the statistics are then
+    written in one transaction, together with the immutable result summary the
+    results page reads. Question/Choice counters are handed to the write-behind
+    counter buffer once that transaction has committed, and cached teacher views
+    of the school and the student's cached principal are dropped. When grading
+    a queued Submission, its status flips to 'graded' in that same transaction,
+    which writes nothing (and returns False) unless `claim` is still the
+    Submission's grading claim.
+    """
+    answer_keys = answer_key_cache.get_many(session, [q["id"] for q in selected_questions])
+    graded = score_exam(answer_keys, selected_questions, answers_dict)
+    # Shared Question/Choice counters go through the write-behind buffer when it
+    # is running, keeping their node locks out of the submit transaction.
+    buffered = counter_buffer.running
+    answers = [
+        {"id": str(uuid4()), "question_id": a["question_id"], "points_earned": a["points_earned"], "chosen": a["chosen"]}
+        for a in graded["answers"]
+    ]
+    questions_by_id = {q["id"]: q for q in selected_questions}
+    summary = summarize_exam(exam_node.get("start_time"), end_time, [
+        {
+            "question": {
+                "question": questions_by_id[a["question_id"]].get("question"),
+                "section": a["section"],
+                "points": a["points_possible"],
+                "type": questions_by_id[a["question_id"]].get("type")
+            },
+            "choices": answer_keys[a["question_id"]]["choices"] if a["question_id"] in answer_keys else [],
+            "chosen": a["chosen"],
+            "points_earned": a["points_earned"]
+        }
+        for a in graded["answers"]
+    ])
+    attempt_number = user.get("attempts", 0) + 1
+    params = {
+        "answers": {"exam_id": exam_node["exam_id"], "end_time": end_time, "answers": answers},
+        "question_deltas": [] if buffered else graded["question_deltas"],
+        "choice_deltas": [] if buffered else graded["choice_deltas"],
+        "submission_id": submission_id,
+        "claim": claim,
+        "result": {
+            "exam_result_id": str(uuid4()),
+            "exam_id": exam_node["exam_id"],
+            "user_id": user["user_id"],
+            "attempt_number": attempt_number,
+            "final_score": graded["final_score"],
+            "end_time": end_time,
             "school_id": user.get("school_id"),
             "class_name": user.get("class_name"),
-            "sec": sec
-        })
-    # Update user's exam attempt count and score average in one query.
-    session.run("""
-    MATCH (u:User {user_id: $user_id})
-    WITH u, coalesce(u.attempts, 0) as old_attempts, coalesce(u.score_avg, 0) as old_avg
-    SET u.score_avg = CASE 
-        WHEN old_attempts = 0 THEN $final_score 
-        ELSE round(((old_avg * old_attempts) + $final_score) / (old_attempts + 1), 2)
-    END,
-    u.attempts = old_attempts + 1
-    """, {"user_id": user["user_id"], "final_score": final_score})
-    update_statistics(session, user.get("school_id"), user.get("class_name"), section_scores, section_correct_wrong, attempt_number=attempt_number)
+            "summary": freeze_summary(summary)
+        }
+    }
+    recorded = session.execute_write(_record_submission_tx, params, user, graded["section_scores"],
+                                     graded["section_correct_wrong"])
+    if not recorded:
+        return False
+    if buffered:
+        counter_buffer.add(graded["question_deltas"], graded["choice_deltas"])
+    teacher_stats_cache.invalidate_school(user.get("school_id"))
+    user_cache.invalidate(user["user_id"])
+    return True
@@ -0,0 +1,206 @@
+# tools/exam_pool.py
+import os
+import queue
+import threading
+import time
+from tools.exam import sample_questions, validate_paper
+from tools.question_bank import question_bank_cache
+
+EXAM_POOL_SIZE = int(os.getenv("EXAM_POOL_SIZE", "100"))
+EXAM_POOL_REFILL_PER_SECOND = float(os.getenv("EXAM_POOL_REFILL_PER_SECOND", "50"))
+EXAM_POOL_WAIT_TIMEOUT = float(os.getenv("EXAM_POOL_WAIT_TIMEOUT", "0.05"))
+EXAM_POOL_BANK_CHECK_SECONDS = float(os.getenv("EXAM_POOL_BANK_CHECK_SECONDS", "5"))
+# Consecutive rejected papers after which the bank is treated as unable to
+# produce a valid paper (e.g. a required question type is missing).
+EXAM_POOL_STARVE_AFTER = int(os.getenv("EXAM_POOL_STARVE_AFTER", "20"))
+# Papers drawn inline, when the pool has none, before giving up on the request.
+EXAM_POOL_INLINE_ATTEMPTS = int(os.getenv("EXAM_POOL_INLINE_ATTEMPTS", "3"))
+
+class ExamPaperPool:
+    """
+    Bounded pool of pre-selected question sets. A background producer keeps it
+    topped up with papers drawn by sample_questions; every paper is tagged with
+    the question bank version it was drawn from and stale papers are dropped.
+    After starve_after rejected papers in a row the producer backs off
+    exponentially (up to bank_check_seconds) and take() stops waiting, until a
+    valid paper is drawn or the bank version changes.
+    """
+
+    def __init__(self, size=EXAM_POOL_SIZE, refill_per_second=EXAM_POOL_REFILL_PER_SECOND,
+                 wait_timeout=EXAM_POOL_WAIT_TIMEOUT, bank_check_seconds=EXAM_POOL_BANK_CHECK_SECONDS,
+                 starve_after=EXAM_POOL_STARVE_AFTER, bank=question_bank_cache):
+        self.size = size
+        self.refill_per_second = refill_per_second
+        self.wait_timeout = wait_timeout
+        self.bank_check_seconds = bank_check_seconds
+        self.starve_after = max(starve_after, 1)
+        self.bank = bank
+        self._papers = queue.Queue(maxsize=max(size, 1))
+        self._stop = threading.Event()
+        self._thread = None
+        self._session_factory = None
+        self._lock = threading.Lock()
+        self._consecutive_rejections = 0
+        self.starved = False
+        self.produced = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.served = 0
+        self.fallbacks = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory):
+        if self.size <= 0 or self.running:
+            return
+        self._session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="exam-paper-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.refill_per_second if self.refill_per_second > 0 else 1.0
+        version, index = None, None
+        next_check = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_check:
+                    session = self._session_factory()
+                    try:
+                        latest, index = self.bank.get_versioned_index(session)
+                    finally:
+                        session.close()
+                    if latest != version:
+                        self._drain()
+                        self._set_starved(False)
+                        version = latest
+                    next_check = time.monotonic() + self.bank_check_seconds
+                if not index:
+                    self._stop.wait(self.bank_check_seconds)
+                    continue
+                paper = sample_questions(index)
+                if not validate_paper(paper):
+                    self._stop.wait(self._reject())
+                    continue
+                self._set_starved(False)
+                # Blocks while the pool is full; wake up regularly to honour stop().
+                self._papers.put((version, paper), timeout=self.bank_check_seconds)
+                with self._lock:
+                    self.produced += 1
+            except queue.Full:
+                continue
+            except Exception as e:
+                print(f"Exam paper pool error: {e}")
+                self._stop.wait(self.bank_check_seconds)
+                continue
+            self._stop.wait(interval)
+
+    def _reject(self):
+        """Counts a rejected paper and returns how long to wait before the next draw."""
+        interval = 1.0 / self.refill_per_second if self.refill_per_second > 0 else 1.0
+        with self._lock:
+            self.rejected += 1
+            self._consecutive_rejections += 1
+            over = self._consecutive_rejections - self.starve_after
+            if over >= 0 and not self.starved:
+                self.starved = True
+                print("Exam paper pool: the question bank cannot produce a valid paper; backing off.")
+        if over < 0:
+            return interval
+        return min(interval * 2 ** min(over + 1, 32), self.bank_check_seconds)
+
+    def _set_starved(self, starved):
+        with self._lock:
+            self.starved = starved
+            if not starved:
+                self._consecutive_rejections = 0
+
+    def _drain(self):
+        while True:
+            try:
+                self._papers.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self.discarded += 1
+
+    def take(self, version):
+        """
+        Returns a ready paper drawn from bank `version`, or None if no such paper
+        is available within wait_timeout. A starved pool answers at once.
+        """
+        if not self.running:
+            return None
+        if self.starved and self._papers.empty():
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        started = time.perf_counter()
+        deadline = started + self.wait_timeout
+        paper = None
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                paper_version, candidate = self._papers.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if paper_version == version:
+                paper = candidate
+                break
+            with self._lock:
+                self.discarded += 1
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            if paper is not None:
+                self.served += 1
+            else:
+                self.fallbacks += 1
+        return paper
+
+    def stats(self):
+        with self._lock:
+            requests = self.served + self.fallbacks
+            return {
+                "running": self.running,
+                "starved": self.starved,
+                "capacity": self.size,
+                "depth": self._papers.qsize(),
+                "refill_per_second": self.refill_per_second,
+                "produced": self.produced,
+                "rejected": self.rejected,
+                "discarded": self.discarded,
+                "served": self.served,
+                "fallbacks": self.fallbacks,
+                "avg_wait_ms": round(self._wait_total / requests * 1000, 3) if requests > 0 else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3)
+            }
+
+exam_paper_pool = ExamPaperPool()
+
+def draw_paper(session, attempts=EXAM_POOL_INLINE_ATTEMPTS):
+    """
+    Binds a pre-generated paper when one is ready, otherwise draws one inline
+    with the same rules and the same validation as pooled papers. Returns None
+    when no valid paper could be drawn (e.g. a required type is missing).
+    """
+    version, index = question_bank_cache.get_versioned_index(session)
+    paper = exam_paper_pool.take(version)
+    if paper is not None:
+        return paper
+    for _ in range(attempts):
+        paper = sample_questions(index)
+        if validate_paper(paper):
+            return paper
+    return None
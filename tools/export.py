@@ -0,0 +1,140 @@
+# tools/export.py
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from tools.grading import SECTION_NUMBERS
+
+EXPORT_QUERY = """
+MATCH (u:User)-[:HAS_RESULT]->(er:ExamResult)
+// School and class are not User properties; they come from the class edges.
+MATCH (u)-[:BELONGS_TO]->(c:Class)<-[:HAS_CLASS]-(s:School)
+WHERE ($school_id IS NULL OR s.school_id = $school_id)
+  AND ($class_name IS NULL OR c.name = $class_name)
+  AND ($date_from IS NULL OR er.timestamp >= datetime($date_from))
+  AND ($date_to IS NULL OR er.timestamp < datetime($date_to))
+  AND ($after_ts IS NULL OR er.timestamp > datetime($after_ts)
+       OR (er.timestamp = datetime($after_ts) AND er.id > $after_id))
+WITH u, er, c, s
+ORDER BY er.timestamp ASC, er.id ASC
+LIMIT $limit
+OPTIONAL MATCH (e:Exam {exam_id: er.exam_id})
+RETURN er.id AS exam_result_id,
+       er.exam_id AS exam_id,
+       toString(er.timestamp) AS timestamp,
+       er.attempt_number AS attempt_number,
+       er.exam_percentage AS exam_percentage,
+       u.user_id AS student_id,
+       u.username AS username,
+       u.okul_no AS okul_no,
+       s.school_id AS school_id,
+       c.name AS class_name,
+       [(e)-[:HAS_ANSWER]->(ea:ExamAnswer)-[:FOR_QUESTION]->(q:Question)
+        WHERE $sections IS NULL OR q.section IN $sections
+        | {question_id: q.id, section: q.section, points_earned: ea.points_earned, points_possible: q.points}] AS questions
+"""
+
+RESULT_FIELDS = ["exam_result_id", "exam_id", "timestamp", "attempt_number", "exam_percentage",
+                 "student_id", "username", "okul_no", "school_id", "class_name"]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Used as LIMIT when no page size is requested.
+UNLIMITED = 2 ** 62
+
+def encode_cursor(timestamp, exam_result_id):
+    return base64.urlsafe_b64encode(f"{timestamp}|{exam_result_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, exam_result_id = raw.split("|", 1)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    return timestamp, exam_result_id
+
+def export_params(school_id=None, class_name=None, sections=None, date_from=None, date_to=None, cursor=None, limit=None):
+    """Validates the export filters and turns them into query parameters (ValueError on bad input)."""
+    for value in (date_from, date_to):
+        if value is not None:
+            datetime.fromisoformat(value)
+    if sections is not None and any(s not in SECTION_NUMBERS for s in sections):
+        raise ValueError("Unknown section.")
+    if limit is not None and limit <= 0:
+        raise ValueError("Limit must be positive.")
+    after_ts, after_id = decode_cursor(cursor) if cursor else (None, None)
+    return {
+        "school_id": school_id,
+        "class_name": class_name,
+        "sections": sorted(set(sections)) if sections else None,
+        "date_from": date_from,
+        "date_to": date_to,
+        "after_ts": after_ts,
+        "after_id": after_id,
+        "limit": limit or UNLIMITED
+    }
+
+def shape_row(record, sections):
+    row = {field: record[field] for field in RESULT_FIELDS}
+    # A result whose Exam node is gone has no questions (null from the query).
+    questions = sorted(record["questions"] or [], key=lambda q: (q["section"], q["question_id"]))
+    section_scores = {sec: {"section_number": sec, "earned": 0, "possible": 0} for sec in sections}
+    for q in questions:
+        if q["section"] in section_scores:
+            section_scores[q["section"]]["earned"] += q["points_earned"] or 0
+            section_scores[q["section"]]["possible"] += q["points_possible"] or 0
+    row["sections"] = list(section_scores.values())
+    row["questions"] = questions
+    # Resuming from any row's cursor continues right after that row.
+    row["cursor"] = encode_cursor(record["timestamp"], record["exam_result_id"])
+    return row
+
+def iter_export_rows(session, params):
+    sections = params["sections"] or list(SECTION_NUMBERS)
+    result = session.run(EXPORT_QUERY, params)
+    for record in result:
+        yield shape_row(record, sections)
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+def csv_lines(rows, sections):
+    # One line per exam result; per-question points are kept as a JSON column.
+    header = RESULT_FIELDS + [f"section_{sec}_{part}" for sec in sections for part in ("earned", "possible")]
+    header += ["questions", "cursor"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        values = [row[field] for field in RESULT_FIELDS]
+        for sec in row["sections"]:
+            values += [sec["earned"], sec["possible"]]
+        values.append(json.dumps(
+            [{k: q[k] for k in ("question_id", "points_earned", "points_possible")} for q in row["questions"]],
+            separators=(",", ":")
+        ))
+        values.append(row["cursor"])
+        writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_export(session_factory, params, fmt):
+    """
+    Yields the export as NDJSON or CSV text straight off the query cursor, so
+    memory stays flat however many results match. The session is owned by the
+    stream and closed when it ends.
+    """
+    sections = params["sections"] or list(SECTION_NUMBERS)
+    session = session_factory()
+    try:
+        rows = iter_export_rows(session, params)
+        lines = csv_lines(rows, sections) if fmt == "csv" else ndjson_lines(rows)
+        for line in lines:
+            yield line
+    finally:
+        session.close()
@@ -0,0 +1,27 @@
+# tools/fast_json.py
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
+
+# Exam papers are keyed by section number.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+def _default(obj):
+    # neo4j.time values and datetimes that slipped into a payload
+    if hasattr(obj, "iso_format"):
+        return obj.iso_format()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content):
+    """Compact UTF-8 JSON bytes; orjson when installed, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
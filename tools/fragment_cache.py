@@ -0,0 +1,43 @@
+# tools/fragment_cache.py
+import os
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from tools.cache import LRUCache
+
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "1024"))
+FRAGMENT_CACHE_TTL = float(os.getenv("FRAGMENT_CACHE_TTL", "600"))
+
+fragment_cache = LRUCache(max_size=FRAGMENT_CACHE_SIZE, ttl=FRAGMENT_CACHE_TTL)
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache "name", key, ... %}...{% endcache %} renders the block once per
+    key and serves the stored markup afterwards. Keys must change whenever the
+    block's data does (an exam_id, a statistics ETag); a None key part renders
+    the block without caching.
+    """
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=fragment_cache)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [nodes.List(parts)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if any(part is None for part in parts):
+            return caller()
+        cache = self.environment.fragment_cache
+        key = tuple(str(part) for part in parts)
+        markup = cache.get(key)
+        if markup is None:
+            markup = Markup(caller())
+            cache.set(key, markup)
+        return markup
@@ -0,0 +1,105 @@
+# tools/grading.py
+SECTION_NUMBERS = (1, 2, 3, 4)
+
+def build_answer_key(choices):
+    """
+    Everything grading needs about one question: its choices, the set of correct
+    choice texts and, for ordering questions, the texts in correct_position order
+    (carried for display; score_question does not use it).
+    """
+    choices = [dict(c) for c in choices if c]
+    positioned = sorted(
+        (c for c in choices if c.get("correct_position") is not None),
+        key=lambda c: c["correct_position"]
+    )
+    return {
+        "choices": choices,
+        "correct": frozenset(c["choice_text"] for c in choices if c.get("is_correct")),
+        "ordering": [c["choice_text"] for c in positioned]
+    }
+
+def selected_texts(ans_data):
+    if not ans_data:
+        return []
+    if isinstance(ans_data, dict):
+        return ans_data.get("selected_texts") or []
+    return ans_data.selected_texts or []
+
+def score_question(key, selected, points):
+    # Set comparison for every type, ordering included: this is how submissions
+    # were always graded, and scoring ordering by sequence would change the
+    # grades of results already recorded.
+    if set(selected) == key["correct"]:
+        return points
+    if set(selected) & key["correct"]:
+        return points / 2
+    return 0
+
+def match_choices(key, selected):
+    # Selected texts are matched to choices case-insensitively. A text matches
+    # every choice carrying it, so duplicate choice texts are all counted, as
+    # the per-text Cypher updates did before.
+    matched = []
+    for answer_text in selected:
+        answer_text = answer_text.strip().lower()
+        for c in key["choices"]:
+            if (c.get("choice_text") or "").lower() == answer_text:
+                matched.append(c)
+    return matched
+
+def score_exam(answer_keys, questions, answers_dict):
+    """
+    Pure scoring of one submission. `answer_keys` maps question id to a key from
+    build_answer_key, `questions` holds id/section/points and `answers_dict` maps
+    question id to the submitted answer. No database access.
+    """
+    empty_key = build_answer_key([])
+    section_scores = {sec: [0, 0] for sec in SECTION_NUMBERS}
+    section_correct_wrong = {sec: [0, 0] for sec in SECTION_NUMBERS}
+    answers = []
+    question_deltas = []
+    choice_deltas = {}
+    for q in questions:
+        qid = q["id"]
+        points = q.get("points", 1)
+        key = answer_keys.get(qid, empty_key)
+        ans_data = answers_dict.get(str(qid))
+        selected = selected_texts(ans_data)
+        points_earned = score_question(key, selected, points) if ans_data else 0
+        section_scores[q["section"]][0] += points_earned
+        section_scores[q["section"]][1] += points
+        if points_earned == points:
+            section_correct_wrong[q["section"]][0] += 1
+        else:
+            section_correct_wrong[q["section"]][1] += 1
+        question_deltas.append({
+            "id": qid,
+            "wrong_count": 1 if points_earned < points else 0,
+            "correct_count": 1 if points_earned == points else 0,
+            "zero_count": 1 if points_earned == 0 else 0
+        })
+        chosen = []
+        for c in match_choices(key, selected):
+            delta = choice_deltas.setdefault(c["id"], {"id": c["id"], "selected_count": 0, "selected_correct_count": 0})
+            delta["selected_count"] += 1
+            if c.get("is_correct"):
+                delta["selected_correct_count"] += 1
+            chosen.append(c["id"])
+        answers.append({
+            "question_id": qid,
+            "section": q["section"],
+            "points_earned": points_earned,
+            "points_possible": points,
+            "chosen": chosen
+        })
+    total_earned = sum(section_scores[s][0] for s in section_scores)
+    total_possible = sum(section_scores[s][1] for s in section_scores)
+    final_score = round((total_earned / total_possible) * 100, 2) if total_possible > 0 else 0.0
+    return {
+        "section_scores": section_scores,
+        "section_correct_wrong": section_correct_wrong,
+        "final_score": final_score,
+        "answers": answers,
+        "question_deltas": question_deltas,
+        "choice_deltas": list(choice_deltas.values())
+    }
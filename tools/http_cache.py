@@ -0,0 +1,58 @@
+# tools/http_cache.py
+import hashlib
+import os
+from tools.cache import LRUCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+
+# Responses are cached only per user scope and revalidated by the client.
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts):
+    """Strong ETag from the parts that fully determine a response body."""
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+# Content codings the compression middleware can apply to a response.
+CONTENT_CODINGS = ("gzip", "br")
+
+def encoded_etag(etag, encoding):
+    """ETag of the `encoding`-compressed representation of the body tagged `etag`."""
+    weak = etag.startswith("W/")
+    tag = etag[2:] if weak else etag
+    return ("W/" if weak else "") + f'{tag[:-1]}-{encoding}"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match uses the weak comparison.
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        # A validator of a compressed representation revalidates the same body.
+        for encoding in CONTENT_CODINGS:
+            if tag.endswith(f'-{encoding}"'):
+                tag = tag[:-len(encoding) - 2] + '"'
+                break
+        if tag == etag:
+            return True
+    return False
+
+class ResponseCache(LRUCache):
+    """
+    Server-side cache of response bodies keyed by ETag. Since the ETag is built
+    from a version stamp, a stale entry is simply never asked for again and
+    ages out of the LRU.
+    """
+
+    def get_or_build(self, etag, build):
+        body = self.get(etag)
+        if body is None:
+            body = build()
+            self.set(etag, body)
+        return body
+
+response_cache = ResponseCache(max_size=RESPONSE_CACHE_SIZE)
@@ -0,0 +1,184 @@
+# tools/item_analysis.py
+"""
+Batch item analysis (python -m tools.item_analysis): difficulty (p-value),
+point-biserial discrimination and distractor effectiveness per question,
+written back onto the Question nodes.
+"""
+import os
+import sys
+import time
+from array import array
+import numpy as np
+
+ITEM_ANALYSIS_BATCH_SIZE = int(os.getenv("ITEM_ANALYSIS_BATCH_SIZE", "1000"))
+DISTRACTOR_MIN_SHARE = float(os.getenv("DISTRACTOR_MIN_SHARE", "0.05"))
+MIN_RESPONSES = int(os.getenv("ITEM_ANALYSIS_MIN_RESPONSES", "30"))
+
+# Questions outside these bounds are flagged for review.
+DIFFICULTY_RANGE = (0.2, 0.95)
+MIN_DISCRIMINATION = 0.2
+
+QUESTIONS_QUERY = """
+MATCH (q:Question)
+RETURN q.id AS id, q.points AS points
+"""
+
+ANSWERS_QUERY = """
+MATCH (e:Exam)-[:HAS_ANSWER]->(ea:ExamAnswer)
+RETURN e.exam_id AS exam_id, ea.question_id AS question_id, ea.points_earned AS points_earned
+"""
+
+CHOICES_QUERY = """
+MATCH (q:Question)-[:HAS_CHOICE]->(c:Choice)
+RETURN q.id AS question_id, c.is_correct AS is_correct, coalesce(c.selected_count, 0) AS selected_count
+"""
+
+WRITE_BACK_QUERY = """
+UNWIND $rows AS row
+MATCH (q:Question {id: row.id})
+SET q.item_responses = row.responses,
+    q.difficulty = row.difficulty,
+    q.discrimination = row.discrimination,
+    q.distractor_effectiveness = row.distractor_effectiveness,
+    q.item_flag = row.flag,
+    q.item_analyzed_at = datetime()
+"""
+
+def build_matrix(records, question_points):
+    """
+    Turns (exam_id, question_id, points_earned) records into parallel arrays of
+    attempt index, question index and normalized score. Only the two id maps
+    grow with the data; the arrays hold 12 bytes per answer.
+    """
+    question_index = {qid: i for i, qid in enumerate(question_points)}
+    points = list(question_points.values())
+    attempt_index = {}
+    rows, cols, scores = array("i"), array("i"), array("f")
+    for exam_id, question_id, earned in records:
+        col = question_index.get(question_id)
+        if col is None or not points[col]:
+            continue
+        row = attempt_index.setdefault(exam_id, len(attempt_index))
+        rows.append(row)
+        cols.append(col)
+        scores.append((earned or 0) / points[col])
+    return (
+        np.array(rows, dtype=np.int32),
+        np.array(cols, dtype=np.int32),
+        np.array(scores, dtype=np.float64),
+        len(attempt_index)
+    )
+
+def analyze(rows, cols, scores, n_attempts, n_questions):
+    """Returns responses, difficulty and discrimination arrays indexed by question."""
+    responses = np.bincount(cols, minlength=n_questions)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difficulty = np.bincount(cols, weights=scores, minlength=n_questions) / responses
+        # Rest score: the attempt's mean over its other questions, so attempts
+        # of different lengths are comparable and the item does not correlate
+        # with itself.
+        attempt_total = np.bincount(rows, weights=scores, minlength=n_attempts)
+        attempt_count = np.bincount(rows, minlength=n_attempts)
+        other = attempt_count[rows] - 1
+        rest = np.where(other > 0, (attempt_total[rows] - scores) / np.maximum(other, 1), np.nan)
+        valid = ~np.isnan(rest)
+        c, x, y = cols[valid], scores[valid], rest[valid]
+        n = np.bincount(c, minlength=n_questions).astype(np.float64)
+        sx = np.bincount(c, weights=x, minlength=n_questions)
+        sy = np.bincount(c, weights=y, minlength=n_questions)
+        sxy = np.bincount(c, weights=x * y, minlength=n_questions)
+        sxx = np.bincount(c, weights=x * x, minlength=n_questions)
+        syy = np.bincount(c, weights=y * y, minlength=n_questions)
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        discrimination = np.where(var > 0, cov / np.sqrt(np.where(var > 0, var, 1)), np.nan)
+    return responses, difficulty, discrimination
+
+def distractor_effectiveness(choice_records, question_index):
+    """Share of each question's wrong choices picked by >= DISTRACTOR_MIN_SHARE of its selections."""
+    n_questions = len(question_index)
+    cols, wrong, counts = [], [], []
+    for question_id, is_correct, selected_count in choice_records:
+        col = question_index.get(question_id)
+        if col is not None:
+            cols.append(col)
+            wrong.append(not is_correct)
+            counts.append(selected_count or 0)
+    if not cols:
+        return np.full(n_questions, np.nan)
+    cols = np.asarray(cols, dtype=np.int32)
+    wrong = np.asarray(wrong, dtype=bool)
+    counts = np.asarray(counts, dtype=np.float64)
+    total = np.bincount(cols, weights=counts, minlength=n_questions)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = counts / total[cols]
+        functional = np.bincount(cols, weights=(wrong & (share >= DISTRACTOR_MIN_SHARE)), minlength=n_questions)
+        distractors = np.bincount(cols, weights=wrong, minlength=n_questions)
+        return np.where((distractors > 0) & (total > 0), functional / np.maximum(distractors, 1), np.nan)
+
+def _value(x):
+    return None if np.isnan(x) else round(float(x), 4)
+
+def result_rows(question_ids, responses, difficulty, discrimination, effectiveness):
+    rows = []
+    for i, qid in enumerate(question_ids):
+        n = int(responses[i])
+        enough = n >= MIN_RESPONSES
+        p = _value(difficulty[i]) if n else None
+        r = _value(discrimination[i]) if enough else None
+        flag = None
+        if enough and p is not None:
+            if not (DIFFICULTY_RANGE[0] <= p <= DIFFICULTY_RANGE[1]) or (r is not None and r < MIN_DISCRIMINATION):
+                flag = "review"
+        rows.append({
+            "id": qid,
+            "responses": n,
+            "difficulty": p,
+            "discrimination": r,
+            "distractor_effectiveness": _value(effectiveness[i]),
+            "flag": flag
+        })
+    return rows
+
+def write_back(session, rows, batch_size=ITEM_ANALYSIS_BATCH_SIZE):
+    def _write(tx, chunk):
+        tx.run(WRITE_BACK_QUERY, {"rows": chunk}).consume()
+    for i in range(0, len(rows), batch_size):
+        session.execute_write(_write, rows[i:i + batch_size])
+
+def run(session):
+    started = time.perf_counter()
+    question_points = {r["id"]: r["points"] for r in session.run(QUESTIONS_QUERY)}
+    answers = ((r["exam_id"], r["question_id"], r["points_earned"]) for r in session.run(ANSWERS_QUERY))
+    rows, cols, scores, n_attempts = build_matrix(answers, question_points)
+    loaded = time.perf_counter()
+    question_ids = list(question_points)
+    question_index = {qid: i for i, qid in enumerate(question_ids)}
+    responses, difficulty, discrimination = analyze(rows, cols, scores, n_attempts, len(question_ids))
+    choices = ((r["question_id"], r["is_correct"], r["selected_count"]) for r in session.run(CHOICES_QUERY))
+    effectiveness = distractor_effectiveness(choices, question_index)
+    results = result_rows(question_ids, responses, difficulty, discrimination, effectiveness)
+    computed = time.perf_counter()
+    write_back(session, results)
+    return {
+        "answers": len(scores),
+        "attempts": n_attempts,
+        "questions": len(question_ids),
+        "flagged": sum(1 for r in results if r["flag"]),
+        "load_seconds": round(loaded - started, 3),
+        "compute_seconds": round(computed - loaded, 3),
+        "write_seconds": round(time.perf_counter() - computed, 3)
+    }
+
+def main():
+    from tools.database import get_db
+    session = get_db()
+    try:
+        summary = run(session)
+    finally:
+        session.close()
+    print(", ".join(f"{k}={v}" for k, v in summary.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# tools/question_bank.py
+import threading
+
+BANK_NAME = "main"
+
+def get_bank_version(session):
+    result = session.run("""
+    MATCH (b:QuestionBank {name: $name})
+    RETURN b.version AS version
+    """, {"name": BANK_NAME})
+    record = result.single()
+    return record["version"] if record and record["version"] is not None else 0
+
+def bump_bank_version(session):
+    # Called after every write to the question bank so that all workers reload it.
+    result = session.run("""
+    MERGE (b:QuestionBank {name: $name})
+    SET b.version = coalesce(b.version, 0) + 1
+    RETURN b.version AS version
+    """, {"name": BANK_NAME})
+    return result.single()["version"]
+
+def fetch_questions(session):
+    result = session.run("""
+    MATCH (q:Question)
+    OPTIONAL MATCH (q)-[:HAS_CHOICE]->(c:Choice)
+    RETURN q, collect(c) AS choices
+    """)
+    questions = []
+    for record in result:
+        q = dict(record["q"])
+        q["choices"] = [dict(c) for c in record["choices"] if c is not None]
+        questions.append(q)
+    return questions
+
+class QuestionIndex:
+    """
+    Lookup tables over one version of the bank: question by id, question ids
+    per section and question ids per (section, type).
+    """
+
+    def __init__(self, questions):
+        self.by_id = {}
+        self.by_section = {}
+        self.by_section_type = {}
+        for q in questions:
+            qid = q["id"]
+            sec = q.get("section")
+            self.by_id[qid] = q
+            self.by_section.setdefault(sec, []).append(qid)
+            self.by_section_type.setdefault((sec, q.get("type")), []).append(qid)
+
+    def __len__(self):
+        return len(self.by_id)
+
+class QuestionBankCache:
+    """
+    Process-local copy of the question bank, keyed by the QuestionBank version
+    counter stored in Neo4j. Every lookup costs one small version read; the full
+    bank is only pulled again when the version has changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._questions = []
+        self._index = QuestionIndex([])
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+
+    def add_listener(self, callback):
+        # callback(questions) runs after every reload, e.g. to refresh derived caches.
+        self._listeners.append(callback)
+
+    def _refresh(self, session):
+        version = get_bank_version(session)
+        with self._lock:
+            if self._version == version:
+                self.hits += 1
+                return version, self._questions, self._index
+        # Load outside the lock; a concurrent reload only costs a duplicate read.
+        questions = fetch_questions(session)
+        index = QuestionIndex(questions)
+        with self._lock:
+            self.misses += 1
+            self._version = version
+            self._questions = questions
+            self._index = index
+        for callback in self._listeners:
+            callback(questions)
+        return version, questions, index
+
+    def get(self, session):
+        return self._refresh(session)[1]
+
+    def get_index(self, session):
+        return self._refresh(session)[2]
+
+    def get_versioned_index(self, session):
+        version, _, index = self._refresh(session)
+        return version, index
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._questions = []
+            self._index = QuestionIndex([])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self._version,
+                "size": len(self._questions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total > 0 else 0.0
+            }
+
+question_bank_cache = QuestionBankCache()
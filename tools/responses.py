@@ -0,0 +1,13 @@
+# tools/responses.py
+from fastapi.responses import JSONResponse
+from tools.fast_json import dumps
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for large bodies we build ourselves. Returning it from an
+    endpoint bypasses the response_model re-validation and jsonable_encoder
+    walk; the model is kept on the route for the OpenAPI docs only.
+    """
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,186 @@
+# tools/results.py
+import json
+from datetime import datetime
+from tools.http_cache import make_etag
+from tools.statistics_utils import statistics_revision
+from tools.distribution import percentile_rank
+
+PASS_MARK = 75.0
+
+STATS_SUBQUERY = """
+CALL {
+    MATCH (st:Statistics {school_id: $school_id, class_name: $class_name})
+    OPTIONAL MATCH (ss:SchoolStatistics {school_id: $school_id, section_number: st.section_number})
+    RETURN collect(st {.section_number, .section_percentage, .histogram, school_percentage_sum: ss.percentage_sum,
+                       school_exam_takers: ss.exam_takers, school_histogram: ss.histogram}) AS stats
+}
+"""
+
+SUMMARIES_QUERY = STATS_SUBQUERY + """
+OPTIONAL MATCH (er:ExamResult {student_id: $user_id})
+WITH stats, er
+ORDER BY er.attempt_number ASC, er.timestamp ASC
+RETURN stats, collect(er.summary) AS summaries, count(er) AS results
+"""
+
+# Results recorded before summaries existed are rebuilt from the raw answers.
+RESULTS_QUERY = STATS_SUBQUERY + """
+MATCH (e:Exam {user_id: $user_id})
+WHERE e.end_time IS NOT NULL
+CALL {
+    WITH e
+    MATCH (e)-[:HAS_ANSWER]->(ea:ExamAnswer)
+    MATCH (q:Question {id: ea.question_id})
+    RETURN collect({
+        points_earned: ea.points_earned,
+        question: q {.id, .question, .section, .points, .type},
+        choices: [(q)-[:HAS_CHOICE]->(c:Choice) | c {.id, .choice_text, .is_correct, .correct_position}],
+        chosen: [(ea)-[:CHOSE]->(c:Choice) | c.id]
+    }) AS answers
+}
+WITH stats, e, answers
+ORDER BY e.start_time ASC
+RETURN stats, collect({start_time: e.start_time, end_time: e.end_time, answers: answers}) AS exams
+"""
+
+def format_datetime(dt):
+    if hasattr(dt, "to_native"):
+        dt = dt.to_native()
+    if isinstance(dt, str):
+        try:
+            dt_obj = datetime.fromisoformat(dt)
+        except Exception:
+            return dt
+        return dt_obj.strftime("%b %d, %Y %H:%M:%S")
+    elif hasattr(dt, "strftime"):
+        return dt.strftime("%b %d, %Y %H:%M:%S")
+    else:
+        return dt
+
+def correct_texts(q_type, choices):
+    if q_type == "ordering":
+        positioned = sorted((c for c in choices if c.get("correct_position") is not None), key=lambda c: c["correct_position"])
+        return [c["choice_text"] for c in positioned]
+    if q_type in ["multiple_choice", "single_choice", "true_false"]:
+        return [c["choice_text"] for c in choices if c.get("is_correct")]
+    return []
+
+def summarize_exam(start_time, end_time, answers):
+    """
+    Compact per-exam summary: section totals, pass/fail and per-question status.
+    Each answer holds question (text/section/points/type), choices, chosen choice
+    ids and points_earned.
+    """
+    section_dict = {}
+    questions = []
+    for ans in answers:
+        q = ans["question"]
+        points_earned = ans["points_earned"]
+        data = section_dict.setdefault(q["section"], {"correct": 0, "wrong": 0, "earned": 0, "possible": 0})
+        if points_earned == q["points"]:
+            data["correct"] += 1
+            status = "Correct"
+        else:
+            data["wrong"] += 1
+            status = "Partially Correct" if points_earned > 0 else "Wrong"
+        data["earned"] += points_earned
+        data["possible"] += q["points"]
+        texts = {c["id"]: c["choice_text"] for c in ans["choices"]}
+        questions.append({
+            "question_text": q["question"],
+            "student_answers": [texts[cid] for cid in ans["chosen"] if cid in texts],
+            "correct_answers": correct_texts(q["type"], ans["choices"]),
+            "status": status,
+            "points_earned": points_earned,
+            "points_possible": q["points"]
+        })
+    all_section_pass = True
+    for data in section_dict.values():
+        section_score = (data["earned"] / data["possible"]) * 100 if data["possible"] > 0 else 0.0
+        if section_score < PASS_MARK:
+            all_section_pass = False
+    total_earned = sum(d["earned"] for d in section_dict.values())
+    total_possible = sum(d["possible"] for d in section_dict.values())
+    final_score = round((total_earned / total_possible) * 100, 2) if total_possible > 0 else 0.0
+    return {
+        "start_time": format_datetime(start_time),
+        "end_time": format_datetime(end_time) if end_time else None,
+        "pass_fail": "passed" if (all_section_pass and final_score >= PASS_MARK) else "failed",
+        "exam_percentage": final_score,
+        "sections": [dict(section_number=sec, **section_dict[sec]) for sec in sorted(section_dict)],
+        "questions": questions
+    }
+
+def freeze_summary(summary):
+    return json.dumps(summary, separators=(",", ":"), ensure_ascii=False)
+
+def render_exam(summary, stats_map, user):
+    # Class and school figures and the student's running average are live values,
+    # so they are joined in here rather than stored in the summary.
+    sections_details = []
+    for sec in summary["sections"]:
+        st = stats_map.get(sec["section_number"], {})
+        takers = st.get("school_exam_takers") or 0
+        notu_value = round((sec["earned"] / sec["possible"]) * 100, 2) if sec["possible"] > 0 else 0.0
+        sections_details.append({
+            "section_number": sec["section_number"],
+            "correct_answers": sec["correct"],
+            "wrong_answers": sec["wrong"],
+            "so": round(st.get("section_percentage") or 0, 2),
+            "oo": round((st.get("school_percentage_sum") or 0) / takers, 2) if takers > 0 else 0.0,
+            "notu": notu_value,
+            "ort": round(user.get("score_avg", 0), 2),
+            "percentile_rank": percentile_rank(st.get("histogram"), notu_value),
+            "school_percentile_rank": percentile_rank(st.get("school_histogram"), notu_value)
+        })
+    return {
+        "start_time": summary["start_time"],
+        "end_time": summary["end_time"],
+        "pass_fail": summary["pass_fail"],
+        "sections_details": sections_details,
+        "questions_details": summary["questions"],
+        "exam_percentage": summary["exam_percentage"]
+    }
+
+def load_exam_summaries(session, user):
+    """
+    Summaries of a student's finished exams, read with one indexed ExamResult
+    lookup. Falls back to rebuilding them from ExamAnswers when any result
+    predates stored summaries.
+    """
+    params = {
+        "user_id": user["user_id"],
+        "school_id": user.get("school_id"),
+        "class_name": user["class_name"]
+    }
+    record = session.run(SUMMARIES_QUERY, params).single()
+    if record and len(record["summaries"]) == record["results"]:
+        return record["stats"], [json.loads(s) for s in record["summaries"]]
+    record = session.run(RESULTS_QUERY, params).single()
+    if not record:
+        return [], []
+    summaries = [summarize_exam(e["start_time"], e["end_time"], e["answers"]) for e in record["exams"]]
+    return record["stats"], summaries
+
+def load_exam_results(session, user):
+    stats, summaries = load_exam_summaries(session, user)
+    stats_map = {st["section_number"]: st for st in stats}
+    exams = [render_exam(summary, stats_map, user) for summary in summaries]
+    overall = round(sum(e["exam_percentage"] for e in exams) / len(exams), 2) if exams else 0.0
+    return {
+        "student_number": user.get("okul_no"),
+        "class_name": user["class_name"],
+        "attempts": user.get("attempts", 0),
+        "exams": exams,
+        "overall_percentage": overall
+    }
+
+def results_etag(session, user):
+    """
+    Stamp for a student's results page: stored summaries only change with the
+    student's attempts, the class and school figures with the school's
+    statistics.
+    """
+    revision = statistics_revision(session, user.get("school_id"))
+    return make_etag("results_v2", user["user_id"], user.get("attempts", 0), user.get("score_avg"),
+                     user.get("okul_no"), user.get("school_id"), user["class_name"], revision)
@@ -0,0 +1,131 @@
+# tools/static_assets.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_URL = "/static"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files smaller than this are not worth compressing.
+COMPRESS_MIN_SIZE = 512
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+class Asset:
+    __slots__ = ("path", "url_path", "media_type", "etag", "bodies")
+
+    def __init__(self, path, url_path, media_type, etag, bodies):
+        self.path = path
+        self.url_path = url_path
+        self.media_type = media_type
+        self.etag = etag
+        self.bodies = bodies  # encoding ("identity", "gzip", "br") -> bytes
+
+def fingerprint(path, digest):
+    """style.css -> style.<digest>.css"""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f"{stem}.{digest}{ext}").replace(os.sep, "/")
+
+def compress(data, media_type):
+    bodies = {"identity": data}
+    if len(data) < COMPRESS_MIN_SIZE or not media_type.startswith(COMPRESSIBLE_TYPES):
+        return bodies
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        bodies["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            bodies["br"] = br
+    return bodies
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for part in (header or "").split(","):
+        fields = part.strip().split(";")
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def choose_encoding(accept_encoding, available):
+    """Best stored encoding the client accepts: br, then gzip, else identity."""
+    accepted = parse_accept_encoding(accept_encoding)
+    for coding in ("br", "gzip"):
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if coding in available and q > 0:
+            return coding
+    return "identity"
+
+class AssetManifest:
+    """
+    Content-hashed names and precompressed bodies of every file under the
+    static directory, built once per process. Hashed URLs never change
+    content, so they are served with an immutable Cache-Control.
+    """
+
+    def __init__(self, directory=STATIC_DIR, url_prefix=STATIC_URL):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._urls = None
+        self._assets = None
+
+    def build(self):
+        urls, assets = {}, {}
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                path = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                hashed = fingerprint(path, digest)
+                urls[path] = f"{self.url_prefix}/{hashed}"
+                assets[hashed] = Asset(full, hashed, media_type, f'"{digest}"', compress(data, media_type))
+        with self._lock:
+            self._urls, self._assets = urls, assets
+        return len(assets)
+
+    def _ensure(self):
+        if self._assets is None:
+            self.build()
+
+    def url(self, path):
+        """Hashed URL of a static file; unknown files keep their plain URL."""
+        self._ensure()
+        path = path.lstrip("/")
+        return self._urls.get(path, f"{self.url_prefix}/{path}")
+
+    def lookup(self, hashed_path):
+        self._ensure()
+        return self._assets.get(hashed_path)
+
+    def stats(self):
+        self._ensure()
+        return {
+            "assets": len(self._assets),
+            "bytes": sum(len(a.bodies["identity"]) for a in self._assets.values()),
+            "gzip_bytes": sum(len(a.bodies.get("gzip", a.bodies["identity"])) for a in self._assets.values()),
+            "br_bytes": sum(len(a.bodies.get("br", a.bodies["identity"])) for a in self._assets.values()),
+            "brotli": brotli is not None
+        }
+
+asset_manifest = AssetManifest()
@@ -0,0 +1,32 @@
+# tools/static_files.py
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from tools.static_assets import asset_manifest, choose_encoding, IMMUTABLE_CACHE_CONTROL
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    Serves hashed asset URLs from the in-memory manifest (precompressed,
+    immutable); any other path falls back to plain StaticFiles.
+    """
+
+    def __init__(self, *args, manifest=asset_manifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path, scope):
+        asset = self.manifest.lookup(path.lstrip("/").replace("\\", "/"))
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        request_headers = Headers(scope=scope)
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "ETag": asset.etag,
+            "Vary": "Accept-Encoding"
+        }
+        if request_headers.get("if-none-match") == asset.etag:
+            return Response(status_code=304, headers=headers)
+        encoding = choose_encoding(request_headers.get("accept-encoding"), asset.bodies)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
@@ -1,58 +1,179 @@
 # tools/statistics_utils.py
-def update_statistics(session, school_id, class_name, section_scores: dict, section_correct_wrong: dict, attempt_number):
+from datetime import datetime
+
+SUBJECT_MAPPING = {1: "Math", 2: "English", 3: "Science", 4: "History"}
+
+# Bölüm yüzdeleri için sabit 5 puanlık histogram kutuları (0-100); sınıf ve okul
+# histogramları eleman eleman toplanarak birleştirilebilir.
+HISTOGRAM_BINS = 20
+BIN_WIDTH = 100 / HISTOGRAM_BINS
+
+def bin_index(percentage):
+    return min(max(int((percentage or 0) // BIN_WIDTH), 0), HISTOGRAM_BINS - 1)
+
+UPDATE_STATISTICS_QUERY = """
+UNWIND $rows AS row
+MERGE (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: row.section_number})
+WITH st, row, st.exam_takers IS NULL AS created
+SET st.correct_questions = coalesce(st.correct_questions, 0) + row.correct,
+    st.wrong_questions = coalesce(st.wrong_questions, 0) + row.wrong,
+    st.section_percentage = row.section_percentage,
+    st.exam_takers = coalesce(st.exam_takers, 0) + 1,
+    st.section_name = row.section_name,
+    st.histogram = [i IN range(0, $bins - 1) | coalesce(st.histogram[i], 0) + CASE WHEN i = row.bin THEN 1 ELSE 0 END],
+    st.success_rate = CASE WHEN (row.correct + row.wrong) > 0 THEN round((row.correct * 1.0 / (row.correct + row.wrong)) * 100, 2) ELSE 0 END,
+    st.first_exam_percentage = CASE WHEN $attempt_number = 1
+        THEN coalesce(st.first_exam_percentage, 0) + row.section_percentage ELSE st.first_exam_percentage END,
+    st.first_exam_count = CASE WHEN $attempt_number = 1
+        THEN coalesce(st.first_exam_count, 0) + 1 ELSE st.first_exam_count END,
+    st.second_exam_percentage = CASE WHEN $attempt_number = 2
+        THEN coalesce(st.second_exam_percentage, 0) + row.section_percentage ELSE st.second_exam_percentage END,
+    st.second_exam_count = CASE WHEN $attempt_number = 2
+        THEN coalesce(st.second_exam_count, 0) + 1 ELSE st.second_exam_count END
+// Okul ve genel toplamlar aynı işlemde, her bölüm için aynı sırayla güncellenir.
+WITH st, row, created
+MERGE (ss:SchoolStatistics {school_id: $school_id, section_number: row.section_number})
+SET ss.correct_questions = coalesce(ss.correct_questions, 0) + row.correct,
+    ss.wrong_questions = coalesce(ss.wrong_questions, 0) + row.wrong,
+    ss.exam_takers = coalesce(ss.exam_takers, 0) + 1,
+    ss.percentage_sum = coalesce(ss.percentage_sum, 0) + row.section_percentage,
+    ss.histogram = [i IN range(0, $bins - 1) | coalesce(ss.histogram[i], 0) + CASE WHEN i = row.bin THEN 1 ELSE 0 END],
+    ss.section_name = row.section_name
+MERGE (gs:GlobalStatistics {section_number: row.section_number})
+SET gs.correct_questions = coalesce(gs.correct_questions, 0) + row.correct,
+    gs.wrong_questions = coalesce(gs.wrong_questions, 0) + row.wrong,
+    gs.exam_takers = coalesce(gs.exam_takers, 0) + 1,
+    gs.percentage_sum = coalesce(gs.percentage_sum, 0) + row.section_percentage,
+    gs.section_name = row.section_name
+// Trend grafikleri için günlük ve haftalık kovalar
+WITH st, row, created, date(datetime($submitted_at)) AS day
+MERGE (sd:StatisticsBucket {school_id: $school_id, class_name: $class_name, section_number: row.section_number,
+                            period: 'day', start: day})
+SET sd.correct_questions = coalesce(sd.correct_questions, 0) + row.correct,
+    sd.wrong_questions = coalesce(sd.wrong_questions, 0) + row.wrong,
+    sd.exam_takers = coalesce(sd.exam_takers, 0) + 1,
+    sd.percentage_sum = coalesce(sd.percentage_sum, 0) + row.section_percentage
+MERGE (sw:StatisticsBucket {school_id: $school_id, class_name: $class_name, section_number: row.section_number,
+                            period: 'week', start: date.truncate('week', day)})
+SET sw.correct_questions = coalesce(sw.correct_questions, 0) + row.correct,
+    sw.wrong_questions = coalesce(sw.wrong_questions, 0) + row.wrong,
+    sw.exam_takers = coalesce(sw.exam_takers, 0) + 1,
+    sw.percentage_sum = coalesce(sw.percentage_sum, 0) + row.section_percentage
+// İlişkiler yalnızca istatistik düğümü ilk oluşturulduğunda kurulur.
+WITH st, row, created
+WHERE created
+MERGE (sec:Section {section_number: row.section_number})
+MERGE (st)-[:OF_SECTION]->(sec)
+MERGE (c:Class {name: $class_name})
+MERGE (c)-[:HAS_STATISTICS]->(st)
+WITH st
+OPTIONAL MATCH (s:School {school_id: $school_id})
+FOREACH (_ IN CASE WHEN s IS NULL THEN [] ELSE [1] END | MERGE (s)-[:HAS_STATISTICS]->(st))
+"""
+
+def update_statistics(session, school_id, class_name, section_scores: dict, section_correct_wrong: dict, attempt_number, submitted_at=None):
     """
     Her bölüm için istatistik düğümü oluşturulur veya güncellenir.
     Ek olarak, attempt_number bilgisine göre ilk ve ikinci sınav yüzdeleri ayrı tutulur.
     Bu istatistik düğümleri, ilgili Section, Class ve School düğümleriyle ilişkilendirilecektir.
+    Okul (SchoolStatistics) ve genel (GlobalStatistics) bölüm toplamları, sınıf ve okul yüzde
+    histogramları ile gönderim gününün ve haftasının StatisticsBucket kovaları da aynı sorguda güncellenir.
+    Dört bölüm tek bir UNWIND sorgusuyla, tek seferde yazılır.
     """
-    subject_mapping = {1: "Math", 2: "English", 3: "Science", 4: "History"}
+    rows = []
     for sec in range(1, 5):
         sum_earned, sum_possible = section_scores.get(sec, [0, 0])
+        correct, wrong = section_correct_wrong.get(sec, [0, 0])
         section_percentage = round((sum_earned / sum_possible) * 100, 2) if sum_possible > 0 else 0
-        session.run("""
-        MERGE (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-        SET st.correct_questions = coalesce(st.correct_questions, 0) + $correct,
-            st.wrong_questions = coalesce(st.wrong_questions, 0) + $wrong,
-            st.section_percentage = $section_percentage,
-            st.exam_takers = coalesce(st.exam_takers, 0) + 1,
-            st.section_name = $section_name,
-            st.success_rate = CASE WHEN ($correct + $wrong) > 0 THEN round(($correct * 1.0 / ($correct + $wrong)) * 100, 2) ELSE 0 END
-        """, {
-            "school_id": school_id,
-            "class_name": class_name,
+        rows.append({
             "section_number": sec,
-            "correct": section_correct_wrong.get(sec, [0, 0])[0],
-            "wrong": section_correct_wrong.get(sec, [0, 0])[1],
+            "correct": correct,
+            "wrong": wrong,
             "section_percentage": section_percentage,
-            "section_name": subject_mapping.get(sec, f"Section {sec}")
+            "bin": bin_index(section_percentage),
+            "section_name": SUBJECT_MAPPING.get(sec, f"Section {sec}")
         })
-        if attempt_number == 1:
-            session.run("""
-            MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-            SET st.first_exam_percentage = coalesce(st.first_exam_percentage, 0) + $section_percentage,
-                st.first_exam_count = coalesce(st.first_exam_count, 0) + 1
-            """, {"school_id": school_id, "class_name": class_name, "section_number": sec, "section_percentage": section_percentage})
-        elif attempt_number == 2:
-            session.run("""
-            MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-            SET st.second_exam_percentage = coalesce(st.second_exam_percentage, 0) + $section_percentage,
-                st.second_exam_count = coalesce(st.second_exam_count, 0) + 1
-            """, {"school_id": school_id, "class_name": class_name, "section_number": sec, "section_percentage": section_percentage})
-        # İstatistik düğümünü ilgili Section düğümüyle ilişkilendiriyoruz.
-        session.run("""
-        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-        MERGE (sec:Section {section_number: $section_number})
-        MERGE (st)-[:OF_SECTION]->(sec)
-        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
-        # İstatistik düğümünü Class düğümüyle ilişkilendiriyoruz.
-        session.run("""
-        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-        MERGE (c:Class {name: $class_name})
-        MERGE (c)-[:HAS_STATISTICS]->(st)
-        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
-        # İstatistik düğümünü School düğümüyle ilişkilendiriyoruz.
-        session.run("""
-        MATCH (st:Statistics {school_id: $school_id, class_name: $class_name, section_number: $section_number})
-        MATCH (s:School {school_id: $school_id})
-        MERGE (s)-[:HAS_STATISTICS]->(st)
-        """, {"school_id": school_id, "class_name": class_name, "section_number": sec})
+    session.run(UPDATE_STATISTICS_QUERY, {
+        "school_id": school_id,
+        "class_name": class_name,
+        "attempt_number": attempt_number,
+        "submitted_at": submitted_at or datetime.utcnow().isoformat(),
+        "bins": HISTOGRAM_BINS,
+        "rows": rows
+    }).consume()
+
+STATISTICS_REVISION_QUERIES = {
+    "class": "MATCH (st:Statistics {school_id: $school_id, class_name: $class_name}) RETURN coalesce(sum(st.exam_takers), 0) AS revision",
+    "school": "MATCH (ss:SchoolStatistics {school_id: $school_id}) RETURN coalesce(sum(ss.exam_takers), 0) AS revision",
+    "global": "MATCH (gs:GlobalStatistics) RETURN coalesce(sum(gs.exam_takers), 0) AS revision"
+}
+
+def statistics_revision(session, school_id=None, class_name=None):
+    """
+    Ucuz sürüm damgası: her gönderim ilgili istatistik düğümlerinin exam_takers
+    sayacını artırdığı için toplamları bir revizyon sayacı gibi davranır.
+    Kapsam sınıf, okul ya da genel olabilir; okul ve genel kapsam toplam
+    düğümlerinden (en fazla dört düğüm) okunur.
+    """
+    scope = "class" if class_name else "school" if school_id else "global"
+    record = session.run(STATISTICS_REVISION_QUERIES[scope], {"school_id": school_id, "class_name": class_name}).single()
+    return record["revision"] if record else 0
+
+# Toplam düğümleri eklenmeden önceki veriler için tek seferlik doldurma; mevcut
+# Statistics düğümlerinden mutlak değerler yazılır. Migration işareti bir kez çalışmasını sağlar.
+BACKFILL_ROLLUPS_QUERY = """
+MERGE (m:Migration {name: 'statistics_rollups'})
+SET m._lock = true
+REMOVE m._lock
+WITH m
+WHERE m.applied_at IS NULL
+CALL {
+    MATCH (st:Statistics)
+    WHERE st.school_id IS NOT NULL
+    WITH st.school_id AS school_id, st.section_number AS section_number,
+         sum(coalesce(st.correct_questions, 0)) AS correct,
+         sum(coalesce(st.wrong_questions, 0)) AS wrong,
+         sum(coalesce(st.exam_takers, 0)) AS takers,
+         sum(coalesce(st.first_exam_percentage, 0) + coalesce(st.second_exam_percentage, 0)) AS percentage_sum
+    MERGE (ss:SchoolStatistics {school_id: school_id, section_number: section_number})
+    SET ss.correct_questions = correct, ss.wrong_questions = wrong, ss.exam_takers = takers,
+        ss.percentage_sum = percentage_sum, ss.section_name = $names[toString(section_number)]
+}
+CALL {
+    MATCH (st:Statistics)
+    WITH st.section_number AS section_number,
+         sum(coalesce(st.correct_questions, 0)) AS correct,
+         sum(coalesce(st.wrong_questions, 0)) AS wrong,
+         sum(coalesce(st.exam_takers, 0)) AS takers,
+         sum(coalesce(st.first_exam_percentage, 0) + coalesce(st.second_exam_percentage, 0)) AS percentage_sum
+    MERGE (gs:GlobalStatistics {section_number: section_number})
+    SET gs.correct_questions = correct, gs.wrong_questions = wrong, gs.exam_takers = takers,
+        gs.percentage_sum = percentage_sum, gs.section_name = $names[toString(section_number)]
+}
+SET m.applied_at = datetime()
+RETURN true AS applied
+"""
+
+def backfill_rollups(session):
+    names = {str(sec): name for sec, name in SUBJECT_MAPPING.items()}
+    record = session.run(BACKFILL_ROLLUPS_QUERY, {"names": names}).single()
+    return bool(record)
+
+def rollup_summary(rollups):
+    """SchoolStatistics / GlobalStatistics düğümlerinden bölüm özetleri."""
+    summary = []
+    for r in sorted(rollups, key=lambda r: r["section_number"]):
+        correct = r.get("correct_questions") or 0
+        wrong = r.get("wrong_questions") or 0
+        takers = r.get("exam_takers") or 0
+        total = correct + wrong
+        summary.append({
+            "section_number": r["section_number"],
+            "section_name": SUBJECT_MAPPING.get(r["section_number"], f"Section {r['section_number']}"),
+            "correct_answers_total": correct,
+            "wrong_answers_total": wrong,
+            "exam_takers": takers,
+            "success_rate": round((correct / total) * 100, 2) if total > 0 else 0,
+            "average_percentage": round((r.get("percentage_sum") or 0) / takers, 2) if takers > 0 else 0
+        })
+    return summary
@@ -0,0 +1,61 @@
+# tools/stats_cache.py
+import os
+import threading
+from uuid import uuid4
+from tools.cache import LRUCache
+from tools.http_cache import make_etag
+from tools.counters import counter_buffer
+
+TEACHER_STATS_CACHE_SIZE = int(os.getenv("TEACHER_STATS_CACHE_SIZE", "512"))
+# Bounds staleness from submissions in other schools (per-question counters are
+# global) and from other worker processes, which do not see our invalidations.
+TEACHER_STATS_TTL = float(os.getenv("TEACHER_STATS_TTL", "30"))
+
+class StatsViewCache:
+    """
+    Built teacher statistics views keyed by (school_id, class_name, sections),
+    each with its own ETag. A submission drops every entry of its school; a
+    per-school generation keeps a build that raced with that invalidation from
+    being stored. The per-question counters land later, with the counter
+    buffer's flush, and are shared by every school, so each flush drops all
+    entries.
+    """
+
+    def __init__(self, max_size=TEACHER_STATS_CACHE_SIZE, ttl=TEACHER_STATS_TTL):
+        self._entries = LRUCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._generation = 0
+
+    def _current(self, school_id):
+        return self._generation, self._generations.get(school_id, 0)
+
+    def get_or_build(self, key, build):
+        """Returns (etag, body) for the view, building it on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            generation = self._current(key[0])
+        body = build()
+        entry = (make_etag("stats", "teacher", *key, uuid4().hex), body)
+        with self._lock:
+            if self._current(key[0]) == generation:
+                self._entries.set(key, entry)
+        return entry
+
+    def invalidate_school(self, school_id):
+        with self._lock:
+            self._generations[school_id] = self._generations.get(school_id, 0) + 1
+        self._entries.invalidate(lambda key: key[0] == school_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+        self._entries.invalidate()
+
+    def stats(self):
+        return self._entries.stats()
+
+teacher_stats_cache = StatsViewCache()
+counter_buffer.add_listener(teacher_stats_cache.invalidate)
@@ -0,0 +1,275 @@
+# tools/submissions.py
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi import HTTPException
+from tools.database import get_db
+from tools.exam import process_results, thaw_paper, paper_questions
+from tools.token_generator import fetch_user
+
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", "4"))
+GRADING_QUEUE_LIMIT = int(os.getenv("GRADING_QUEUE_LIMIT", "500"))
+GRADING_SWEEP_SECONDS = float(os.getenv("GRADING_SWEEP_SECONDS", "5"))
+GRADING_CLAIM_TIMEOUT_SECONDS = int(os.getenv("GRADING_CLAIM_TIMEOUT_SECONDS", "300"))
+
+def load_open_exam(session, user, exam_id):
+    result = session.run("""
+    MATCH (e:Exam {exam_id: $exam_id, user_id: $user_id})
+    RETURN e LIMIT 1
+    """, {"exam_id": exam_id, "user_id": user["user_id"]})
+    record = result.single()
+    if not record:
+        raise HTTPException(status_code=404, detail="Exam not found.")
+    exam_node = record["e"]
+    if exam_node.get("end_time") is not None or exam_node.get("status") not in (None, "in_progress"):
+        raise HTTPException(status_code=400, detail="Exam has already been submitted.")
+    return exam_node
+
+def exam_questions(session, exam_node):
+    if exam_node.get("paper"):
+        return paper_questions(thaw_paper(exam_node["paper"]))
+    q_result = session.run("""
+    MATCH (e:Exam {exam_id: $exam_id})-[:CONTAINS]->(q:Question)
+    RETURN q
+    """, {"exam_id": exam_node["exam_id"]})
+    return [rec["q"] for rec in q_result]
+
+def submit_exam(session, user, exam_id, answers):
+    """Grades and records a submission inside the request."""
+    # The attempt number comes from the user, so grade against a fresh read
+    # rather than the cached principal.
+    user = fetch_user(session, user["user_id"]) or user
+    exam_node = load_open_exam(session, user, exam_id)
+    selected_questions = exam_questions(session, exam_node)
+    if not selected_questions:
+        raise HTTPException(status_code=400, detail="No questions associated with this exam.")
+    end_time = datetime.utcnow().isoformat()
+    process_results(session, user, exam_node, selected_questions, answers, end_time)
+
+def _answers_to_dict(answers):
+    return {qid: {"selected_texts": (a.get("selected_texts") if isinstance(a, dict) else a.selected_texts) or []}
+            for qid, a in answers.items()}
+
+def record_submission(session, user, exam_id, answers):
+    """
+    Durably stores the raw answers as a pending Submission and moves the exam to
+    'grading'. Returns the submission id; grading happens in the GradingPool.
+    """
+    exam_node = load_open_exam(session, user, exam_id)
+    submission_id = str(uuid4())
+    # Locking the exam before re-checking its status makes concurrent submits of
+    # the same exam queue exactly one Submission.
+    record = session.run("""
+    MATCH (e:Exam {exam_id: $exam_id, user_id: $user_id})
+    SET e._lock = true
+    REMOVE e._lock
+    WITH e
+    WHERE e.end_time IS NULL AND coalesce(e.status, 'in_progress') = 'in_progress'
+    CREATE (s:Submission {
+        id: $submission_id,
+        exam_id: $exam_id,
+        user_id: $user_id,
+        answers: $answers,
+        status: 'pending',
+        submitted_at: datetime($submitted_at)
+    })
+    CREATE (e)-[:HAS_SUBMISSION]->(s)
+    SET e.status = 'grading'
+    RETURN s.id AS id
+    """, {
+        "exam_id": exam_node["exam_id"],
+        "user_id": user["user_id"],
+        "submission_id": submission_id,
+        "answers": json.dumps(_answers_to_dict(answers), separators=(",", ":"), ensure_ascii=False),
+        "submitted_at": datetime.utcnow().isoformat()
+    }).single()
+    if not record:
+        raise HTTPException(status_code=400, detail="Exam has already been submitted.")
+    return submission_id
+
+def get_submission(session, user, submission_id):
+    result = session.run("""
+    MATCH (s:Submission {id: $submission_id, user_id: $user_id})
+    RETURN s
+    """, {"submission_id": submission_id, "user_id": user["user_id"]})
+    record = result.single()
+    if not record:
+        raise HTTPException(status_code=404, detail="Submission not found.")
+    s = record["s"]
+    return {
+        "submission_id": s["id"],
+        "exam_id": s["exam_id"],
+        "status": s["status"],
+        "exam_percentage": s.get("exam_percentage"),
+        "error": s.get("error")
+    }
+
+def claim_submission(session, submission_id):
+    # Taking the write lock before reading the status keeps two workers from
+    # grading the same submission. A claim older than the timeout can be taken
+    # over; the new claim token makes the stale worker's write a no-op.
+    result = session.run("""
+    MATCH (s:Submission {id: $submission_id})
+    SET s._lock = true
+    REMOVE s._lock
+    WITH s
+    WHERE s.status = 'pending'
+       OR (s.status = 'grading' AND s.claimed_at < datetime() - duration({seconds: $timeout}))
+    SET s.status = 'grading', s.claimed_at = datetime(), s.claim = $claim
+    RETURN s
+    """, {"submission_id": submission_id, "timeout": GRADING_CLAIM_TIMEOUT_SECONDS, "claim": str(uuid4())})
+    record = result.single()
+    return record["s"] if record else None
+
+def submitted_time(submission):
+    """When the student submitted, as the naive UTC ISO string process_results expects."""
+    submitted_at = submission.get("submitted_at")
+    if submitted_at is None:
+        return datetime.utcnow().isoformat()
+    if hasattr(submitted_at, "to_native"):
+        submitted_at = submitted_at.to_native()
+    if isinstance(submitted_at, str):
+        submitted_at = datetime.fromisoformat(submitted_at.replace("Z", "+00:00"))
+    if submitted_at.tzinfo is not None:
+        submitted_at = submitted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return submitted_at.isoformat()
+
+def grade_submission(session, submission_id):
+    submission = claim_submission(session, submission_id)
+    if submission is None:
+        return
+    grade_claimed(session, submission)
+
+def grade_claimed(session, submission):
+    """Grades a submission claimed by claim_submission, recording it only while the claim is still held."""
+    submission_id = submission["id"]
+    try:
+        user = fetch_user(session, submission["user_id"])
+        result = session.run("MATCH (e:Exam {exam_id: $exam_id}) RETURN e", {"exam_id": submission["exam_id"]})
+        record = result.single()
+        if not user or not record:
+            raise ValueError("Exam or student no longer exists.")
+        exam_node = record["e"]
+        selected_questions = exam_questions(session, exam_node)
+        if not selected_questions:
+            raise ValueError("No questions associated with this exam.")
+        # The exam ended when it was submitted, not when a worker got to it.
+        end_time = submitted_time(submission)
+        recorded = process_results(session, user, exam_node, selected_questions, json.loads(submission["answers"]),
+                                   end_time, submission_id=submission_id, claim=submission["claim"])
+        if not recorded:
+            print(f"Submission {submission_id} was claimed by another worker; result discarded.")
+    except Exception as e:
+        print(f"Grading failed for submission {submission_id}: {e}")
+        # Hand the exam back to the student so it can be submitted again.
+        session.run("""
+        MATCH (s:Submission {id: $submission_id})
+        WHERE s.status = 'grading' AND s.claim = $claim
+        SET s.status = 'failed', s.error = $error
+        WITH s
+        MATCH (e:Exam {exam_id: s.exam_id})
+        WHERE e.end_time IS NULL
+        SET e.status = 'in_progress'
+        """, {"submission_id": submission_id, "claim": submission["claim"], "error": str(e)})
+
+class GradingPool:
+    """
+    Bounded pool of grading workers. Submissions are queued right after they are
+    recorded; a sweeper also picks up anything still pending (full queue,
+    restart, another worker process that died mid-grade).
+    """
+
+    def __init__(self, workers=GRADING_WORKERS, queue_limit=GRADING_QUEUE_LIMIT, sweep_seconds=GRADING_SWEEP_SECONDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.sweep_seconds = sweep_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._stop = threading.Event()
+        self._sweeper = None
+        self.enqueued = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="grading")
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="grading-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def enqueue(self, submission_id):
+        with self._lock:
+            if self._executor is None or submission_id in self._in_flight:
+                return False
+            if len(self._in_flight) >= self.queue_limit:
+                self.rejected += 1
+                return False
+            self._in_flight.add(submission_id)
+            self.enqueued += 1
+        self._executor.submit(self._run, submission_id)
+        return True
+
+    def _run(self, submission_id):
+        session = get_db()
+        try:
+            grade_submission(session, submission_id)
+        except Exception as e:
+            print(f"Grading worker error: {e}")
+        finally:
+            session.close()
+            with self._lock:
+                self._in_flight.discard(submission_id)
+                self.completed += 1
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                with self._lock:
+                    room = self.queue_limit - len(self._in_flight)
+                if room <= 0:
+                    continue
+                session = get_db()
+                try:
+                    result = session.run("""
+                    MATCH (s:Submission)
+                    WHERE s.status = 'pending'
+                       OR (s.status = 'grading' AND s.claimed_at < datetime() - duration({seconds: $timeout}))
+                    RETURN s.id AS id
+                    ORDER BY s.submitted_at
+                    LIMIT $limit
+                    """, {"timeout": GRADING_CLAIM_TIMEOUT_SECONDS, "limit": room})
+                    pending = [record["id"] for record in result]
+                finally:
+                    session.close()
+                for submission_id in pending:
+                    self.enqueue(submission_id)
+            except Exception as e:
+                print(f"Grading sweeper error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": len(self._in_flight),
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "completed": self.completed
+            }
+
+grading_pool = GradingPool()
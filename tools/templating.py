@@ -0,0 +1,29 @@
+# tools/templating.py
+import os
+from jinja2 import FileSystemBytecodeCache
+from fastapi.templating import Jinja2Templates
+from tools.fragment_cache import FragmentCacheExtension
+from tools.static_assets import asset_manifest
+
+TEMPLATE_DIR = os.getenv("TEMPLATE_DIR", "templates")
+# Development only; in production templates are compiled once per worker.
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+# Compiled templates survive worker restarts, so cold workers skip compiling.
+# Defaults to a per-user directory under the system temp dir.
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR")
+
+def _bytecode_cache():
+    if TEMPLATE_BYTECODE_CACHE_DIR:
+        os.makedirs(TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(TEMPLATE_BYTECODE_CACHE_DIR)
+    return FileSystemBytecodeCache()
+
+# The one template environment every page renders through (see routers/ui.py).
+templates = Jinja2Templates(
+    directory=TEMPLATE_DIR,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+    extensions=[FragmentCacheExtension]
+)
+# {{ asset_url("style.css") }} -> /static/style.<hash>.css
+templates.env.globals["asset_url"] = asset_manifest.url
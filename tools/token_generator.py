@@ -6,6 +6,7 @@ from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from tools.database import get_db
 from tools.security import verify_access_token
+from tools.auth_cache import user_cache, token_cache
 
 bearer_scheme = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "TEST_SECRET_KEY")
@@ -18,14 +19,7 @@ def create_access_token(user_id: str):
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), session = Depends(get_db)):
-    token = credentials.credentials
-    payload = verify_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token.")
-    user_id = payload.get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token payload.")
+def fetch_user(session, user_id):
     result = session.run("""
 MATCH (u:User {user_id: $user_id})
 OPTIONAL MATCH (u)-[:BELONGS_TO|TEACHES]->(c:Class)
@@ -34,9 +28,27 @@ RETURN u, c.name as class_name, s.school_id as school_id, u.registered_section a
 """, {"user_id": user_id})
     record = result.single()
     if not record:
-        raise HTTPException(status_code=401, detail="User not found.")
+        return None
     user = dict(record["u"])
     user["class_name"] = record.get("class_name") or ""
     user["school_id"] = record.get("school_id") or ""
     user["registered_section"] = record.get("registered_section") or ""
     return user
+
+def resolve_user(session, token):
+    """The user a bearer token belongs to; raises 401 for bad tokens or deleted users."""
+    # Both the token check and the user lookup are cached; user changes and
+    # submissions invalidate the cached user (tools/auth_cache.py).
+    payload = token_cache.get_or_verify(token, verify_access_token) if token else None
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload.")
+    user = user_cache.get_or_load(user_id, lambda: fetch_user(session, user_id))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found.")
+    return user
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), session = Depends(get_db)):
+    return resolve_user(session, credentials.credentials)
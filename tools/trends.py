@@ -0,0 +1,127 @@
+# tools/trends.py
+from datetime import date, timedelta
+from tools.grading import SECTION_NUMBERS
+from tools.statistics_utils import SUBJECT_MAPPING
+
+PERIODS = ("day", "week")
+DEFAULT_RANGE = {"day": 30, "week": 12}
+MAX_BUCKETS = 366
+
+TRENDS_QUERY = """
+MATCH (b:StatisticsBucket {period: $period})
+WHERE b.start >= date($date_from) AND b.start <= date($date_to)
+  AND ($school_id IS NULL OR b.school_id = $school_id)
+  AND ($class_name IS NULL OR b.class_name = $class_name)
+  AND b.section_number IN $sections
+RETURN toString(b.start) AS start, b.section_number AS section_number,
+       sum(b.correct_questions) AS correct, sum(b.wrong_questions) AS wrong,
+       sum(b.exam_takers) AS exam_takers, sum(b.percentage_sum) AS percentage_sum
+ORDER BY start ASC, section_number ASC
+"""
+
+# One-off fill of the buckets from ExamResults recorded before they existed.
+# School and class come from the student's class edges. The marker is only set
+# when every ExamResult could be placed in a bucket, so a run that could not
+# (e.g. results of students without a class) is retried on the next start;
+# the buckets are written with absolute values, so a rerun is harmless.
+BACKFILL_BUCKETS_QUERY = """
+MERGE (m:Migration {name: 'statistics_buckets'})
+SET m._lock = true
+REMOVE m._lock
+WITH m
+WHERE m.applied_at IS NULL
+CALL {
+    MATCH (:User)-[:HAS_RESULT]->(er:ExamResult)
+    RETURN count(er) AS results
+}
+CALL {
+    MATCH (u:User)-[:HAS_RESULT]->(er:ExamResult)
+    WHERE EXISTS { (u)-[:BELONGS_TO]->(:Class)<-[:HAS_CLASS]-(:School) }
+    RETURN count(er) AS covered
+}
+CALL {
+    MATCH (u:User)-[:HAS_RESULT]->(er:ExamResult)
+    MATCH (u)-[:BELONGS_TO]->(c:Class)<-[:HAS_CLASS]-(s:School)
+    MATCH (e:Exam {exam_id: er.exam_id})-[:HAS_ANSWER]->(ea:ExamAnswer)-[:FOR_QUESTION]->(q:Question)
+    WITH s, c, er, q.section AS section,
+         sum(CASE WHEN ea.points_earned = q.points THEN 1 ELSE 0 END) AS correct,
+         sum(CASE WHEN ea.points_earned = q.points THEN 0 ELSE 1 END) AS wrong,
+         sum(ea.points_earned) AS earned, sum(q.points) AS possible
+    WITH s.school_id AS school_id, c.name AS class_name, section, date(er.timestamp) AS day, correct, wrong,
+         CASE WHEN possible > 0 THEN round(earned * 100.0 / possible, 2) ELSE 0 END AS percentage
+    UNWIND [['day', day], ['week', date.truncate('week', day)]] AS bucket
+    WITH school_id, class_name, section, bucket[0] AS period, bucket[1] AS start,
+         sum(correct) AS correct, sum(wrong) AS wrong, count(*) AS takers, sum(percentage) AS percentage_sum
+    MERGE (b:StatisticsBucket {school_id: school_id, class_name: class_name, section_number: section,
+                               period: period, start: start})
+    SET b.correct_questions = correct, b.wrong_questions = wrong,
+        b.exam_takers = takers, b.percentage_sum = percentage_sum
+    RETURN count(b) AS buckets
+}
+FOREACH (_ IN CASE WHEN covered = results AND (results = 0 OR buckets > 0) THEN [1] ELSE [] END |
+    SET m.applied_at = datetime())
+RETURN m.applied_at IS NOT NULL AS applied, results, covered, buckets
+"""
+
+def backfill_buckets(session):
+    record = session.run(BACKFILL_BUCKETS_QUERY).single()
+    if record and not record["applied"]:
+        print(f"Statistics buckets backfill placed {record['covered']} of {record['results']} exam results; "
+              "it will run again on the next start.")
+    return bool(record and record["applied"])
+
+def trend_range(period, date_from=None, date_to=None, today=None):
+    """
+    Validates a trend request and fills in the default window (the last 30 days
+    or 12 weeks). Raises ValueError on bad input or a window over MAX_BUCKETS.
+    """
+    if period not in PERIODS:
+        raise ValueError("period must be 'day' or 'week'.")
+    end = date.fromisoformat(date_to) if date_to else (today or date.today())
+    step = 1 if period == "day" else 7
+    start = date.fromisoformat(date_from) if date_from else end - timedelta(days=step * (DEFAULT_RANGE[period] - 1))
+    if period == "week":
+        start -= timedelta(days=start.weekday())
+    if start > end:
+        raise ValueError("date_from must not be after date_to.")
+    if (end - start).days // step + 1 > MAX_BUCKETS:
+        raise ValueError(f"At most {MAX_BUCKETS} buckets can be requested.")
+    return start, end
+
+def shape_series(records, sections):
+    series = {sec: [] for sec in sections}
+    for r in records:
+        correct, wrong, takers = r["correct"] or 0, r["wrong"] or 0, r["exam_takers"] or 0
+        total = correct + wrong
+        series[r["section_number"]].append({
+            "start": r["start"],
+            "correct_answers": correct,
+            "wrong_answers": wrong,
+            "exam_takers": takers,
+            "success_rate": round((correct / total) * 100, 2) if total > 0 else 0,
+            "average_percentage": round((r["percentage_sum"] or 0) / takers, 2) if takers > 0 else 0
+        })
+    return [
+        {"section_number": sec, "section_name": SUBJECT_MAPPING.get(sec, f"Section {sec}"), "points": series[sec]}
+        for sec in sections
+    ]
+
+def load_trends(session, period, start, end, school_id=None, class_name=None, sections=None):
+    """Time series per section, read only from the buckets inside [start, end]."""
+    sections = sorted(set(sections)) if sections else list(SECTION_NUMBERS)
+    result = session.run(TRENDS_QUERY, {
+        "period": period,
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "school_id": school_id,
+        "class_name": class_name,
+        "sections": sections
+    })
+    return {
+        "period": period,
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "school_id": school_id,
+        "class_name": class_name,
+        "sections": shape_series(result, sections)
+    }
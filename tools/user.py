@@ -1,9 +1,10 @@
 # tools/user.py
 import os
 from uuid import uuid4
-from tools.utils import hash_password, check_password
+from tools.utils import hash_password
+from tools.auth_cache import user_cache
 
-def register_user(session, username, password, name, surname, class_name, role, registered_section=None):
+def register_user(session, username, password, name, surname, class_name, role, registered_section=None, password_hash=None):
     # Normalize username (trim and lower-case)
     username = username.strip().lower()
     # Check if user already exists
@@ -19,7 +20,8 @@ def register_user(session, username, password, name, surname, class_name, role,
         return False
     school = record["s"]
     user_id = str(uuid4())
-    hashed_pw = hash_password(password)
+    # Async callers hash on the password pool beforehand and pass the result.
+    hashed_pw = password_hash or hash_password(password)
     
     # Determine school number for student
     if role.lower() == "student":
@@ -81,26 +83,19 @@ def register_user(session, username, password, name, surname, class_name, role,
     print(f"User registered: {username} | Password: {password}")
     return True
 
-def login_user(session, username, password):
+def find_user_by_username(session, username):
     username = username.strip().lower()
     result = session.run("MATCH (u:User {username: $username}) RETURN u LIMIT 1", {"username": username})
     record = result.single()
-    if not record:
-        print("User not found.")
-        return None
-    user = record["u"]
-    if check_password(password, user["password"]):
-        print(f"Welcome, {user['name']} {user['surname']}!")
-        return user
-    else:
-        print("Incorrect password.")
-        return None
+    return record["u"] if record else None
 
 def delete_user(session, admin_user, username):
     if admin_user["role"].lower() != "admin":
         print("Only admins can delete users.")
         return False
-    session.run("MATCH (u:User {username: $username}) DELETE u", {"username": username})
+    result = session.run("MATCH (u:User {username: $username}) WITH u, u.user_id AS user_id DELETE u RETURN user_id", {"username": username})
+    for record in result:
+        user_cache.invalidate(record["user_id"])
     print("User deleted.")
     return True
 
@@ -117,7 +112,9 @@ def update_user(session, current_user, user_id, **kwargs):
         return False
     query = "MATCH (u:User {user_id: $user_id}) SET " + ", ".join(set_statements) + " RETURN u"
     result = session.run(query, params)
-    if result.single():
+    record = result.single()
+    user_cache.invalidate(user_id)
+    if record:
         print(f"User {user_id} updated: {kwargs}")
         return True
     else:
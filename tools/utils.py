@@ -1,9 +1,95 @@
 # tools/utils.py
 
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 
+# Cost factor for new hashes; existing hashes keep the cost they were made with.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+class PasswordHasherBusy(Exception):
+    def __init__(self, retry_after=PASSWORD_HASH_RETRY_AFTER):
+        super().__init__("Password hashing queue is full.")
+        self.retry_after = retry_after
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated pool so a login storm cannot take every
+    request thread. Work beyond queue_limit (running + waiting) is refused
+    with PasswordHasherBusy instead of piling up.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_limit=PASSWORD_HASH_QUEUE_LIMIT, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def hash(self, password):
+        return self._submit(_hash, password, self.rounds).result()
+
+    def check(self, password, hashed):
+        return self._submit(_check, password, hashed).result()
+
+    async def hash_async(self, password):
+        return await asyncio.wrap_future(self._submit(_hash, password, self.rounds))
+
+    async def check_async(self, password, hashed):
+        return await asyncio.wrap_future(self._submit(_check, password, hashed))
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "rounds": self.rounds,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+password_hasher = PasswordHasher()
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return password_hasher.hash(password)
 
 def check_password(password, hashed):
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+    return password_hasher.check(password, hashed)